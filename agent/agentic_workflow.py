@@ -1,18 +1,29 @@
 from utils.model_loader import ModelLoader
 from prompt_library.prompt import SYSTEM_PROMPT
 from langgraph.graph import StateGraph, MessagesState, END, START
-from langgraph.prebuilt import ToolNode, tools_condition
-from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage
+from langgraph.prebuilt import tools_condition
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
 from tools.weather_info_tool import WeatherInfoTool
 from tools.place_search_tool import PlaceSearchTool
 from tools.expense_calculator_tool import CalculatorTool
 from tools.currency_conversion_tool import CurrencyConverterTool
+from agent.tool_executor import ToolExecutor
+from agent.prefetch import DataPrefetcher
+from agent.context_manager import ContextManager
+from agent.model_router import ModelRouter
+from utils.profiler import MESSAGE_NORMALIZATION, phase
+from utils.session_store import build_checkpointer
+from utils.telemetry import traced_node
+from utils.thread_pool import run_in_thread
+
+
+DEFAULT_SESSION_TURNS = 6
 
 
 class GraphBuilder:
     def __init__(self, model_provider: str = "groq"):
         self.model_loader = ModelLoader(model_provider=model_provider)
-        self.llm = self.model_loader.load_llm()
 
         self.weather_tools = WeatherInfoTool()
         self.place_search_tools = PlaceSearchTool()
@@ -26,7 +37,17 @@ class GraphBuilder:
             *self.currency_converter_tools.currency_converter_tool_list,
         ]
 
-        self.llm_with_tools = self.llm.bind_tools(tools=self.tools)
+        # Small model for tool-selection turns, strong model for the final
+        # answer (see `llm.roles` in config.yaml).
+        self.model_router = ModelRouter.from_model_loader(self.model_loader, self.tools)
+        self.llm = self.model_router.models["synthesizer"]
+
+        self.tool_executor = ToolExecutor.from_config(
+            self.tools, self.model_loader.config.get("tools")
+        )
+        self.prefetcher = DataPrefetcher.from_config(
+            self.tool_executor, self.model_loader.config.get("prefetch")
+        )
 
         # ✅ FIX: Avoid nested SystemMessage
         if isinstance(SYSTEM_PROMPT, SystemMessage):
@@ -34,60 +55,125 @@ class GraphBuilder:
         else:
             self.system_prompt = SystemMessage(content=str(SYSTEM_PROMPT))
 
+        self.context_manager = ContextManager.from_config(
+            self.system_prompt,
+            self.model_loader.config.get("context"),
+            summarizer=self.model_router.summarize,
+        )
+
+        # Multi-turn sessions (`sessions` in config.yaml): the latest state of
+        # each session is checkpointed, so a follow-up sees - and reuses the
+        # tool results of - the turns before it.
+        sessions_config = self.model_loader.config.get("sessions") or {}
+        self.checkpointer = build_checkpointer(sessions_config)
+        self.max_session_turns = int(sessions_config.get("max_turns", DEFAULT_SESSION_TURNS))
+
         self.graph = None
+        self.session_graph = None
+
+    @staticmethod
+    def _unpaired(messages: list) -> list:
+        """Tool-call exchanges a provider would reject as a history.
+
+        Every tool call must be answered by a ToolMessage after its
+        AIMessage. Sessions checkpointed while reused tool results still
+        overwrote earlier answers break that rule; such an AIMessage is
+        dropped together with its answers, as are stray ToolMessages.
+        """
+        requested, answered = {}, set()
+        for m in messages:
+            if isinstance(m, AIMessage):
+                for call in m.tool_calls:
+                    requested[call["id"]] = m
+            elif isinstance(m, ToolMessage) and m.tool_call_id in requested:
+                answered.add(m.tool_call_id)
+
+        broken = {id(m) for call_id, m in requested.items() if call_id not in answered}
+        return [
+            m for m in messages
+            if id(m) in broken
+            or (isinstance(m, ToolMessage) and (
+                m.tool_call_id not in answered or id(requested[m.tool_call_id]) in broken
+            ))
+        ]
+
+    def session_function(self, state: MessagesState):
+        """Keep a session to its last `max_session_turns` turns (and its history valid)."""
+        messages = state.get("messages", [])
+        removed = {m.id for m in self._unpaired(messages)}
+
+        turns = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        if len(turns) > self.max_session_turns:
+            removed.update(m.id for m in messages[:turns[-self.max_session_turns]])
+
+        return {"messages": [RemoveMessage(id=m.id) for m in messages if m.id in removed]}
 
     def agent_function(self, state: MessagesState):
         try:
-            user_messages = state.get("messages", [])
-
-            normalized_messages = []
-
-            # Always inject system prompt first
-            normalized_messages.append(
-                SystemMessage(content=str(self.system_prompt.content))
-            )
-
-            for msg in user_messages:
-                if isinstance(msg, BaseMessage):
-                    # Always re-wrap BaseMessages safely
-                    if isinstance(msg, HumanMessage):
-                        normalized_messages.append(
-                            HumanMessage(content=str(msg.content))
-                        )
-                    else:
-                        normalized_messages.append(
-                            HumanMessage(content=str(msg.content))
-                        )
-
-                elif isinstance(msg, str):
-                    normalized_messages.append(
-                        HumanMessage(content=str(msg))
-                    )
+            with phase(MESSAGE_NORMALIZATION):
+                normalized_messages = self.context_manager.prepare(state.get("messages", []))
+            response = self.model_router.invoke(normalized_messages)
+            return {"messages": [response]}
 
-                else:
-                    normalized_messages.append(
-                        HumanMessage(content=str(msg))
-                    )
+        except Exception as e:
+            raise RuntimeError(f"Agent execution failed: {e}") from e
 
-            response = self.llm_with_tools.invoke(normalized_messages)
+    async def aagent_function(self, state: MessagesState):
+        try:
+            messages = state.get("messages", [])
+            with phase(MESSAGE_NORMALIZATION):
+                if self.context_manager.summarizer is not None:
+                    # Summarizing may call a model synchronously; keep it off the loop.
+                    normalized_messages = await run_in_thread(self.context_manager.prepare, messages)
+                else:
+                    normalized_messages = self.context_manager.prepare(messages)
+            response = await self.model_router.ainvoke(normalized_messages)
             return {"messages": [response]}
 
         except Exception as e:
             raise RuntimeError(f"Agent execution failed: {e}") from e
 
     def build_graph(self):
-        graph_builder = StateGraph(MessagesState)
+        """Compile the stateless graph, and the session graph when sessions are on."""
+        self.graph = self._compile()
+        if self.checkpointer is not None:
+            self.session_graph = self._compile(self.checkpointer)
+        return self.graph
+
+    @staticmethod
+    def _node(name: str, func, afunc=None) -> RunnableLambda:
+        """A traced graph node; sync callers use `invoke`, the API server `ainvoke`."""
+        return RunnableLambda(
+            traced_node(name, func),
+            afunc=traced_node(name, afunc) if afunc is not None else None,
+            name=name,
+        )
 
-        graph_builder.add_node("agent", self.agent_function)
-        graph_builder.add_node("tools", ToolNode(tools=self.tools))
+    def _compile(self, checkpointer=None):
+        graph_builder = StateGraph(MessagesState)
 
-        graph_builder.add_edge(START, "agent")
+        graph_builder.add_node(
+            "prefetch", self._node("prefetch", self.prefetcher.run, self.prefetcher.arun)
+        )
+        graph_builder.add_node(
+            "agent", self._node("agent", self.agent_function, self.aagent_function)
+        )
+        graph_builder.add_node(
+            "tools", self._node("tools", self.tool_executor.run, self.tool_executor.arun)
+        )
+
+        if checkpointer is not None:
+            graph_builder.add_node("session", self._node("session", self.session_function))
+            graph_builder.add_edge(START, "session")
+            graph_builder.add_edge("session", "prefetch")
+        else:
+            graph_builder.add_edge(START, "prefetch")
+        graph_builder.add_edge("prefetch", "agent")
         graph_builder.add_conditional_edges("agent", tools_condition)
         graph_builder.add_edge("tools", "agent")
         graph_builder.add_edge("agent", END)
 
-        self.graph = graph_builder.compile()
-        return self.graph
+        return graph_builder.compile(checkpointer=checkpointer)
 
     def __call__(self):
         return self.build_graph()
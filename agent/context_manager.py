@@ -0,0 +1,200 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from logger.logging import get_logger
+from utils.tokens import DEFAULT_ENCODING, count_text_tokens
+
+
+log = get_logger("context")
+
+
+DEFAULT_MAX_PROMPT_TOKENS = 6000
+DEFAULT_TARGET_RATIO = 0.75
+DEFAULT_COMPACT_CHARS = 300
+
+# Fixed per-message overhead of the chat format (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+COMPACTED_MARKER = "[compacted]"
+SUMMARIZE_INSTRUCTION = (
+    "Summarize this travel tool output in under {words} words. Keep names, "
+    "prices, ratings and dates; drop everything else."
+)
+SUMMARY_CACHE_SIZE = 1024
+
+
+def _content_text(message: BaseMessage) -> str:
+    content = message.content
+    return content if isinstance(content, str) else json.dumps(content, default=str)
+
+
+def count_message_tokens(message: BaseMessage, encoding: str = DEFAULT_ENCODING) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_text_tokens(_content_text(message), encoding)
+
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += count_text_tokens(call["name"], encoding)
+        tokens += count_text_tokens(json.dumps(call.get("args", {}), sort_keys=True), encoding)
+
+    return tokens
+
+
+def compact_tool_output(content: str, max_chars: int = DEFAULT_COMPACT_CHARS) -> str:
+    """Shorten a tool output to its leading lines, marking it as compacted."""
+    if content.startswith(COMPACTED_MARKER) or len(content) <= max_chars:
+        return content
+
+    head = content[:max_chars]
+    # Prefer cutting at a line or sentence boundary.
+    cut = max(head.rfind("\n"), head.rfind(". "))
+    if cut > max_chars // 2:
+        head = head[:cut + 1]
+
+    omitted = len(content) - len(head)
+    return f"{COMPACTED_MARKER} {head.rstrip()} … ({omitted} chars omitted)"
+
+
+class ContextManager:
+    """Builds the token-budgeted message list sent to the LLM each ReAct step.
+
+    Message types (AI tool calls, tool results) are passed through unchanged,
+    and the system prompt is the same object on every call so the provider
+    can cache the prompt prefix. When the conversation exceeds
+    `max_prompt_tokens`, tool outputs from earlier turns are compacted,
+    oldest first, until it fits `target_ratio` of the budget; the latest
+    tool turn is only compacted if that is still not enough.
+
+    With a `summarizer` (the summarizer-role model), earlier tool outputs
+    are summarized instead of truncated. Summaries are memoized by content
+    so each output is summarized once and the compacted prefix stays
+    byte-identical across steps.
+    """
+
+    def __init__(
+        self,
+        system_prompt: SystemMessage,
+        max_prompt_tokens: int = DEFAULT_MAX_PROMPT_TOKENS,
+        target_ratio: float = DEFAULT_TARGET_RATIO,
+        compact_chars: int = DEFAULT_COMPACT_CHARS,
+        encoding: str = DEFAULT_ENCODING,
+        enabled: bool = True,
+        summarizer: Optional[Callable[[str, str], str]] = None,
+    ):
+        self.system_prompt = system_prompt
+        self.max_prompt_tokens = max_prompt_tokens
+        self.target_tokens = int(max_prompt_tokens * target_ratio)
+        self.compact_chars = compact_chars
+        self.encoding = encoding
+        self.enabled = enabled
+        self.summarizer = summarizer
+        self._summaries = OrderedDict()
+        self._summaries_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, system_prompt: SystemMessage, context_config: Optional[dict],
+                    summarizer: Optional[Callable[[str, str], str]] = None) -> "ContextManager":
+        """Build the manager from the `context` section of config.yaml."""
+        context_config = context_config or {}
+        if not context_config.get("summarize_with_model", False):
+            summarizer = None
+
+        return cls(
+            system_prompt,
+            max_prompt_tokens=int(context_config.get("max_prompt_tokens", DEFAULT_MAX_PROMPT_TOKENS)),
+            target_ratio=float(context_config.get("target_ratio", DEFAULT_TARGET_RATIO)),
+            compact_chars=int(context_config.get("compact_tool_output_chars", DEFAULT_COMPACT_CHARS)),
+            encoding=context_config.get("encoding", DEFAULT_ENCODING),
+            enabled=bool(context_config.get("enabled", True)),
+            summarizer=summarizer,
+        )
+
+    def count_tokens(self, messages: List[BaseMessage]) -> int:
+        return sum(count_message_tokens(m, self.encoding) for m in messages)
+
+    @staticmethod
+    def _coerce(message) -> BaseMessage:
+        if isinstance(message, BaseMessage):
+            return message
+        return HumanMessage(content=str(message))
+
+    @staticmethod
+    def _latest_tool_turn(messages: List[BaseMessage]) -> int:
+        """Index of the last AI message that issued tool calls (or len)."""
+        for i in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[i], AIMessage) and messages[i].tool_calls:
+                return i
+        return len(messages)
+
+    def _summarize(self, content: str) -> str:
+        with self._summaries_lock:
+            if content in self._summaries:
+                self._summaries.move_to_end(content)
+                return self._summaries[content]
+
+        words = max(20, self.compact_chars // 6)
+        try:
+            summary = self.summarizer(content, SUMMARIZE_INSTRUCTION.format(words=words))
+            summary = f"{COMPACTED_MARKER} {summary.strip()}"
+        except Exception as e:
+            log.warning("⚠️ Summarizer failed, truncating instead: %s", e)
+            return compact_tool_output(content, self.compact_chars)
+
+        with self._summaries_lock:
+            self._summaries[content] = summary
+            if len(self._summaries) > SUMMARY_CACHE_SIZE:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def _shorten(self, content: str, summarize: bool) -> str:
+        if (summarize and self.summarizer is not None
+                and not content.startswith(COMPACTED_MARKER) and len(content) > self.compact_chars):
+            return self._summarize(content)
+        return compact_tool_output(content, self.compact_chars)
+
+    def _compact(self, messages: List[BaseMessage], indices: List[int], total: int,
+                 summarize: bool = False) -> tuple:
+        compacted = 0
+        for i in indices:
+            if total <= self.target_tokens:
+                break
+
+            message = messages[i]
+            content = _content_text(message)
+            shortened = self._shorten(content, summarize)
+            if shortened == content:
+                continue
+
+            before = count_message_tokens(message, self.encoding)
+            messages[i] = message.model_copy(update={"content": shortened})
+            total -= before - count_message_tokens(messages[i], self.encoding)
+            compacted += 1
+
+        return total, compacted
+
+    def prepare(self, messages: list) -> List[BaseMessage]:
+        """Return [system prompt, *messages] within the token budget."""
+        history = [self._coerce(m) for m in messages]
+        # A stored SystemMessage would break the stable prefix; the prompt is injected here.
+        history = [m for m in history if not isinstance(m, SystemMessage)]
+
+        if not self.enabled:
+            return [self.system_prompt, *history]
+
+        total = self.count_tokens([self.system_prompt, *history])
+        if total <= self.max_prompt_tokens:
+            return [self.system_prompt, *history]
+
+        before = total
+        latest = self._latest_tool_turn(history)
+        tool_indices = [i for i, m in enumerate(history) if isinstance(m, ToolMessage)]
+
+        total, compacted = self._compact(
+            history, [i for i in tool_indices if i < latest], total, summarize=True
+        )
+        if total > self.target_tokens:
+            total, extra = self._compact(history, [i for i in tool_indices if i > latest], total)
+            compacted += extra
+
+        log.info("✂️ Context compacted: %d → %d tokens (%d tool outputs)", before, total, compacted)
+        return [self.system_prompt, *history]
@@ -0,0 +1,201 @@
+import threading
+import time
+from contextlib import aclosing, closing
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, message_chunk_to_message
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ensure_config, merge_configs
+
+from utils.model_loader import ModelLoader
+from utils.telemetry import llm_callback
+
+
+ROUTER = "router"
+SYNTHESIZER = "synthesizer"
+SUMMARIZER = "summarizer"
+ROLES = (ROUTER, SYNTHESIZER, SUMMARIZER)
+
+
+class RoleMetrics:
+    """Call count, latency and token usage per model role."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._roles = {}
+
+    def record(self, role: str, model: str, started: float, response: BaseMessage) -> None:
+        latency = time.monotonic() - started
+        usage = getattr(response, "usage_metadata", None) or {}
+
+        with self._lock:
+            stats = self._roles.setdefault(role, {
+                "model": model, "calls": 0, "total_seconds": 0.0,
+                "input_tokens": 0, "output_tokens": 0,
+            })
+            stats["calls"] += 1
+            stats["total_seconds"] += latency
+            stats["input_tokens"] += usage.get("input_tokens", 0)
+            stats["output_tokens"] += usage.get("output_tokens", 0)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                role: {
+                    **stats,
+                    "total_seconds": round(stats["total_seconds"], 3),
+                    "avg_latency_ms": round(stats["total_seconds"] / stats["calls"] * 1000, 1),
+                }
+                for role, stats in self._roles.items()
+            }
+
+
+def _model_name(llm) -> str:
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+class ModelRouter:
+    """Chooses the model for each ReAct step by role.
+
+    When `llm.roles` declares a separate router model, every step first
+    goes to that (small, fast) model with the tools bound. If it asks for
+    tools, its turn is used as is; if it is ready to answer, the step is
+    re-run on the synthesizer model, which writes the final itinerary.
+    The router's reply is streamed and cut off at its first chunk of
+    answer text, so deciding to answer costs a few tokens rather than a
+    whole discarded answer (`max_tokens` is only a backstop). Without
+    role overrides both roles share one model and each step is a single
+    call, as before.
+    """
+
+    def __init__(self, models: Dict[str, object], tools: List):
+        self.models = models
+        self.metrics = RoleMetrics()
+        self.tiered = models[ROUTER] is not models[SYNTHESIZER]
+
+        self.bound = {
+            role: models[role].bind_tools(tools=tools).with_config(
+                run_name=f"{role}_llm", tags=[f"role:{role}"]
+            )
+            for role in (ROUTER, SYNTHESIZER)
+        }
+
+    @classmethod
+    def from_model_loader(cls, model_loader: ModelLoader, tools: List) -> "ModelRouter":
+        """Load one model per role, reusing a single instance when roles match."""
+        models, loaded = {}, {}
+        for role in ROLES:
+            key = model_loader.role_signature(role)
+            if key not in loaded:
+                overridden = any(overrides for _, overrides in key)
+                loaded[key] = model_loader.load_llm(role=role if overridden else None)
+            models[role] = loaded[key]
+
+        return cls(models, tools)
+
+    @property
+    def summarizer(self):
+        return self.models[SUMMARIZER]
+
+    @staticmethod
+    def _config(role: str) -> RunnableConfig:
+        """The caller's config (inherited from the graph node) plus the telemetry callback.
+
+        Binding the callback with `with_config` would replace the inherited
+        callbacks - and with them `astream_events` - instead of adding to them.
+        """
+        return merge_configs(
+            ensure_config(), {"callbacks": [llm_callback], "tags": [f"role:{role}"]}
+        )
+
+    def _record(self, role: str, started: float, response: BaseMessage) -> None:
+        self.metrics.record(role, _model_name(self.models[role]), started, response)
+
+    @staticmethod
+    def _wants_tools(response: AIMessage) -> bool:
+        return bool(getattr(response, "tool_calls", None))
+
+    @staticmethod
+    def _answering(chunk: BaseMessage, response: BaseMessage) -> bool:
+        """True once the router writes answer text without having started a tool call.
+
+        Models without native streaming yield one whole AIMessage instead of chunks.
+        """
+        return bool(chunk.content) and not getattr(response, "tool_call_chunks", None)
+
+    def _route(self, messages: List[BaseMessage]) -> Optional[AIMessage]:
+        """The router's tool-call turn, or None as soon as it starts answering instead."""
+        started = time.monotonic()
+        response = None
+        with closing(self.bound[ROUTER].stream(messages, self._config(ROUTER))) as chunks:
+            for chunk in chunks:
+                response = chunk if response is None else response + chunk
+                if self._answering(chunk, response):
+                    break
+        return self._routed(started, response)
+
+    async def _aroute(self, messages: List[BaseMessage]) -> Optional[AIMessage]:
+        """Async counterpart of `_route`; closing the stream aborts the request."""
+        started = time.monotonic()
+        response = None
+        async with aclosing(self.bound[ROUTER].astream(messages, self._config(ROUTER))) as chunks:
+            async for chunk in chunks:
+                response = chunk if response is None else response + chunk
+                if self._answering(chunk, response):
+                    break
+        return self._routed(started, response)
+
+    def _routed(self, started: float, response: Optional[BaseMessage]) -> Optional[AIMessage]:
+        if response is None:
+            return None
+        message = message_chunk_to_message(response)
+        self._record(ROUTER, started, message)
+        return message if self._wants_tools(message) else None
+
+    def invoke(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.tiered:
+            response = self._route(messages)
+            if response is not None:
+                return response
+
+        started = time.monotonic()
+        response = self.bound[SYNTHESIZER].invoke(messages, self._config(SYNTHESIZER))
+        self._record(SYNTHESIZER, started, response)
+        return response
+
+    async def ainvoke(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.tiered:
+            response = await self._aroute(messages)
+            if response is not None:
+                return response
+
+        started = time.monotonic()
+        response = await self.bound[SYNTHESIZER].ainvoke(messages, self._config(SYNTHESIZER))
+        self._record(SYNTHESIZER, started, response)
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "tiered": self.tiered,
+            "models": {role: _model_name(llm) for role, llm in self.models.items()},
+            "roles": self.metrics.as_dict(),
+            "key_pools": {
+                role: llm.pool_stats()
+                for role, llm in self.models.items()
+                if hasattr(llm, "pool_stats")
+            },
+        }
+
+    def health(self) -> dict:
+        """Provider health of the synthesizer model (the one users wait on)."""
+        llm = self.models[SYNTHESIZER]
+        if hasattr(llm, "health"):
+            return llm.health()
+        return {"mode": "single", "providers": {}}
+
+    def summarize(self, text: str, instruction: str) -> str:
+        """One-shot call to the summarizer model (used for context compaction)."""
+        started = time.monotonic()
+        response = self.summarizer.invoke(f"{instruction}\n\n{text}", self._config(SUMMARIZER))
+        self._record(SUMMARIZER, started, response)
+        return str(response.content)
@@ -0,0 +1,233 @@
+import re
+from typing import Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import MessagesState
+from pydantic import BaseModel
+
+from agent.tool_executor import ToolExecutor, is_failed_result, tool_call_key
+
+
+# Tools whose only argument is the destination; almost every plan needs all
+# of them, so they are fetched up front in one concurrent fan-out.
+PREFETCH_TOOLS = {
+    "get_current_weather": "city",
+    "get_weather_forecast": "city",
+    "search_attractions": "place",
+    "search_restaurants": "place",
+    "search_activities": "place",
+    "search_transportation": "place",
+}
+
+_STOP_WORDS = (
+    r"for|with|on|under|within|during|from|this|next|by|and|in|starting|"
+    r"including|budget|trip|tour|travel|itinerary|vacation|holiday"
+)
+
+_DESTINATION_PATTERNS = [
+    # "trip to Goa", "5 days in Goa", "visit Paris", "explore Kyoto"
+    re.compile(
+        r"\b(?:to|in|at|visit(?:ing)?|explore|exploring|around)\s+"
+        r"(?P<dest>[A-Za-z][A-Za-z .'-]*?)"
+        rf"(?=\s+(?:{_STOP_WORDS})\b|\s*[,.!?;:()]|\s+\d|\s*$)",
+        re.IGNORECASE,
+    ),
+    # "itinerary for Kerala" (only when nothing above names a place)
+    re.compile(
+        r"\bfor\s+(?P<dest>[A-Za-z][A-Za-z .'-]*?)"
+        rf"(?=\s+(?:{_STOP_WORDS})\b|\s*[,.!?;:()]|\s+\d|\s*$)",
+        re.IGNORECASE,
+    ),
+    # "goa trip 5 days", "Kerala itinerary"
+    re.compile(
+        r"^\s*(?P<dest>[A-Za-z][A-Za-z .'-]*?)\s+"
+        r"(?:trip|tour|travel|itinerary|vacation|holiday)\b",
+        re.IGNORECASE,
+    ),
+]
+
+_DAYS_PATTERN = re.compile(r"\b(\d{1,2})\s*-?\s*(?:day|days|night|nights)\b", re.IGNORECASE)
+_WEEKS_PATTERN = re.compile(r"\b(\d{1,2}|a|one|two)\s*-?\s*weeks?\b", re.IGNORECASE)
+_WEEKEND_PATTERN = re.compile(r"\bweekend\b", re.IGNORECASE)
+
+_BUDGET_PATTERN = re.compile(
+    r"(?:budget|under|within|upto|up to|max(?:imum)?)\s*(?:of\s*)?"
+    r"(?P<cur>[₹$€£]|rs\.?|inr|usd|eur|gbp)?\s*"
+    r"(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?P<k>k|lakh|lakhs)?\s*"
+    r"(?P<cur_after>inr|usd|eur|gbp|rupees|dollars|euros)?",
+    re.IGNORECASE,
+)
+
+_CURRENCY_CODES = {
+    "₹": "INR", "rs": "INR", "rs.": "INR", "inr": "INR", "rupees": "INR",
+    "$": "USD", "usd": "USD", "dollars": "USD",
+    "€": "EUR", "eur": "EUR", "euros": "EUR",
+    "£": "GBP", "gbp": "GBP",
+}
+
+_LEADING_FILLER = re.compile(
+    r"^(?:the|a|an|plan|create|make|my|our|"
+    # "to go to New York", "to travel to Bali", "to visit Paris"
+    r"go|going|travel(?:l?ing)?|fly(?:ing)?|head(?:ing)?|visit(?:ing)?|explore|exploring|"
+    r"tour(?:ing)?|see|spend|stay(?:ing)?)\s+(?:(?:to|in|around)\s+)?",
+    re.IGNORECASE,
+)
+_NOT_DESTINATIONS = {
+    "a", "an", "the", "me", "us", "my", "plan", "budget", "trip", "family", "solo",
+    "go", "do", "see", "eat", "stay", "travel", "visit", "book", "get", "make",
+    "day", "days", "week", "weeks", "weekend", "month", "months", "night", "nights",
+    "two", "couple", "friends", "kids", "people", "everyone", "honeymoon",
+}
+
+
+class TripRequest(BaseModel):
+    destination: Optional[str] = None
+    days: Optional[int] = None
+    budget: Optional[float] = None
+    currency: Optional[str] = None
+
+
+def parse_trip_request(text: str) -> TripRequest:
+    """Cheap rule-based extraction of destination, duration and budget."""
+    request = TripRequest()
+
+    for match in (m for pattern in _DESTINATION_PATTERNS for m in pattern.finditer(text)):
+        destination = match.group("dest").strip(" .'-")
+        while _LEADING_FILLER.match(destination):
+            destination = _LEADING_FILLER.sub("", destination, count=1)
+
+        if len(destination) > 1 and destination.lower() not in _NOT_DESTINATIONS:
+            request.destination = destination
+            break
+
+    days = _DAYS_PATTERN.search(text)
+    weeks = _WEEKS_PATTERN.search(text)
+    if days:
+        request.days = int(days.group(1))
+    elif weeks:
+        count = weeks.group(1).lower()
+        request.days = 7 * (int(count) if count.isdigit() else {"a": 1, "one": 1, "two": 2}[count])
+    elif _WEEKEND_PATTERN.search(text):
+        request.days = 2
+
+    budget = _BUDGET_PATTERN.search(text)
+    if budget:
+        amount = float(budget.group("amount").replace(",", ""))
+        multiplier = (budget.group("k") or "").lower()
+        if multiplier == "k":
+            amount *= 1_000
+        elif multiplier.startswith("lakh"):
+            amount *= 100_000
+
+        request.budget = amount
+        currency = (budget.group("cur") or budget.group("cur_after") or "").lower()
+        request.currency = _CURRENCY_CODES.get(currency)
+
+    return request
+
+
+def trip_signature(text: str) -> tuple:
+    """Structural fingerprint of a query: (destination, days, budget, currency)."""
+    trip = parse_trip_request(text)
+    destination = " ".join(trip.destination.lower().split()) if trip.destination else None
+    return (destination, trip.days, trip.budget, trip.currency)
+
+
+class DataPrefetcher:
+    """Graph node that speculatively fetches destination data before the first LLM turn.
+
+    The results are injected as a synthetic tool-calling `AIMessage` followed
+    by its `ToolMessage`s, so the LLM sees them exactly as if it had asked for
+    them and can often answer without further tool round-trips. In a
+    session, each turn is prefetched, skipping calls an earlier turn made.
+    """
+
+    def __init__(self, tool_executor: ToolExecutor, enabled: bool = True):
+        self.tool_executor = tool_executor
+        self.enabled = enabled
+        self.tool_names = [
+            name for name in PREFETCH_TOOLS if name in tool_executor.tools_by_name
+        ]
+
+    @classmethod
+    def from_config(cls, tool_executor: ToolExecutor, prefetch_config: Optional[dict]) -> "DataPrefetcher":
+        """Build a prefetcher from the `prefetch` section of config.yaml."""
+        prefetch_config = prefetch_config or {}
+        return cls(tool_executor, enabled=bool(prefetch_config.get("enabled", True)))
+
+    def _plan(self, state: MessagesState) -> Optional[AIMessage]:
+        """Build the synthetic tool-call message, or None to skip prefetching."""
+        if not self.enabled or not self.tool_names:
+            return None
+
+        messages = state.get("messages", [])
+        turn = max(
+            (i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=None
+        )
+        # Only the start of a turn is prefetched (later turns of a session too).
+        if turn is None or any(isinstance(m, ToolMessage) for m in messages[turn:]):
+            return None
+        last_human = messages[turn]
+
+        trip = parse_trip_request(str(last_human.content))
+        if not trip.destination:
+            return None
+
+        # In a session, data fetched in earlier turns is already in the history
+        # (failed lookups are fetched again).
+        succeeded = {
+            m.tool_call_id for m in messages[:turn]
+            if isinstance(m, ToolMessage) and not is_failed_result(m)
+        }
+        answered = {
+            tool_call_key(call["name"], call["args"])
+            for m in messages[:turn] if isinstance(m, AIMessage)
+            for call in m.tool_calls if call["id"] in succeeded
+        }
+        names = [
+            name for name in self.tool_names
+            if tool_call_key(name, {PREFETCH_TOOLS[name]: trip.destination}) not in answered
+        ]
+        if not names:
+            return None
+
+        details = [f"destination={trip.destination}"]
+        if trip.days:
+            details.append(f"days={trip.days}")
+        if trip.budget:
+            details.append(f"budget={trip.budget:g} {trip.currency or ''}".strip())
+
+        return AIMessage(
+            content=f"Prefetching destination data ({', '.join(details)}).",
+            tool_calls=[
+                {
+                    "name": name,
+                    "args": {PREFETCH_TOOLS[name]: trip.destination},
+                    # Unique per turn: a session keeps earlier turns' calls.
+                    "id": f"prefetch_{turn}_{name}",
+                    "type": "tool_call",
+                }
+                for name in names
+            ],
+        )
+
+    @staticmethod
+    def _output(request: AIMessage, results: dict) -> dict:
+        return {"messages": [request, *results["messages"]]}
+
+    def run(self, state: MessagesState, config: RunnableConfig):
+        request = self._plan(state)
+        if request is None:
+            return {"messages": []}
+
+        results = self.tool_executor.run({"messages": [request]}, config)
+        return self._output(request, results)
+
+    async def arun(self, state: MessagesState, config: RunnableConfig):
+        request = self._plan(state)
+        if request is None:
+            return {"messages": []}
+
+        results = await self.tool_executor.arun({"messages": [request]}, config)
+        return self._output(request, results)
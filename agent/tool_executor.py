@@ -0,0 +1,470 @@
+import asyncio
+import contextvars
+import json
+import threading
+import time
+import weakref
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import MessagesState
+from logger.logging import get_logger
+from utils.cache import normalize_key
+from utils.singleflight import SingleFlight
+from utils.telemetry import mark_failed, record_tool_call, span
+from utils.thread_pool import get_executor
+
+
+log = get_logger("tools")
+
+
+# Which upstream each tool talks to. Concurrency is capped per provider so a
+# burst of tool calls cannot exceed one API's rate limit.
+TOOL_PROVIDERS = {
+    "get_current_weather": "openweather",
+    "get_weather_forecast": "openweather",
+    "search_attractions": "places",
+    "search_restaurants": "places",
+    "search_activities": "places",
+    "search_transportation": "places",
+    "convert_currency": "exchangerate",
+    "estimate_total_hotel_cost": "local",
+    "calculate_total_expense": "local",
+    "calculate_daily_expense_budget": "local",
+}
+
+DEFAULT_PROVIDER_CONCURRENCY = {
+    "openweather": 8,
+    "places": 4,
+    "exchangerate": 8,
+    "local": 32,
+}
+
+DEFAULT_TOOL_TIMEOUT = 15.0
+DEFAULT_REQUEST_DEADLINE = 90.0
+
+DEADLINE_KEY = "deadline"
+TOOL_RESULTS_KEY = "tool_results"
+
+
+# How the weather tools reported failures before they raised; such results
+# may still sit in checkpointed sessions with an "ok" status.
+LEGACY_FAILURE_PREFIXES = ("Failed to fetch ", "Could not fetch ")
+
+
+def is_failed_result(message: ToolMessage) -> bool:
+    """True for a tool result that must not be reused or cached."""
+    if message.status == "error":
+        return True
+    content = message.content if isinstance(message.content, str) else ""
+    return content.startswith(LEGACY_FAILURE_PREFIXES)
+
+
+def has_failed_results(messages: List) -> bool:
+    """True if any tool result in `messages` failed (see `is_failed_result`)."""
+    return any(isinstance(m, ToolMessage) and is_failed_result(m) for m in messages)
+
+
+def tool_call_key(name: str, args: dict) -> str:
+    """Identity of a tool call: name plus case/punctuation-normalized arguments."""
+    normalized = {
+        k: normalize_key(v) if isinstance(v, str) else v
+        for k, v in (args or {}).items()
+    }
+    return f"{name}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+class ToolResultMemo:
+    """Successful tool results shared by every graph run of one batch, by call key.
+
+    Unlike single-flight, which only joins calls that overlap in time, this
+    keeps results for the life of the batch - one forecast per city serves
+    every plan for that city.
+    """
+
+    def __init__(self):
+        self._results: Dict[str, ToolMessage] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, key: str) -> Optional[ToolMessage]:
+        with self._lock:
+            message = self._results.get(key)
+            if message is not None:
+                self.hits += 1
+            return message
+
+    def put(self, key: str, message: ToolMessage) -> None:
+        if is_failed_result(message):
+            return
+        with self._lock:
+            self._results.setdefault(key, message)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"results": len(self._results), "hits": self.hits}
+
+
+def deadline_config(seconds: float = DEFAULT_REQUEST_DEADLINE,
+                    tool_results: Optional[ToolResultMemo] = None) -> dict:
+    """Graph config carrying an absolute request deadline shared by all tool turns.
+
+    `tool_results` shares tool results between the runs of one batch.
+    """
+    configurable = {DEADLINE_KEY: time.monotonic() + seconds}
+    if tool_results is not None:
+        configurable[TOOL_RESULTS_KEY] = tool_results
+    return {"configurable": configurable}
+
+
+class _ProviderLimiter:
+    """Per-provider concurrency caps usable from both threads and event loops."""
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = dict(limits)
+        self._thread_semaphores = {
+            name: threading.BoundedSemaphore(limit) for name, limit in self.limits.items()
+        }
+        # asyncio semaphores are bound to the loop they are first used on.
+        self._async_semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def limit_for(self, provider: str) -> int:
+        return self.limits.get(provider, DEFAULT_PROVIDER_CONCURRENCY["local"])
+
+    def thread_semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        if provider not in self._thread_semaphores:
+            self._thread_semaphores[provider] = threading.BoundedSemaphore(
+                self.limit_for(provider)
+            )
+        return self._thread_semaphores[provider]
+
+    def async_semaphore(self, provider: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores = self._async_semaphores.setdefault(loop, {})
+        if provider not in semaphores:
+            semaphores[provider] = asyncio.Semaphore(self.limit_for(provider))
+        return semaphores[provider]
+
+
+class ToolExecutor:
+    """Graph node that runs every tool call of one LLM turn concurrently.
+
+    Each call gets its own timeout, is capped by its provider's concurrency
+    limit, and never outlives the request deadline carried in the graph
+    config. A slow or failing call comes back as a structured error
+    `ToolMessage` instead of stalling the whole turn.
+
+    With `dedupe` on, identical calls (same tool and normalized arguments)
+    that are in flight at the same time - within one turn or across
+    concurrent requests - share a single execution, and a call already
+    answered earlier in the same run or session (or, with a
+    `ToolResultMemo` in the config, anywhere in the same batch) reuses
+    that result.
+    """
+
+    def __init__(
+        self,
+        tools: List,
+        provider_concurrency: Optional[Dict[str, int]] = None,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = DEFAULT_TOOL_TIMEOUT,
+        request_deadline: float = DEFAULT_REQUEST_DEADLINE,
+        dedupe: bool = True,
+    ):
+        self.tools_by_name = {t.name: t for t in tools}
+        self.limiter = _ProviderLimiter(
+            {**DEFAULT_PROVIDER_CONCURRENCY, **(provider_concurrency or {})}
+        )
+        self.tool_timeouts = dict(tool_timeouts or {})
+        self.default_timeout = default_timeout
+        self.request_deadline = request_deadline
+        self.dedupe = dedupe
+        self.singleflight = SingleFlight()
+        self._reused = 0
+        self._reused_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, tools: List, tools_config: Optional[dict]) -> "ToolExecutor":
+        """Build an executor from the `tools` section of config.yaml."""
+        tools_config = tools_config or {}
+        return cls(
+            tools,
+            provider_concurrency=tools_config.get("provider_concurrency"),
+            tool_timeouts=tools_config.get("timeouts"),
+            default_timeout=float(
+                tools_config.get("default_timeout_seconds", DEFAULT_TOOL_TIMEOUT)
+            ),
+            request_deadline=float(
+                tools_config.get("request_deadline_seconds", DEFAULT_REQUEST_DEADLINE)
+            ),
+            dedupe=bool(tools_config.get("dedupe", True)),
+        )
+
+    # ---------------------------
+    # Helpers
+    # ---------------------------
+    @staticmethod
+    def _tool_calls(state: MessagesState) -> list:
+        messages = state.get("messages", [])
+        if not messages or not isinstance(messages[-1], AIMessage):
+            raise ValueError("No AIMessage with tool calls found in state")
+        return messages[-1].tool_calls
+
+    def _previous_results(self, state: MessagesState) -> Dict[str, ToolMessage]:
+        """Successful results of earlier tool calls in this run (or session), by call key."""
+        if not self.dedupe:
+            return {}
+
+        messages = state.get("messages", [])
+        calls = {}
+        for message in messages[:-1]:
+            if isinstance(message, AIMessage):
+                for call in message.tool_calls:
+                    calls[call["id"]] = tool_call_key(call["name"], call["args"])
+
+        return {
+            calls[m.tool_call_id]: m
+            for m in messages
+            if isinstance(m, ToolMessage) and m.tool_call_id in calls and not is_failed_result(m)
+        }
+
+    def _reuse(self, call: dict, previous: ToolMessage) -> ToolMessage:
+        with self._reused_lock:
+            self._reused += 1
+
+        message = self._readdress(previous, call)
+        message.response_metadata = {
+            **(previous.response_metadata or {}), "latency_ms": 0.0, "status": "reused",
+        }
+        return message
+
+    @staticmethod
+    def _readdress(message: ToolMessage, call: dict) -> ToolMessage:
+        """A copy of a (possibly shared) result answering this caller's tool call.
+
+        The copy gets a fresh message id: `add_messages` replaces a message
+        whose id is already in the history instead of appending it, which
+        would drop the earlier call's answer.
+        """
+        return message.model_copy(update={"tool_call_id": call["id"], "id": None})
+
+    def stats(self) -> dict:
+        """Coalescing counters: executions, calls that shared one, and reuses."""
+        with self._reused_lock:
+            reused = self._reused
+        return {**self.singleflight.stats(), "reused": reused}
+
+    def _memo(self, config: Optional[RunnableConfig]) -> Optional[ToolResultMemo]:
+        if not self.dedupe:
+            return None
+        return (config or {}).get("configurable", {}).get(TOOL_RESULTS_KEY)
+
+    def _deadline(self, config: Optional[RunnableConfig]) -> float:
+        configurable = (config or {}).get("configurable", {})
+        return configurable.get(DEADLINE_KEY) or time.monotonic() + self.request_deadline
+
+    def _budget(self, name: str, deadline: float) -> float:
+        """Seconds this call may take: its own timeout, capped by the deadline."""
+        timeout = float(self.tool_timeouts.get(name, self.default_timeout))
+        return max(0.0, min(timeout, deadline - time.monotonic()))
+
+    @staticmethod
+    def _error_message(call: dict, status: str, detail: str) -> ToolMessage:
+        return ToolMessage(
+            content=json.dumps({"status": status, "tool": call["name"], "detail": detail}),
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    @staticmethod
+    def _with_latency(message: ToolMessage, started: float, status: str) -> ToolMessage:
+        latency_ms = round((time.monotonic() - started) * 1000, 1)
+        message.response_metadata = {
+            **(message.response_metadata or {}),
+            "latency_ms": latency_ms,
+            "status": status,
+        }
+        return message
+
+    @staticmethod
+    def _span(name: str):
+        return span(f"tool {name}", **{
+            "tool.name": name,
+            "tool.provider": TOOL_PROVIDERS.get(name, "local"),
+        })
+
+    @staticmethod
+    def _end_span(current, message: ToolMessage) -> None:
+        if current is None:
+            return
+        status = message.response_metadata.get("status")
+        current.set_attribute("tool.status", status)
+        if message.status == "error":
+            mark_failed(current, status)
+
+    def _report(self, results: List[ToolMessage]) -> None:
+        for m in results:
+            record_tool_call(
+                m.name, m.response_metadata.get("status"), m.response_metadata.get("latency_ms")
+            )
+
+        summary = ", ".join(
+            f"{m.name}={m.response_metadata.get('latency_ms')}ms"
+            f"({m.response_metadata.get('status')})"
+            for m in results
+        )
+        log.info("🔧 Tool turn: %s", summary)
+
+    # ---------------------------
+    # Async path
+    # ---------------------------
+    async def _arun_one(self, call: dict, deadline: float, config: RunnableConfig) -> ToolMessage:
+        started = time.monotonic()
+        name = call["name"]
+        tool = self.tools_by_name.get(name)
+
+        if tool is None:
+            message = self._error_message(
+                call, "error",
+                f"{name} is not a valid tool, try one of [{', '.join(self.tools_by_name)}]",
+            )
+            return self._with_latency(message, started, "error")
+
+        budget = self._budget(name, deadline)
+        if budget <= 0:
+            message = self._error_message(call, "timed_out", "request deadline exceeded")
+            return self._with_latency(message, started, "timed_out")
+
+        semaphore = self.limiter.async_semaphore(TOOL_PROVIDERS.get(name, "local"))
+
+        async def _invoke():
+            async with semaphore:
+                return await tool.ainvoke({**call, "type": "tool_call"}, config)
+
+        async def _coalesced():
+            if not self.dedupe:
+                return await _invoke()
+            return await self.singleflight.ado(tool_call_key(name, call["args"]), _invoke)
+
+        try:
+            message = await asyncio.wait_for(_coalesced(), timeout=budget)
+            return self._with_latency(self._readdress(message, call), started, "ok")
+
+        except asyncio.TimeoutError:
+            message = self._error_message(
+                call, "timed_out", f"no response within {budget:.1f}s"
+            )
+            return self._with_latency(message, started, "timed_out")
+
+        except Exception as e:
+            message = self._error_message(call, "error", str(e))
+            return self._with_latency(message, started, "error")
+
+    async def arun(self, state: MessagesState, config: RunnableConfig):
+        deadline = self._deadline(config)
+        previous = self._previous_results(state)
+        memo = self._memo(config)
+
+        async def _one(call: dict) -> ToolMessage:
+            key = tool_call_key(call["name"], call["args"])
+            reusable = previous.get(key) or (memo.get(key) if memo is not None else None)
+            if reusable is not None:
+                return self._reuse(call, reusable)
+
+            with self._span(call["name"]) as current:
+                message = await self._arun_one(call, deadline, config)
+                self._end_span(current, message)
+            if memo is not None:
+                memo.put(key, message)
+            return message
+
+        results = await asyncio.gather(*(_one(call) for call in self._tool_calls(state)))
+        self._report(results)
+        return {"messages": list(results)}
+
+    # ---------------------------
+    # Sync path
+    # ---------------------------
+    def _run_one_blocking(self, call: dict, config: RunnableConfig, budget: float):
+        started = time.monotonic()
+        tool = self.tools_by_name[call["name"]]
+        semaphore = self.limiter.thread_semaphore(TOOL_PROVIDERS.get(call["name"], "local"))
+
+        def _invoke():
+            if not semaphore.acquire(timeout=budget):
+                raise FutureTimeoutError()
+            try:
+                return tool.invoke({**call, "type": "tool_call"}, config)
+            finally:
+                semaphore.release()
+
+        with self._span(call["name"]) as current:
+            if self.dedupe:
+                message = self.singleflight.do(tool_call_key(call["name"], call["args"]), _invoke)
+            else:
+                message = _invoke()
+
+            message = self._with_latency(self._readdress(message, call), started, "ok")
+            self._end_span(current, message)
+            return message
+
+    def run(self, state: MessagesState, config: RunnableConfig):
+        deadline = self._deadline(config)
+        calls = self._tool_calls(state)
+        previous = self._previous_results(state)
+        memo = self._memo(config)
+        started = time.monotonic()
+        results: List[Optional[ToolMessage]] = [None] * len(calls)
+        futures = {}
+
+        for i, call in enumerate(calls):
+            if call["name"] not in self.tools_by_name:
+                message = self._error_message(
+                    call, "error",
+                    f"{call['name']} is not a valid tool, "
+                    f"try one of [{', '.join(self.tools_by_name)}]",
+                )
+                results[i] = self._with_latency(message, started, "error")
+                continue
+
+            key = tool_call_key(call["name"], call["args"])
+            reusable = previous.get(key) or (memo.get(key) if memo is not None else None)
+            if reusable is not None:
+                results[i] = self._reuse(call, reusable)
+                continue
+
+            budget = self._budget(call["name"], deadline)
+            # Copy the context so the tool's span nests under the node's.
+            futures[i] = (
+                get_executor().submit(
+                    contextvars.copy_context().run, self._run_one_blocking, call, config, budget
+                ),
+                budget,
+            )
+
+        for i, (future, budget) in futures.items():
+            call = calls[i]
+            remaining = max(0.0, budget - (time.monotonic() - started))
+            try:
+                results[i] = future.result(timeout=remaining)
+
+            except FutureTimeoutError:
+                # The worker thread cannot be interrupted; its result is dropped.
+                message = self._error_message(
+                    call, "timed_out", f"no response within {budget:.1f}s"
+                )
+                results[i] = self._with_latency(message, started, "timed_out")
+
+            except Exception as e:
+                message = self._error_message(call, "error", str(e))
+                results[i] = self._with_latency(message, started, "error")
+
+        if memo is not None:
+            for i in futures:
+                memo.put(tool_call_key(calls[i]["name"], calls[i]["args"]), results[i])
+
+        self._report(results)
+        return {"messages": results}
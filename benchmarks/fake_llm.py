@@ -0,0 +1,259 @@
+"""Deterministic chat model that replays a scripted ReAct conversation.
+
+Selected with `MODEL_PROVIDER=fake` (settings under `llm.fake`, per-role
+overrides under `llm.roles.fake`). Each agent step after the user's
+message gets the next scripted tool-call turn; once the turns run out
+the model writes a fixed-length itinerary. Latency is simulated per
+token, so streaming, time to first token and the router/synthesizer
+split behave like a real provider without any network calls. Like the
+real APIs, it rejects a history whose tool calls and ToolMessages do
+not pair up, so the benchmarks fail on such a regression.
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from agent.prefetch import parse_trip_request
+
+
+DEFAULT_FIRST_TOKEN_MS = 150.0
+DEFAULT_TOKEN_LATENCY_MS = 2.0
+DEFAULT_ANSWER_TOKENS = 350
+CALL_ID_PREFIX = "scripted"
+
+# Values for `{destination}`, `{days}` and `{budget}` when the query has none.
+DEFAULT_FIELDS = {"destination": "Goa", "days": 3, "budget": 1000}
+
+# The prefetch node has already fetched weather and places for the
+# destination; the model asks for a few of them again (answered from the
+# run's tool results) and then works out the costs.
+DEFAULT_SCRIPT = {
+    "turns": [
+        [
+            {"name": "search_attractions", "args": {"place": "{destination}"}},
+            {"name": "convert_currency",
+             "args": {"amount": "{budget}", "from_currency": "USD", "to_currency": "EUR"}},
+            {"name": "estimate_total_hotel_cost", "args": {"price_per_night": 80, "total_days": "{days}"}},
+        ],
+        [
+            {"name": "calculate_total_expense", "args": {"costs": [240, 180, 120, 60]}},
+            {"name": "calculate_daily_expense_budget", "args": {"total_cost": "{budget}", "days": "{days}"}},
+        ],
+    ],
+    "answer_tokens": DEFAULT_ANSWER_TOKENS,
+}
+
+_PLACEHOLDER = re.compile(r"^\{(\w+)\}$")
+_FILLER = (
+    "Start the morning early near the old quarter, walk to the main sights, "
+    "stop for a local lunch, then spend the afternoon at the waterfront before "
+    "dinner at a well-rated restaurant within the daily budget."
+).split()
+
+
+def _fill(value, fields: dict):
+    """Substitute query fields into scripted arguments, keeping their types."""
+    if isinstance(value, str):
+        match = _PLACEHOLDER.match(value)
+        if match and match.group(1) in fields:
+            return fields[match.group(1)]
+        return value.format_map(fields)
+    if isinstance(value, list):
+        return [_fill(item, fields) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, fields) for key, item in value.items()}
+    return value
+
+
+def _human_messages(messages: List[BaseMessage]) -> List[HumanMessage]:
+    return [m for m in messages if isinstance(m, HumanMessage)]
+
+
+def _query_fields(messages: List[BaseMessage]) -> dict:
+    query = next(reversed(_human_messages(messages)), None)
+    trip = parse_trip_request(str(query.content) if query else "")
+    fields = dict(DEFAULT_FIELDS)
+    fields.update({k: v for k, v in trip.model_dump().items() if v is not None})
+    return fields
+
+
+def _turn(messages: List[BaseMessage]) -> int:
+    """Scripted turns already taken since the user's last message."""
+    taken = 0
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        for call in getattr(message, "tool_calls", None) or []:
+            parts = str(call.get("id") or "").split("_")
+            if parts[0] == CALL_ID_PREFIX and len(parts) == 4 and parts[2].isdigit():
+                taken = max(taken, int(parts[2]) + 1)
+    return taken
+
+
+def check_tool_history(messages: List[BaseMessage]) -> None:
+    """Reject a history the way the Groq/OpenAI chat APIs do (HTTP 400).
+
+    The tool calls of an AIMessage must each be answered, once, by the
+    ToolMessages that directly follow it; a ToolMessage anywhere else is
+    invalid.
+    """
+    pending = set()
+    for i, message in enumerate(messages):
+        if isinstance(message, ToolMessage):
+            if message.tool_call_id not in pending:
+                raise ValueError(
+                    f"Invalid history: message {i} answers tool call "
+                    f"'{message.tool_call_id}', which the preceding AIMessage did not make"
+                )
+            pending.discard(message.tool_call_id)
+            continue
+
+        if pending:
+            raise ValueError(
+                f"Invalid history: tool call(s) {sorted(pending)} have no ToolMessage "
+                f"before message {i}"
+            )
+        if isinstance(message, AIMessage):
+            pending = {call["id"] for call in message.tool_calls}
+
+    if pending:
+        raise ValueError(f"Invalid history: tool call(s) {sorted(pending)} have no ToolMessage")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Replays `script` turns with simulated first-token and per-token latency."""
+
+    model_name: str = "scripted"
+    script: dict = DEFAULT_SCRIPT
+    first_token_ms: float = DEFAULT_FIRST_TOKEN_MS
+    token_latency_ms: float = DEFAULT_TOKEN_LATENCY_MS
+    max_tokens: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, fake_config: Optional[dict]) -> "ScriptedChatModel":
+        """Build from `llm.fake` merged with the role's `llm.roles.fake.<role>`."""
+        fake_config = fake_config or {}
+        return cls(
+            model_name=fake_config.get("model_name", "scripted"),
+            script=fake_config.get("script") or DEFAULT_SCRIPT,
+            first_token_ms=float(fake_config.get("first_token_ms", DEFAULT_FIRST_TOKEN_MS)),
+            token_latency_ms=float(fake_config.get("token_latency_ms", DEFAULT_TOKEN_LATENCY_MS)),
+            max_tokens=fake_config.get("max_tokens"),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs) -> "ScriptedChatModel":
+        # The script decides which tools are called.
+        return self
+
+    # ---------------------------
+    # Script
+    # ---------------------------
+    def _answer_tokens(self, fields: dict) -> List[str]:
+        count = int(self.script.get("answer_tokens", DEFAULT_ANSWER_TOKENS))
+        if self.max_tokens:
+            count = min(count, int(self.max_tokens))
+
+        tokens = f"# {fields['days']}-day trip to {fields['destination']}\n".split(" ")
+        day = 0
+        while len(tokens) < count:
+            day += 1
+            tokens.append(f"\n## Day {day}\n")
+            tokens.extend(_FILLER)
+        return [token if token.endswith("\n") else token + " " for token in tokens[:count]]
+
+    def _reply(self, messages: List[BaseMessage]):
+        """The next message, plus the tokens it is "generated" as."""
+        check_tool_history(messages)
+        fields = _query_fields(messages)
+        turn = _turn(messages)
+        turns = self.script.get("turns") or []
+
+        if turn < len(turns):
+            tool_calls = [
+                {
+                    "name": call["name"],
+                    "args": _fill(call.get("args") or {}, fields),
+                    # Unique within a session: <prefix>_<user message>_<turn>_<call>.
+                    "id": f"{CALL_ID_PREFIX}_{len(_human_messages(messages))}_{turn}_{i}",
+                    "type": "tool_call",
+                }
+                for i, call in enumerate(turns[turn])
+            ]
+            # Roughly four characters per token of tool-call JSON.
+            size = max(1, len(json.dumps([c["args"] for c in tool_calls])) // 4)
+            return AIMessage(content="", tool_calls=tool_calls), size, None
+
+        tokens = self._answer_tokens(fields)
+        return AIMessage(content="".join(tokens)), len(tokens), tokens
+
+    def _usage(self, messages: List[BaseMessage], output_tokens: int) -> dict:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _latency(self, output_tokens: int) -> float:
+        return (self.first_token_ms + self.token_latency_ms * max(0, output_tokens - 1)) / 1000
+
+    # ---------------------------
+    # BaseChatModel
+    # ---------------------------
+    def _result(self, messages: List[BaseMessage], message: AIMessage, size: int) -> ChatResult:
+        message.usage_metadata = self._usage(messages, size)
+        message.response_metadata = {"model_name": self.model_name}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        message, size, _ = self._reply(messages)
+        time.sleep(self._latency(size))
+        return self._result(messages, message, size)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        message, size, _ = self._reply(messages)
+        await asyncio.sleep(self._latency(size))
+        return self._result(messages, message, size)
+
+    def _chunks(self, messages: List[BaseMessage], message: AIMessage, size: int, tokens):
+        """(delay before it, chunk) pairs; usage rides on the last chunk."""
+        if tokens is None:
+            chunk = AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ])
+            delays = [self._latency(size)]
+            chunks = [chunk]
+        else:
+            delays = [self.first_token_ms / 1000] + [self.token_latency_ms / 1000] * (len(tokens) - 1)
+            chunks = [AIMessageChunk(content=token) for token in tokens]
+
+        chunks[-1].usage_metadata = self._usage(messages, size)
+        chunks[-1].response_metadata = {"model_name": self.model_name}
+        for delay, chunk in zip(delays, chunks):
+            yield delay, ChatGenerationChunk(message=chunk)
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        message, size, tokens = self._reply(messages)
+        for delay, chunk in self._chunks(messages, message, size, tokens):
+            time.sleep(delay)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        message, size, tokens = self._reply(messages)
+        for delay, chunk in self._chunks(messages, message, size, tokens):
+            await asyncio.sleep(delay)
+            yield chunk
@@ -0,0 +1,425 @@
+"""Run the offline benchmark suite and compare it with the stored baseline.
+
+    python -m benchmarks                          # all scenarios, compare with baseline.json
+    python -m benchmarks --scenario single        # one scenario (repeatable)
+    python -m benchmarks --save-baseline          # record the current numbers
+
+Each scenario level starts stub upstreams and a fresh uvicorn server
+(`MODEL_PROVIDER=fake`, config from benchmark.yaml merged over
+config/config.yaml), drives it with concurrent clients and reports
+latency percentiles, throughput and the server's memory. The exit code
+is 1 when a metric regresses beyond `tolerances`.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+import yaml
+
+from benchmarks.stubs import start_stubs
+from utils.config_loader import PROJECT_ROOT, load_config
+
+
+SUITE_PATH = PROJECT_ROOT / "benchmarks" / "benchmark.yaml"
+BASELINE_PATH = PROJECT_ROOT / "benchmarks" / "baseline.json"
+READY_TIMEOUT = 120
+REQUEST_TIMEOUT = 300
+ADMIN_KEY = "benchmark"
+
+# Credentials the tools insist on; the stubs ignore them. Google's client
+# rejects keys without the usual prefix.
+FAKE_CREDENTIALS = {
+    "OPENWEATHERMAP_API_KEY": "benchmark",
+    "EXCHANGE_RATE_API_KEY": "benchmark",
+    "ALPHAVANTAGE_API_KEY": "benchmark",
+    "GPLACES_API_KEY": "AIza-benchmark",
+    "TAVILY_API_KEY": "tvly-benchmark",
+}
+
+# (metric, direction, tolerance name): direction 1 means higher is worse.
+COMPARED_METRICS = [
+    ("p50_ms", 1, "latency"),
+    ("p95_ms", 1, "latency"),
+    ("p99_ms", 1, "latency"),
+    ("ttfb_p95_ms", 1, "latency"),
+    ("throughput_rps", -1, "throughput"),
+    ("peak_rss_mb", 1, "memory"),
+    ("error_rate", 1, "error_rate"),
+]
+
+
+# ---------------------------
+# Configuration
+# ---------------------------
+def _merge(base: dict, override: dict) -> dict:
+    merged = dict(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _isolate_state(config: dict, directory: Path) -> None:
+    """Point every on-disk cache/queue/session/profile file into `directory`."""
+    for section in list(config.values()):
+        if not isinstance(section, dict):
+            continue
+        if "sqlite_path" in section:
+            section["sqlite_path"] = str(directory / Path(section["sqlite_path"]).name)
+        if "mmap" in section:
+            section["mmap"] = {**(section["mmap"] or {}), "directory": str(directory / "mmap")}
+        _isolate_state(section, directory)
+
+    if "profiling" in config:
+        config["profiling"]["directory"] = str(directory / "profiles")
+
+
+def build_app_config(suite: dict, scenario: dict, stubs: dict, directory: Path) -> dict:
+    config = _merge(copy.deepcopy(load_config()), suite.get("app") or {})
+    config["upstreams"] = {name: stub.url for name, stub in stubs.items()}
+    if not scenario.get("plan_cache", True):
+        config["cache"]["plans"]["enabled"] = False
+    _isolate_state(config, directory)
+    return config
+
+
+def build_queries(suite: dict, count: int) -> List[str]:
+    spec = suite["queries"]
+    destinations = spec["destinations"]
+    if count > len(destinations):
+        raise ValueError(f"{count} requests but only {len(destinations)} destinations in benchmark.yaml")
+
+    return [
+        spec["template"].format(
+            destination=destination,
+            days=spec["days"][i % len(spec["days"])],
+            budget=spec["budgets"][i % len(spec["budgets"])],
+        )
+        for i, destination in enumerate(destinations[:count])
+    ]
+
+
+# ---------------------------
+# Server under test
+# ---------------------------
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class AppServer:
+    """The API in its own uvicorn process, so its memory is measured alone."""
+
+    def __init__(self, config_path: Path, log_path: Path):
+        self.config_path = config_path
+        self.log_path = log_path
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process = None
+        self._log = None
+
+    def __enter__(self) -> "AppServer":
+        env = {
+            **os.environ,
+            **FAKE_CREDENTIALS,
+            "TRIP_PLANNER_CONFIG": str(self.config_path),
+            "MODEL_PROVIDER": "fake",
+            "ADMIN_API_KEY": ADMIN_KEY,
+            "PYTHONUNBUFFERED": "1",
+        }
+        env.pop("REDIS_URL", None)
+
+        self._log = open(self.log_path, "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=PROJECT_ROOT, env=env, stdout=self._log, stderr=subprocess.STDOUT,
+        )
+        self._wait_ready()
+        return self
+
+    def _wait_ready(self) -> None:
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                if httpx.get(f"{self.url}/ready", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+
+        self.__exit__()
+        tail = self.log_path.read_text()[-3000:]
+        raise RuntimeError(f"Benchmark server did not become ready:\n{tail}")
+
+    def memory(self) -> dict:
+        """Current and peak RSS in MB (Linux /proc; empty elsewhere)."""
+        try:
+            status = Path(f"/proc/{self.process.pid}/status").read_text()
+        except OSError:
+            return {}
+        fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+        to_mb = lambda name: round(int(fields[name].split()[0]) / 1024, 1)  # noqa: E731
+        return {"rss_mb": to_mb("VmRSS"), "peak_rss_mb": to_mb("VmHWM")}
+
+    def __exit__(self, *exc) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._log is not None:
+            self._log.close()
+
+
+# ---------------------------
+# Load
+# ---------------------------
+async def _request(client: httpx.AsyncClient, endpoint: str, query: str, client_id: str) -> dict:
+    headers = {"X-Client-ID": client_id}
+    started = time.perf_counter()
+    sample = {"status": None, "ttfb": None, "cached": False}
+    try:
+        if endpoint == "/query/stream":
+            async with client.stream("POST", endpoint, json={"query": query}, headers=headers) as response:
+                sample["status"] = response.status_code
+                async for line in response.aiter_lines():
+                    if line == "event: token" and sample["ttfb"] is None:
+                        sample["ttfb"] = time.perf_counter() - started
+                    elif line == "event: error":
+                        sample["status"] = "error"
+        else:
+            response = await client.post(endpoint, json={"query": query}, headers=headers)
+            sample["status"] = response.status_code
+            if response.status_code == 200:
+                sample["cached"] = bool(response.json().get("cached"))
+    except httpx.HTTPError as e:
+        sample["status"] = type(e).__name__
+    sample["latency"] = time.perf_counter() - started
+    return sample
+
+
+async def drive(url: str, endpoint: str, queries: List[str], concurrency: int):
+    """Send `queries` from `concurrency` clients; returns (samples, wall seconds)."""
+    pending = list(reversed(queries))
+    samples = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        async def worker(n: int) -> None:
+            while pending:
+                samples.append(await _request(client, endpoint, pending.pop(), f"bench-{n}"))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        return samples, time.perf_counter() - started
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    """Linear-interpolated percentile of sorted `values`, in ms."""
+    if not values:
+        return None
+    rank = (len(values) - 1) * p
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return round((values[low] + (values[high] - values[low]) * (rank - low)) * 1000, 1)
+
+
+def summarize(samples: List[dict], wall_seconds: float) -> dict:
+    ok = [s for s in samples if s["status"] == 200]
+    latencies = sorted(s["latency"] for s in ok)
+    ttfbs = sorted(s["ttfb"] for s in ok if s["ttfb"] is not None)
+    statuses = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+
+    summary = {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "error_rate": round((len(samples) - len(ok)) / len(samples), 3) if samples else 0.0,
+        "statuses": statuses,
+        "cache_hits": sum(1 for s in ok if s["cached"]),
+        "p50_ms": _percentile(latencies, 0.5),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+        "throughput_rps": round(len(ok) / wall_seconds, 2) if wall_seconds else 0.0,
+        "wall_seconds": round(wall_seconds, 2),
+    }
+    if ttfbs:
+        summary["ttfb_p50_ms"] = _percentile(ttfbs, 0.5)
+        summary["ttfb_p95_ms"] = _percentile(ttfbs, 0.95)
+    return summary
+
+
+# ---------------------------
+# Scenarios
+# ---------------------------
+def _request_count(scenario: dict, concurrency: int) -> int:
+    return scenario.get("requests") or concurrency * scenario.get("requests_per_client", 1)
+
+
+def run_level(suite: dict, scenario: dict, concurrency: int) -> dict:
+    queries = build_queries(suite, _request_count(scenario, concurrency))
+    endpoint = scenario.get("endpoint", "/query")
+    faults = _merge(suite.get("upstreams") or {}, scenario.get("upstreams") or {})
+
+    stubs = start_stubs(faults)
+    try:
+        with tempfile.TemporaryDirectory(prefix="trip-bench-") as tmp:
+            directory = Path(tmp)
+            config_path = directory / "config.yaml"
+            config_path.write_text(yaml.safe_dump(build_app_config(suite, scenario, stubs, directory)))
+
+            with AppServer(config_path, directory / "server.log") as server:
+                if scenario.get("warm"):
+                    asyncio.run(drive(server.url, endpoint, queries, concurrency))
+                idle_memory = server.memory()
+
+                samples, wall = asyncio.run(drive(server.url, endpoint, queries, concurrency))
+                result = summarize(samples, wall)
+                memory = server.memory()
+                result["rss_before_mb"] = idle_memory.get("rss_mb")
+                result["rss_mb"] = memory.get("rss_mb")
+                result["peak_rss_mb"] = memory.get("peak_rss_mb")
+    finally:
+        result_upstreams = {name: stub.stats() for name, stub in stubs.items()}
+        for stub in stubs.values():
+            stub.stop()
+
+    result["upstreams"] = result_upstreams
+    return result
+
+
+def run_scenario(suite: dict, name: str) -> dict:
+    scenario = suite["scenarios"][name]
+    levels = {}
+    for concurrency in scenario.get("concurrency", [1]):
+        print(f"⏱️  {name} @ concurrency {concurrency} ...", flush=True)
+        levels[str(concurrency)] = run_level(suite, scenario, int(concurrency))
+    return {"description": scenario.get("description", ""), "levels": levels}
+
+
+# ---------------------------
+# Baseline
+# ---------------------------
+def compare(results: dict, baseline: dict, suite: dict) -> List[str]:
+    """Human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    for name, scenario in results.items():
+        base_levels = (baseline.get(name) or {}).get("levels") or {}
+        tolerances = _merge(suite.get("tolerances") or {}, suite["scenarios"][name].get("tolerances") or {})
+        for level, metrics in scenario["levels"].items():
+            base = base_levels.get(level)
+            if base is None:
+                continue
+
+            for metric, direction, tolerance in COMPARED_METRICS:
+                current, previous = metrics.get(metric), base.get(metric)
+                if current is None or previous is None:
+                    continue
+
+                allowed = float(tolerances.get(tolerance, 0.0))
+                if tolerance == "error_rate":
+                    worse = current > previous + allowed
+                elif direction > 0:
+                    worse = current > previous * (1 + allowed)
+                    if tolerance == "latency":
+                        worse = worse and current - previous > float(tolerances.get("latency_slack_ms", 0))
+                else:
+                    worse = current < previous * (1 - allowed)
+
+                if worse:
+                    regressions.append(
+                        f"{name} @ {level}: {metric} {previous} -> {current} (tolerance {allowed:g})"
+                    )
+    return regressions
+
+
+def _print_report(results: dict) -> None:
+    header = (f"{'scenario':<20} {'conc':>4} {'reqs':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'ttfb95':>7} {'req/s':>7} {'hits':>5} {'rss MB':>7} {'peak MB':>8}")
+    print(header)
+    print("-" * len(header))
+    for name, scenario in results.items():
+        for level, m in scenario["levels"].items():
+            cells = [m["p50_ms"], m["p95_ms"], m["p99_ms"], m.get("ttfb_p95_ms")]
+            p50, p95, p99, ttfb = ("-" if c is None else f"{c:.0f}" for c in cells)
+            print(f"{name:<20} {level:>4} {m['requests']:>5} {m['errors']:>4} {p50:>8} {p95:>8} "
+                  f"{p99:>8} {ttfb:>7} {m['throughput_rps']:>7.2f} {m['cache_hits']:>5} "
+                  f"{m['rss_mb'] or '-':>7} {m['peak_rss_mb'] or '-':>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks")
+    parser.add_argument("--scenario", action="append", help="scenario to run (default: all)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write the results to --baseline instead of comparing")
+    parser.add_argument("--output", help="also write the full results as JSON here")
+    args = parser.parse_args(argv)
+
+    suite = yaml.safe_load(SUITE_PATH.read_text())
+    names = args.scenario or list(suite["scenarios"])
+    unknown = [name for name in names if name not in suite["scenarios"]]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    for name in names:
+        for concurrency in suite["scenarios"][name].get("concurrency", [1]):
+            build_queries(suite, _request_count(suite["scenarios"][name], int(concurrency)))
+
+    results = {name: run_scenario(suite, name) for name in names}
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scenarios": results,
+    }
+
+    print()
+    _print_report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        if baseline_path.exists():
+            # Keep the numbers of scenarios that were not re-run.
+            previous = json.loads(baseline_path.read_text()).get("scenarios", {})
+            report["scenarios"] = {**previous, **results}
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\n💾 Baseline saved to {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print(f"\n⚠️ No baseline at {baseline_path}; run with --save-baseline first")
+        return 0
+
+    regressions = compare(results, json.loads(baseline_path.read_text())["scenarios"], suite)
+    if regressions:
+        print("\n❌ Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print("\n✅ No regressions against the baseline")
+    return 0
@@ -0,0 +1,330 @@
+"""Local stand-ins for every third-party API the tools call.
+
+One threaded HTTP server per upstream (OpenWeather, ExchangeRate-API,
+Alpha Vantage, Google Places text search, Tavily) answering with
+deterministic, realistically sized payloads. Each server can inject
+latency (plus jitter), a share of `500` errors and a token-bucket rate
+limit that answers `429` with `Retry-After`. Point the app at them with
+the `upstreams` section of config.yaml:
+
+    python -m benchmarks.stubs --latency-ms 50
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import BaseModel
+
+
+# Path prefix each API lives under, as in its real base URL.
+BASE_PATHS = {
+    "openweather": "/data/2.5",
+    "exchangerate": "/v6",
+    "alphavantage": "",
+    "google_places": "",
+    "tavily": "",
+}
+
+# Units per US dollar.
+USD_RATES = {
+    "USD": 1.0, "EUR": 0.92, "GBP": 0.79, "INR": 83.2, "JPY": 151.4, "AUD": 1.52,
+    "CAD": 1.36, "CHF": 0.9, "CNY": 7.23, "SGD": 1.35, "AED": 3.67, "THB": 36.5,
+}
+
+_PLACE_IN_QUERY = re.compile(r"^.*\b(?:around|in) (.+)$")
+_WEATHER = ["clear sky", "few clouds", "scattered clouds", "light rain", "overcast clouds"]
+_PLACE_TYPES = [
+    ["tourist_attraction", "museum"], ["restaurant", "food"], ["park", "tourist_attraction"],
+    ["church", "place_of_worship"], ["cafe", "food"], ["transit_station", "bus_station"],
+]
+
+
+class Faults(BaseModel):
+    """What a stub does to each request besides answering it."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Share of requests answered with a 500.
+    error_rate: float = 0.0
+    # Token bucket; requests beyond it get 429 + Retry-After.
+    rate_limit_per_second: Optional[float] = None
+    burst: int = 10
+
+
+# ---------------------------
+# Payloads
+# ---------------------------
+def _rng(*parts) -> random.Random:
+    return random.Random(zlib.crc32(":".join(map(str, parts)).encode("utf-8")))
+
+
+def _openweather(endpoint: str, params: dict):
+    city = params.get("q", "Goa")
+    rng = _rng("weather", city)
+
+    def reading(hours: int) -> dict:
+        return {
+            "dt": 1767225600 + hours * 3600,
+            "dt_txt": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1767225600 + hours * 3600)),
+            "main": {"temp": round(rng.uniform(12, 34), 1), "humidity": rng.randint(30, 90)},
+            "weather": [{"description": rng.choice(_WEATHER)}],
+            "wind": {"speed": round(rng.uniform(0, 9), 1)},
+        }
+
+    if endpoint == "weather":
+        return 200, {"name": city, "cod": 200, **reading(0)}
+    if endpoint == "forecast":
+        return 200, {"cod": "200", "city": {"name": city}, "cnt": 40,
+                     "list": [reading(3 * i) for i in range(40)]}
+    return 404, {"cod": "404", "message": "not found"}
+
+
+def _exchangerate(base: str):
+    base = base.upper()
+    if base not in USD_RATES:
+        return 400, {"result": "error", "error-type": "unsupported-code"}
+    return 200, {
+        "result": "success",
+        "base_code": base,
+        "conversion_rates": {code: round(rate / USD_RATES[base], 6) for code, rate in USD_RATES.items()},
+    }
+
+
+def _alphavantage(params: dict):
+    source, target = params.get("from_currency", "USD"), params.get("to_currency", "EUR")
+    if source not in USD_RATES or target not in USD_RATES:
+        return 200, {"Error Message": "Invalid API call."}
+    return 200, {"Realtime Currency Exchange Rate": {
+        "1. From_Currency Code": source,
+        "3. To_Currency Code": target,
+        "5. Exchange Rate": f"{USD_RATES[target] / USD_RATES[source]:.6f}",
+    }}
+
+
+def _google_places(params: dict):
+    query = params.get("query", "")
+    rng = _rng("places", query)
+    match = _PLACE_IN_QUERY.match(query)
+    place = match.group(1) if match else "Goa"
+    results = []
+    for i in range(20):
+        results.append({
+            "name": f"{place} {rng.choice(['Old', 'Grand', 'Royal', 'Little', 'Central'])} "
+                    f"{rng.choice(['Fort', 'Market', 'Garden', 'Bistro', 'Gallery', 'Station'])} {i + 1}",
+            "place_id": f"stub-{zlib.crc32(query.encode('utf-8')):08x}-{i}",
+            "rating": round(rng.uniform(3.2, 4.9), 1),
+            "user_ratings_total": rng.randint(5, 40000),
+            "price_level": rng.randint(0, 4),
+            "formatted_address": f"{rng.randint(1, 200)} Main Rd, {place} {rng.randint(100000, 999999)}, Country",
+            "geometry": {"location": {"lat": round(rng.uniform(-60, 60), 6),
+                                      "lng": round(rng.uniform(-150, 150), 6)}},
+            "types": [*rng.choice(_PLACE_TYPES), "point_of_interest", "establishment"],
+            "business_status": "OPERATIONAL",
+        })
+    return 200, {"status": "OK", "results": results, "html_attributions": []}
+
+
+def _tavily(body: dict):
+    query = body.get("query", "")
+    rng = _rng("tavily", query)
+    sentence = f"Travellers recommend {query} for its food, history and walkable neighbourhoods. "
+    return 200, {
+        "query": query,
+        "answer": sentence * 3,
+        "results": [
+            {
+                "title": f"Top {rng.randint(5, 25)} picks: {query} - Travel Guide",
+                "url": f"https://guide.example/{zlib.crc32(query.encode('utf-8')):08x}/{i}",
+                "content": sentence * rng.randint(2, 6),
+                "score": round(rng.uniform(0.4, 0.95), 3),
+            }
+            for i in range(5)
+        ],
+        "response_time": 0.0,
+    }
+
+
+# ---------------------------
+# Server
+# ---------------------------
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def do_GET(self):
+        self.server.handle_request_from(self, "GET")
+
+    def do_POST(self):
+        self.server.handle_request_from(self, "POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """One upstream's stand-in; `start()` runs it in the background."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, upstream: str, faults: Optional[Faults] = None,
+                 host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        if upstream not in BASE_PATHS:
+            raise ValueError(f"Unknown upstream '{upstream}'. Known: {', '.join(BASE_PATHS)}")
+        super().__init__((host, port), _Handler)
+        self.upstream = upstream
+        self.faults = faults or Faults()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(self.faults.burst)
+        self._refilled = time.monotonic()
+        self._statuses: Dict[int, int] = {}
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{BASE_PATHS[self.upstream]}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(
+            target=self.serve_forever, name=f"stub-{self.upstream}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = dict(sorted(self._statuses.items()))
+        return {"requests": sum(statuses.values()), "statuses": statuses}
+
+    # ---------------------------
+    # Faults
+    # ---------------------------
+    def _admit(self) -> bool:
+        """Take a token from the bucket (always true without a rate limit)."""
+        rate = self.faults.rate_limit_per_second
+        if not rate:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.faults.burst, self._tokens + (now - self._refilled) * rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _roll(self) -> tuple:
+        """(seconds to wait, whether to fail) for one request."""
+        with self._lock:
+            jitter = self._random.uniform(-1, 1) * self.faults.jitter_ms
+            fail = self._random.random() < self.faults.error_rate
+        return max(0.0, self.faults.latency_ms + jitter) / 1000, fail
+
+    # ---------------------------
+    # Requests
+    # ---------------------------
+    def _route(self, method: str, path: str, params: dict, body: dict):
+        path = path[len(BASE_PATHS[self.upstream]):]
+        if self.upstream == "openweather" and method == "GET":
+            return _openweather(path.strip("/"), params)
+        if self.upstream == "exchangerate" and method == "GET":
+            parts = path.strip("/").split("/")  # <key>/latest/<base>
+            if len(parts) == 3 and parts[1] == "latest":
+                return _exchangerate(parts[2])
+        if self.upstream == "alphavantage" and path.rstrip("/") == "/query":
+            return _alphavantage(params)
+        if self.upstream == "google_places" and path == "/maps/api/place/textsearch/json":
+            return _google_places(params)
+        if self.upstream == "tavily" and method == "POST" and path == "/search":
+            return _tavily(body)
+        return 404, {"error": f"no stub for {method} {path}"}
+
+    def handle_request_from(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        url = urlsplit(handler.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(handler.headers.get("Content-Length") or 0)
+        raw = handler.rfile.read(length) if length else b""
+        headers = {}
+
+        if not self._admit():
+            status, payload = 429, {"error": "rate limit exceeded"}
+            headers["Retry-After"] = "1"
+        else:
+            delay, fail = self._roll()
+            if delay:
+                time.sleep(delay)
+            if fail:
+                status, payload = 500, {"error": "injected failure"}
+            else:
+                try:
+                    body = json.loads(raw) if raw else {}
+                    status, payload = self._route(method, url.path, params, body)
+                except ValueError:
+                    status, payload = 400, {"error": "invalid JSON body"}
+
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        try:
+            handler.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the caller gave up (timeout, hedged request cancelled)
+
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+
+
+def start_stubs(faults: Optional[Dict[str, dict]] = None, host: str = "127.0.0.1",
+                seed: int = 0) -> Dict[str, StubServer]:
+    """Start a stub for every upstream; `faults` maps upstream name -> `Faults` fields."""
+    faults = faults or {}
+    return {
+        upstream: StubServer(upstream, Faults(**(faults.get(upstream) or {})), host, seed=seed).start()
+        for upstream in BASE_PATHS
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-ins for the upstream APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests/second per upstream")
+    args = parser.parse_args()
+
+    fault = {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "rate_limit_per_second": args.rate_limit,
+    }
+    stubs = start_stubs({upstream: fault for upstream in BASE_PATHS}, args.host)
+    print("🧪 Upstream stubs running; add to config.yaml:\nupstreams:")
+    for upstream, stub in stubs.items():
+        print(f"  {upstream}: {stub.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for stub in stubs.values():
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import logging
+import sys
+from typing import Optional
+
+
+LOGGER_NAME = "trip_planner"
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(name)s [trace=%(trace_id)s span=%(span_id)s] %(message)s"
+
+_configured = False
+
+
+class TraceContextFilter(logging.Filter):
+    """Stamp each record with the current trace/span id ("-" outside a span)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id, record.span_id = "-", "-"
+        trace = sys.modules.get("opentelemetry.trace")
+        if trace is not None:
+            context = trace.get_current_span().get_span_context()
+            if context.is_valid:
+                record.trace_id = format(context.trace_id, "032x")
+                record.span_id = format(context.span_id, "016x")
+        return True
+
+
+def configure_logging(logging_config: Optional[dict] = None) -> logging.Logger:
+    """Set up the `trip_planner` logger from `telemetry.logging` in config.yaml."""
+    global _configured
+
+    logging_config = logging_config or {}
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(str(logging_config.get("level", "INFO")).upper())
+
+    if not _configured:
+        handler = logging.StreamHandler()
+        handler.addFilter(TraceContextFilter())
+        handler.setFormatter(logging.Formatter(logging_config.get("format", DEFAULT_FORMAT)))
+        logger.addHandler(handler)
+        # uvicorn configures the root logger; don't print everything twice.
+        logger.propagate = False
+        _configured = True
+
+    return logger
+
+
+def get_logger(name: str) -> logging.Logger:
+    """A child of the `trip_planner` logger, e.g. `get_logger(__name__)`."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
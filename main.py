@@ -1,60 +1,349 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+from utils.startup import startup_report
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from agent.agentic_workflow import GraphBuilder
-from fastapi.responses import JSONResponse
+from agent.prefetch import trip_signature
+from agent.tool_executor import ToolResultMemo, deadline_config, has_failed_results
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from langchain_core.messages import HumanMessage
-import os
-import traceback
+from contextlib import asynccontextmanager
+from logger.logging import configure_logging, get_logger
+from utils.admission import BATCH, INTERACTIVE, AdmissionController, AdmissionRejected
+from utils.cache import normalize_key
+from utils.http_client import aclose_http_clients
+from utils.llm_pool import aclose_llm_pools
+from utils.job_queue import DEFAULT_MAX_ATTEMPTS, JobWorkerPool
+from utils.profiler import Profiler, render_flamegraph
+from utils.semantic_cache import SemanticPlanCache
+from utils.settings import get_settings
+from utils.singleflight import SingleFlight
+from utils.telemetry import (
+    CONTENT_TYPE,
+    TelemetryMiddleware,
+    configure_tracing,
+    metrics,
+    shutdown_tracing,
+    watch_cache,
+)
+from utils.thread_pool import get_executor, run_in_thread, shutdown_executor
+from utils.warmup import WarmupConfig, warm_up
+import asyncio
+import json
+import secrets
+import time
+import weakref
 
+startup_report.mark("imports")
+settings = get_settings()
+startup_config = settings.section("startup")
 
-app = FastAPI()
+telemetry_config = settings.section("telemetry")
+metrics_config = telemetry_config.get("metrics") or {}
+configure_logging(telemetry_config.get("logging"))
+log = get_logger("api")
+configure_tracing(telemetry_config.get("tracing"))
+
+
+async def _warm_up_then_ready(app: FastAPI, warmup_config: WarmupConfig) -> None:
+    try:
+        with startup_report.phase("warmup"):
+            app.state.warmup = await warm_up(warmup_config)
+    except Exception:
+        log.exception("⚠️ Warm-up failed; serving cold")
+    _mark_ready(app)
+
+
+def _mark_ready(app: FastAPI) -> None:
+    app.state.ready = True
+    startup_report.ready()
+    if startup_config.get("report", True):
+        startup_report.log()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync-only tools and SDK calls that LangChain offloads with
+    # `run_in_executor(None, ...)` land on our sized pool, not the tiny default.
+    asyncio.get_running_loop().set_default_executor(get_executor())
+
+    # /ready stays 503 until upstream connections are warm.
+    app.state.ready = False
+    app.state.warmup = None
+    warmup_config = WarmupConfig(startup_config.get("warmup"))
+    warmup_task = None
+    if warmup_config.enabled:
+        warmup_task = asyncio.create_task(_warm_up_then_ready(app, warmup_config))
+    else:
+        _mark_ready(app)
+
+    if job_pool is not None:
+        job_pool.start()
+    sweeper = None
+    if session_graph is not None:
+        sweeper = asyncio.create_task(_sweep_sessions())
+
+    yield
+
+    if sweeper is not None:
+        sweeper.cancel()
+    if job_pool is not None:
+        await job_pool.stop()
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await aclose_http_clients()
+    await aclose_llm_pools()
+    shutdown_executor(wait=False)
+    shutdown_tracing()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    TelemetryMiddleware,
+    access_log=bool((telemetry_config.get("logging") or {}).get("access_log", True)),
+)
 
 # ---------------------------
 # Build graph ONCE at startup
 # ---------------------------
-MODEL_PROVIDER = os.getenv("MODEL_PROVIDER", "groq")
+MODEL_PROVIDER = settings.model_provider
 
 try:
-    graph_builder = GraphBuilder(model_provider=MODEL_PROVIDER)
-    react_app = graph_builder()
-    print(f"✅ LangGraph initialized with provider: {MODEL_PROVIDER}")
-except Exception as e:
-    print("❌ Failed to initialize LangGraph")
-    traceback.print_exc()
+    with startup_report.phase("graph"):
+        graph_builder = GraphBuilder(model_provider=MODEL_PROVIDER)
+        react_app = graph_builder()
+    log.info("✅ LangGraph initialized with provider: %s", MODEL_PROVIDER)
+except Exception:
+    log.exception("❌ Failed to initialize LangGraph")
     react_app = None
 
 
+try:
+    with startup_report.phase("plan_cache"):
+        plan_cache = SemanticPlanCache.from_config(
+            settings.section("cache").get("plans"), signature=trip_signature
+        )
+except Exception:
+    log.exception("⚠️ Plan cache disabled: failed to initialize")
+    plan_cache = None
+
+if plan_cache is not None:
+    watch_cache("plans", plan_cache.stats)
+
+
+# Identical concurrent /query bodies share one graph run.
+query_flight = SingleFlight()
+
+admission = AdmissionController.from_config(settings.section("admission"))
+
+# Opt-in per-request profiling (admin only): `X-Profile: 1` or `?profile=1`.
+profiler = Profiler.from_config(settings.section("profiling"))
+
+
+# ---------------------------
+# Sessions (multi-turn)
+# ---------------------------
+sessions_config = settings.section("sessions")
+SESSION_ID_PATTERN = r"^[A-Za-z0-9_.-]{1,128}$"
+SESSION_SWEEP_SECONDS = float(sessions_config.get("sweep_seconds", 300))
+
+session_graph = graph_builder.session_graph if react_app is not None else None
+_session_locks = weakref.WeakValueDictionary()
+
+
+def _session_lock(session_id: str) -> asyncio.Lock:
+    """One turn at a time per session on this node; a lock lives while in use."""
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _session_locks[session_id] = asyncio.Lock()
+    return lock
+
+
+async def _sweep_sessions() -> None:
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_SECONDS)
+        try:
+            evicted = await run_in_thread(graph_builder.checkpointer.sweep)
+            if evicted:
+                log.info("🧹 Evicted %d idle sessions", evicted)
+        except Exception as e:
+            log.warning("⚠️ Session sweep failed: %s", e)
+
+
 class QueryRequest(BaseModel):
     query: str
+    # Continue a conversation: earlier turns and their tool results are kept.
+    session_id: Optional[str] = Field(default=None, pattern=SESSION_ID_PATTERN)
+
+
+def _sessions_unavailable(query: QueryRequest) -> Optional[JSONResponse]:
+    if query.session_id and session_graph is None:
+        return JSONResponse(status_code=400, content={"error": "Sessions are disabled."})
+    return None
+
+
+def require_admin(x_admin_key: Optional[str] = Header(default=None)) -> None:
+    """Guard for /admin endpoints; disabled unless ADMIN_API_KEY is set."""
+    admin_key = settings.admin_api_key
+    if not admin_key or not x_admin_key or not secrets.compare_digest(x_admin_key, admin_key):
+        raise HTTPException(status_code=403, detail="Admin key required.")
+
+
+def _is_cacheable(output) -> bool:
+    """Only cache plans built without tool errors, timeouts or failed lookups."""
+    messages = output.get("messages", []) if isinstance(output, dict) else []
+    return bool(messages) and not has_failed_results(messages)
+
+
+def _client_id(request: Request) -> str:
+    """Fairness key: explicit X-Client-ID, else the caller's address."""
+    client_id = request.headers.get("X-Client-ID")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
+
+
+async def _admit(request: Request):
+    """Acquire a graph slot; returns (ticket, None) or (None, rejection response)."""
+    if admission is None:
+        return None, None
+
+    priority = request.headers.get("X-Priority", INTERACTIVE).lower()
+    try:
+        return await admission.acquire(_client_id(request), priority), None
+    except AdmissionRejected as e:
+        log.info("🚦 Rejected (%s), retry after %ss", e.reason, e.retry_after)
+        return None, JSONResponse(
+            status_code=e.status_code,
+            content={"error": "Server is busy, please retry later.", "reason": e.reason},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _release(ticket) -> None:
+    if admission is not None and ticket is not None:
+        admission.release(ticket)
+
+
+def _request_config(tool_results: Optional[ToolResultMemo] = None,
+                    session_id: Optional[str] = None) -> dict:
+    """Per-request graph config; all tool turns share one deadline."""
+    config = deadline_config(graph_builder.tool_executor.request_deadline, tool_results)
+    if session_id:
+        config["configurable"]["thread_id"] = session_id
+    return config
+
+
+def _graph(session_id: Optional[str] = None):
+    return session_graph if session_id else react_app
+
+
+def _profiling_requested(request: Request) -> bool:
+    """Whether to profile this request; only admins may ask (403 otherwise)."""
+    flag = request.headers.get("x-profile") or request.query_params.get("profile")
+    if flag is None or flag.lower() in ("", "0", "false", "no"):
+        return False
+
+    require_admin(request.headers.get("x-admin-key"))
+    if profiler is None:
+        raise HTTPException(status_code=400, detail="Profiling is disabled.")
+    return True
+
+
+async def _run_profiled(query: QueryRequest) -> tuple:
+    """Run one query under the sampling profiler and store the profile."""
+    with profiler.profile(query.query) as profile:
+        if query.session_id:
+            async with _session_lock(query.session_id):
+                final_output = await _run_query(query.query, session_id=query.session_id)
+        else:
+            final_output = await _run_query(query.query)
+
+    await run_in_thread(profiler.store.save, profile.as_dict())
+    log.info("🔬 Profiled query in %s ms (%s)", profile.summary()["wall_ms"], profile.id)
+    return final_output, {
+        **profile.summary(),
+        "flamegraph": f"/admin/profiles/{profile.id}/flamegraph",
+    }
+
+
+async def _run_query(query: str, tool_results: Optional[ToolResultMemo] = None,
+                     session_id: Optional[str] = None) -> str:
+    """Run the graph for one query and cache the plan when it is clean."""
+    messages = {
+        "messages": [HumanMessage(content=query)]
+    }
+
+    output = await _graph(session_id).ainvoke(
+        messages, config=_request_config(tool_results, session_id)
+    )
+
+    if isinstance(output, dict) and "messages" in output:
+        final_output = output["messages"][-1].content
+    else:
+        final_output = str(output)
+
+    # A follow-up's answer depends on the session, not just its own text.
+    if plan_cache is not None and not session_id and final_output and _is_cacheable(output):
+        await plan_cache.astore(query, final_output)
+
+    return final_output
 
 
 @app.post("/query")
-async def query_travel_agent(query: QueryRequest):
+async def query_travel_agent(query: QueryRequest, request: Request):
     if react_app is None:
         return JSONResponse(
             status_code=500,
             content={"error": "Travel agent is not initialized."},
         )
 
+    unavailable = _sessions_unavailable(query)
+    if unavailable is not None:
+        return unavailable
+
+    # A profiled request always runs the graph: no plan cache, no sharing.
+    profiling = _profiling_requested(request)
+    if profiling and not profiler.try_acquire():
+        return JSONResponse(status_code=429, content={"error": "Another request is being profiled."})
+
     try:
-        print("📥 User query:", query.query)
+        log.info("📥 User query: %s", query.query)
 
-        messages = {
-            "messages": [HumanMessage(content=query.query)]
-        }
+        if plan_cache is not None and not query.session_id and not profiling:
+            cached = await plan_cache.alookup(query.query)
+            if cached is not None:
+                log.info("⚡ Plan cache hit (similarity=%s)", cached["similarity"])
+                return {"answer": cached["answer"], "cached": True}
 
-        output = react_app.invoke(messages)
+        ticket, rejection = await _admit(request)
+        if rejection is not None:
+            return rejection
 
-        if isinstance(output, dict) and "messages" in output:
-            final_output = output["messages"][-1].content
-        else:
-            final_output = str(output)
+        profile = None
+        try:
+            if profiling:
+                final_output, profile = await _run_profiled(query)
+            elif query.session_id:
+                async with _session_lock(query.session_id):
+                    final_output = await _run_query(query.query, session_id=query.session_id)
+            else:
+                final_output = await query_flight.ado(
+                    normalize_key(query.query), lambda: _run_query(query.query)
+                )
+        finally:
+            _release(ticket)
 
-        return {"answer": final_output}
+        response = {"answer": final_output}
+        if query.session_id:
+            response["session_id"] = query.session_id
+        if profile is not None:
+            response["profile"] = profile
+        return response
 
     except Exception as e:
-        print("❌ Error during query execution")
-        traceback.print_exc()
+        log.exception("❌ Error during query execution")
 
         return JSONResponse(
             status_code=500,
@@ -62,3 +351,591 @@ async def query_travel_agent(query: QueryRequest):
                 "error": "Internal server error while processing your request."
             },
         )
+
+    finally:
+        if profiling:
+            profiler.release()
+
+
+# ---------------------------
+# Streaming (Server-Sent Events)
+# ---------------------------
+TOOL_OUTPUT_PREVIEW_CHARS = 300
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event frame."""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _message_text(message) -> str:
+    content = getattr(message, "content", message)
+    return content if isinstance(content, str) else str(content)
+
+
+@app.post("/query/stream")
+async def stream_travel_agent(query: QueryRequest, request: Request):
+    """Stream LLM tokens and tool activity for a trip plan as SSE."""
+    if react_app is None:
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Travel agent is not initialized."},
+        )
+
+    unavailable = _sessions_unavailable(query)
+    if unavailable is not None:
+        return unavailable
+
+    log.info("📥 User query (stream): %s", query.query)
+
+    # Admit before the response starts so a rejection is a plain 429/503.
+    ticket, rejection = await _admit(request)
+    if rejection is not None:
+        return rejection
+
+    messages = {
+        "messages": [HumanMessage(content=query.query)]
+    }
+
+    async def event_stream():
+        # Flush a first frame right away so the client sees bytes before the
+        # first LLM round-trip completes.
+        yield _sse("start", {"query": query.query})
+
+        final_output = ""
+        cacheable = False
+
+        session_lock = _session_lock(query.session_id) if query.session_id else None
+        locked = False
+
+        try:
+            if plan_cache is not None and not query.session_id:
+                cached = await plan_cache.alookup(query.query)
+                if cached is not None:
+                    log.info("⚡ Plan cache hit (similarity=%s)", cached["similarity"])
+                    yield _sse("done", {"answer": cached["answer"], "cached": True})
+                    return
+
+            if session_lock is not None:
+                await session_lock.acquire()
+                locked = True
+
+            async for event in _graph(query.session_id).astream_events(
+                messages, config=_request_config(session_id=query.session_id), version="v2"
+            ):
+                kind = event["event"]
+                data = event.get("data", {})
+
+                if kind == "on_chat_model_stream":
+                    # Router-model text is a discarded draft; only the
+                    # synthesizer's answer is streamed.
+                    if "role:router" in event.get("tags", []):
+                        continue
+                    text = _message_text(data.get("chunk", ""))
+                    if text:
+                        yield _sse("token", {
+                            "text": text,
+                            "node": event.get("metadata", {}).get("langgraph_node"),
+                        })
+
+                elif kind == "on_tool_start":
+                    yield _sse("tool_start", {
+                        "id": event["run_id"],
+                        "name": event["name"],
+                        "input": data.get("input"),
+                    })
+
+                elif kind == "on_tool_end":
+                    output = _message_text(data.get("output", ""))
+                    yield _sse("tool_end", {
+                        "id": event["run_id"],
+                        "name": event["name"],
+                        "output": output[:TOOL_OUTPUT_PREVIEW_CHARS],
+                    })
+
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    output = data.get("output")
+                    if isinstance(output, dict) and output.get("messages"):
+                        final_output = _message_text(output["messages"][-1])
+                        cacheable = not query.session_id and _is_cacheable(output)
+
+            yield _sse("done", {"answer": final_output})
+
+            if plan_cache is not None and final_output and cacheable:
+                await plan_cache.astore(query.query, final_output)
+
+        except Exception:
+            log.exception("❌ Error during streaming query execution")
+
+            yield _sse("error", {
+                "error": "Internal server error while processing your request."
+            })
+
+        finally:
+            if locked:
+                session_lock.release()
+            _release(ticket)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # disable proxy buffering (nginx)
+        },
+        # Also frees the slot if the client disconnects before streaming starts.
+        background=BackgroundTask(_release, ticket),
+    )
+
+
+# ---------------------------
+# Batch (NDJSON)
+# ---------------------------
+batch_config = settings.section("batch")
+BATCH_MAX_ITEMS = int(batch_config.get("max_items", 500))
+BATCH_CONCURRENCY = int(batch_config.get("concurrency", 8))
+BATCH_ADMISSION_RETRIES = int(batch_config.get("admission_retries", 3))
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    concurrency: Optional[int] = None
+
+
+def _batch_concurrency(requested: Optional[int]) -> int:
+    """Items run at once; capped by the per-client admission quota."""
+    concurrency = max(1, requested or BATCH_CONCURRENCY)
+    if admission is not None:
+        concurrency = min(concurrency, admission.max_per_client)
+    return concurrency
+
+
+async def _admit_batch_item(client: str):
+    """Acquire a batch-priority slot, waiting out queue-full/timeout rejections."""
+    if admission is None:
+        return None
+
+    for attempt in range(BATCH_ADMISSION_RETRIES + 1):
+        try:
+            return await admission.acquire(client, BATCH)
+        except AdmissionRejected as e:
+            if e.reason == "client_quota" or attempt == BATCH_ADMISSION_RETRIES:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+async def _run_batch_item(query: str, client: str, tool_results: ToolResultMemo) -> dict:
+    started = time.monotonic()
+
+    def _result(**fields) -> dict:
+        return {**fields, "latency_ms": round((time.monotonic() - started) * 1000, 1)}
+
+    try:
+        if plan_cache is not None:
+            cached = await plan_cache.alookup(query)
+            if cached is not None:
+                return _result(answer=cached["answer"], cached=True)
+
+        ticket = await _admit_batch_item(client)
+        try:
+            answer = await query_flight.ado(
+                normalize_key(query), lambda: _run_query(query, tool_results)
+            )
+        finally:
+            _release(ticket)
+        return _result(answer=answer)
+
+    except AdmissionRejected as e:
+        return _result(error="Server is busy, please retry later.", reason=e.reason)
+
+    except Exception:
+        log.exception("❌ Error during batch item execution")
+        return _result(error="Internal server error while processing your request.")
+
+
+@app.post("/query/batch")
+async def batch_travel_agent(batch: BatchQueryRequest, request: Request):
+    """Plan many queries; one NDJSON line per item as it completes, then a summary.
+
+    Items run `concurrency` at a time at batch priority. Identical queries
+    run once, and every run in the batch shares tool results, so one
+    forecast per city serves every plan for that city.
+    """
+    if react_app is None:
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Travel agent is not initialized."},
+        )
+    if not batch.queries:
+        return JSONResponse(status_code=400, content={"error": "No queries given."})
+    if len(batch.queries) > BATCH_MAX_ITEMS:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"At most {BATCH_MAX_ITEMS} queries per batch."},
+        )
+
+    client = _client_id(request)
+    concurrency = _batch_concurrency(batch.concurrency)
+    tool_results = ToolResultMemo()
+
+    # Identical (normalized) queries share one run.
+    groups = {}
+    for index, query in enumerate(batch.queries):
+        groups.setdefault(normalize_key(query), []).append(index)
+
+    log.info("📦 Batch of %d queries (%d unique), concurrency %d",
+             len(batch.queries), len(groups), concurrency)
+
+    async def ndjson_stream():
+        started = time.monotonic()
+        results = asyncio.Queue()
+        pending = iter(groups.values())
+
+        async def worker():
+            for indices in pending:
+                result = await _run_batch_item(batch.queries[indices[0]], client, tool_results)
+                for index in indices:
+                    results.put_nowait({"index": index, "query": batch.queries[index], **result})
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(groups)))]
+        failed = 0
+        try:
+            for _ in range(len(batch.queries)):
+                result = await results.get()
+                failed += "error" in result
+                yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+
+            yield json.dumps({
+                "done": True,
+                "items": len(batch.queries),
+                "unique": len(groups),
+                "failed": failed,
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+                "tool_results": tool_results.stats(),
+            }) + "\n"
+
+        finally:
+            # Client went away: stop starting new items.
+            for task in workers:
+                task.cancel()
+
+    return StreamingResponse(
+        ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------
+# Jobs (async, durable queue)
+# ---------------------------
+jobs_config = settings.section("jobs")
+JOB_MAX_ATTEMPTS = int(jobs_config.get("max_attempts", DEFAULT_MAX_ATTEMPTS))
+JOB_CLIENT = "jobs"
+
+
+async def _run_job(job: dict, report) -> dict:
+    """Job handler: run the graph node by node, reporting progress."""
+    query = job["payload"]["query"]
+    session_id = job["payload"].get("session_id")
+
+    if plan_cache is not None and not session_id:
+        cached = await plan_cache.alookup(query)
+        if cached is not None:
+            return {"answer": cached["answer"], "cached": True}
+
+    ticket = await _admit_batch_item(JOB_CLIENT)
+    session_lock = _session_lock(session_id) if session_id else None
+    locked = False
+    try:
+        if session_lock is not None:
+            await session_lock.acquire()
+            locked = True
+
+        messages = [HumanMessage(content=query)]
+        tools = []
+        steps = 0
+
+        async for update in _graph(session_id).astream(
+            {"messages": messages}, config=_request_config(session_id=session_id),
+            stream_mode="updates",
+        ):
+            for node, delta in update.items():
+                new_messages = (delta or {}).get("messages", [])
+                if not isinstance(new_messages, list):
+                    new_messages = [new_messages]
+                messages.extend(new_messages)
+                steps += 1
+                tools.extend(
+                    call["name"]
+                    for message in new_messages
+                    for call in getattr(message, "tool_calls", None) or []
+                )
+                report({"steps": steps, "node": node, "tools": tools})
+    finally:
+        if locked:
+            session_lock.release()
+        _release(ticket)
+
+    final_output = _message_text(messages[-1]) if len(messages) > 1 else ""
+    if (plan_cache is not None and not session_id and final_output
+            and _is_cacheable({"messages": messages})):
+        await plan_cache.astore(query, final_output)
+    return {"answer": final_output}
+
+
+try:
+    job_pool = JobWorkerPool.from_config(_run_job, jobs_config)
+except Exception:
+    log.exception("⚠️ Jobs disabled: failed to initialize the job broker")
+    job_pool = None
+
+
+def _job_view(job: dict) -> dict:
+    result = job.get("result") or {}
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "query": job["payload"]["query"],
+        "session_id": job["payload"].get("session_id"),
+        "progress": job.get("progress") or {},
+        "answer": result.get("answer"),
+        "cached": result.get("cached", False),
+        "error": job.get("error"),
+        "attempts": job["attempts"],
+        "cancel_requested": job.get("cancel_requested", False),
+        "created_at": job["created_at"],
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+    }
+
+
+def _jobs_unavailable() -> Optional[JSONResponse]:
+    if react_app is None:
+        return JSONResponse(status_code=500, content={"error": "Travel agent is not initialized."})
+    if job_pool is None:
+        return JSONResponse(status_code=503, content={"error": "Jobs are disabled."})
+    return None
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(query: QueryRequest):
+    """Queue a trip plan; poll GET /jobs/{id} for progress and the answer."""
+    unavailable = _jobs_unavailable() or _sessions_unavailable(query)
+    if unavailable is not None:
+        return unavailable
+
+    job = await run_in_thread(
+        job_pool.broker.submit, query.model_dump(exclude_none=True), JOB_MAX_ATTEMPTS
+    )
+    log.info("📥 Job %s queued: %s", job["id"], query.query)
+    return {"job_id": job["id"], "status": job["status"]}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    unavailable = _jobs_unavailable()
+    if unavailable is not None:
+        return unavailable
+
+    job = await run_in_thread(job_pool.broker.get, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job."})
+    return _job_view(job)
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job: queued jobs stop at once, running ones at the next heartbeat."""
+    unavailable = _jobs_unavailable()
+    if unavailable is not None:
+        return unavailable
+
+    job = await run_in_thread(job_pool.broker.cancel, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job."})
+    return _job_view(job)
+
+
+@app.delete("/sessions/{session_id}")
+async def forget_session(session_id: str):
+    """Drop a session's history; its next query starts a new conversation."""
+    if session_graph is None:
+        return JSONResponse(status_code=400, content={"error": "Sessions are disabled."})
+    return {"deleted": await run_in_thread(graph_builder.checkpointer.delete_thread, session_id)}
+
+
+# ---------------------------
+# Status
+# ---------------------------
+@app.get("/status")
+async def service_status():
+    """Overall health plus per-LLM-provider status (drives the UI status panel)."""
+    if react_app is None:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "down", "detail": "Travel agent is not initialized."},
+        )
+
+    llm = graph_builder.model_router.health()
+    providers = list(llm["providers"].values())
+    primary = next((p for p in providers if p["primary"]), None)
+
+    if primary is None or primary["status"] == "up":
+        overall = "ok"
+    elif any(p["status"] != "down" for p in providers):
+        overall = "degraded"
+    else:
+        overall = "down"
+
+    return {"status": overall, "provider": MODEL_PROVIDER, "llm": llm}
+
+
+@app.get("/ready")
+async def readiness(request: Request):
+    """Readiness probe: 503 until the graph is built and warm-up has finished."""
+    if react_app is None or not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {"ready": True}
+
+
+# ---------------------------
+# Metrics
+# ---------------------------
+ADMISSION_IN_FLIGHT = metrics.gauge("admission_in_flight", "Graph runs holding an admission slot.")
+ADMISSION_QUEUED = metrics.gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot.", ("priority",))
+ADMISSION_REJECTED = metrics.counter(
+    "admission_rejected_total", "Requests turned away by admission control.", ("reason",))
+BREAKER_OPEN = metrics.gauge(
+    "circuit_breaker_open", "1 while a provider's circuit is open or half-open.", ("provider",))
+
+
+@metrics.collector
+def _collect_service_metrics() -> None:
+    if admission is not None:
+        stats = admission.stats()
+        ADMISSION_IN_FLIGHT.labels().set(stats["in_flight"])
+        for priority, depth in stats["queue_depth"].items():
+            ADMISSION_QUEUED.labels(priority).set(depth)
+        for field, count in stats.items():
+            if field.startswith("rejected_"):
+                ADMISSION_REJECTED.labels(field[len("rejected_"):]).set(count)
+
+    if react_app is not None:
+        places = graph_builder.place_search_tools
+        for provider, breaker in (("google_places", places.google_breaker),
+                                  ("tavily", places.tavily_breaker)):
+            BREAKER_OPEN.labels(provider).set(breaker.state != "closed")
+
+
+@app.get(
+    "/metrics",
+    dependencies=[Depends(require_admin)] if metrics_config.get("require_admin") else [],
+)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (this worker's series)."""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+
+# ---------------------------
+# Admin
+# ---------------------------
+@app.get("/admin/startup", dependencies=[Depends(require_admin)])
+async def startup_stats(request: Request):
+    """Import and startup phase timings, plus the warm-up result."""
+    return {
+        **startup_report.as_dict(),
+        "warmup": getattr(request.app.state, "warmup", None),
+    }
+
+
+@app.get("/admin/cache/plans", dependencies=[Depends(require_admin)])
+async def plan_cache_stats():
+    if plan_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **plan_cache.stats_dict()}
+
+
+@app.delete("/admin/cache/plans", dependencies=[Depends(require_admin)])
+async def invalidate_plan_cache(query: Optional[str] = None):
+    """Drop cached plans similar to `query`, or all of them."""
+    if plan_cache is None:
+        return {"removed": 0}
+    return {"removed": plan_cache.invalidate(query)}
+
+
+@app.get("/admin/admission", dependencies=[Depends(require_admin)])
+async def admission_stats():
+    """In-flight count, queue depth per priority, wait-time percentiles."""
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.stats()}
+
+
+@app.get("/admin/coalescing", dependencies=[Depends(require_admin)])
+async def coalescing_stats():
+    """Single-flight counters: `shared` calls rode on another's execution."""
+    stats = {"queries": query_flight.stats()}
+    if react_app is not None:
+        stats["tools"] = graph_builder.tool_executor.stats()
+    return stats
+
+
+@app.get("/admin/providers", dependencies=[Depends(require_admin)])
+async def provider_health():
+    """Circuit-breaker state and latency/error EWMAs per place-search provider."""
+    if react_app is None:
+        return {}
+    return {"places": graph_builder.place_search_tools.health()}
+
+
+@app.get("/admin/sessions", dependencies=[Depends(require_admin)])
+async def session_stats():
+    """Stored sessions, snapshot sizes, compression ratio and evictions."""
+    if session_graph is None:
+        return {"enabled": False}
+    return {"enabled": True, **await run_in_thread(graph_builder.checkpointer.stats)}
+
+
+@app.get("/admin/jobs", dependencies=[Depends(require_admin)])
+async def job_stats():
+    """Job workers on this node, outcome counters and queue depth."""
+    if job_pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **await run_in_thread(job_pool.stats)}
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Stored request profiles, newest first: phase breakdown, no stacks."""
+    if profiler is None:
+        return {"enabled": False}
+    return {"enabled": True, "profiles": await run_in_thread(profiler.store.list)}
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str):
+    """One profile with its collapsed stacks (flamegraph.pl / speedscope input)."""
+    profile = await run_in_thread(profiler.store.get, profile_id) if profiler else None
+    if profile is None:
+        return JSONResponse(status_code=404, content={"error": "Profile not found."})
+    return profile
+
+
+@app.get("/admin/profiles/{profile_id}/flamegraph", dependencies=[Depends(require_admin)])
+async def profile_flamegraph(profile_id: str):
+    profile = await run_in_thread(profiler.store.get, profile_id) if profiler else None
+    if profile is None:
+        return JSONResponse(status_code=404, content={"error": "Profile not found."})
+    svg = render_flamegraph(profile["stacks"], title=f"{profile['label']} ({profile['wall_ms']} ms)")
+    return Response(content=svg, media_type="image/svg+xml")
+
+
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+async def model_stats():
+    """Model per role with call count, latency and token usage."""
+    if react_app is None:
+        return {}
+    return graph_builder.model_router.stats()
@@ -1,8 +1,13 @@
 import streamlit as st
 import requests
 import datetime
+import json
+import time
+import uuid
 
 BASE_URL = "http://localhost:8000"  # Backend endpoint
+JOB_POLL_SECONDS = 2
+JOB_TIMEOUT_SECONDS = 900
 
 # ------------------ PAGE CONFIG ------------------
 st.set_page_config(
@@ -162,6 +167,41 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# ------------------ STATUS ------------------
+STATUS_ICONS = {"up": "🟢", "degraded": "🟡", "down": "🔴"}
+
+
+@st.cache_data(ttl=15, show_spinner=False)
+def fetch_status():
+    """Backend /status payload, or None when the backend is unreachable."""
+    try:
+        response = requests.get(f"{BASE_URL}/status", timeout=3)
+        return response.json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def render_status(status):
+    if status is None:
+        st.error("Backend: Unreachable")
+        return
+
+    overall = status.get("status")
+    if overall == "ok":
+        st.success("Backend: Connected")
+    elif overall == "degraded":
+        st.warning("Backend: Degraded")
+    else:
+        st.error(f"Backend: {status.get('detail', 'Down')}")
+
+    for name, provider in status.get("llm", {}).get("providers", {}).items():
+        icon = STATUS_ICONS.get(provider.get("status"), "⚪")
+        ttft = provider.get("ttft_ewma_ms")
+        detail = f" · TTFT {ttft:.0f} ms" if ttft else ""
+        primary = " (primary)" if provider.get("primary") else ""
+        st.markdown(f"{icon} LLM **{name}**{primary}{detail}")
+
+
 # ------------------ SIDEBAR ------------------
 with st.sidebar:
     st.image(
@@ -180,8 +220,14 @@ with st.sidebar:
         """
     )
     st.markdown("---")
+    # Follow-up requests ("make it cheaper") continue this conversation.
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if st.button("🆕 New conversation"):
+        st.session_state.session_id = uuid.uuid4().hex
+    st.markdown("---")
     st.markdown("### ⚙️ System Status")
-    st.success("Backend: Connected")
+    render_status(fetch_status())
     st.markdown("---")
     st.markdown("Made with ❤️ by Ashish")
 
@@ -203,43 +249,133 @@ with st.form(key="query_form", clear_on_submit=True):
     submit_button = st.form_submit_button("🚀 Generate Plan")
 
 # ------------------ API CALL ------------------
+def iter_sse_events(response):
+    """Yield (event, data) pairs from a Server-Sent Events response."""
+    event, data_lines = "message", []
+
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+
+def render_plan(placeholder, answer: str, timestamp: str, done: bool):
+    cursor = "" if done else " ▌"
+    body = answer.replace("\n", "<br>")
+
+    placeholder.markdown(
+        f"""
+        <div class="response-box">
+        <h2>🌍 Your AI Travel Plan</h2>
+        <p><b>🕒 Generated:</b> {timestamp}</p>
+        <p><b>🤖 Agent:</b> Atriyo's Travel AI</p>
+        <hr>
+        {body}{cursor}
+        <hr>
+        <small>
+        ⚠️ This plan is AI-generated. Please verify prices, bookings, and travel requirements.
+        </small>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
+
+def run_as_job(payload, status, placeholder, timestamp):
+    """Queue the plan as a background job and poll it until it finishes."""
+    response = requests.post(f"{BASE_URL}/jobs", json=payload, timeout=10)
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    status.write("📨 Continuing in the background...")
+
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    seen_tools = 0
+    while time.monotonic() < deadline:
+        job = requests.get(f"{BASE_URL}/jobs/{job_id}", timeout=10).json()
+
+        tools = job.get("progress", {}).get("tools", [])
+        for name in tools[seen_tools:]:
+            status.write(f"🔧 Running `{name}`...")
+        seen_tools = len(tools)
+
+        if job.get("status") == "succeeded":
+            render_plan(placeholder, job.get("answer") or "No answer returned.", timestamp, done=True)
+            status.update(label="✅ Plan ready", state="complete")
+            return
+        if job.get("status") in ("failed", "cancelled"):
+            status.update(label="❌ Planning failed", state="error")
+            st.error(f"❌ Bot failed to respond: {job.get('error') or job.get('status')}")
+            return
+
+        time.sleep(JOB_POLL_SECONDS)
+
+    status.update(label="⌛ Still planning", state="error")
+    st.warning(f"⌛ The plan is taking long; job `{job_id}` is still running.")
+
+
 if submit_button and user_input.strip():
     try:
-        with st.spinner("🧠 Planning your trip..."):
-            payload = {"query": user_input}
-            response = requests.post(
-                f"{BASE_URL}/query",
+        payload = {"query": user_input, "session_id": st.session_state.session_id}
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+
+        status = st.status("🧠 Planning your trip...", expanded=False)
+        plan_placeholder = st.empty()
+        answer = ""
+        finished = False
+
+        try:
+            with requests.post(
+                f"{BASE_URL}/query/stream",
                 json=payload,
-                timeout=300,
-            )
-
-        if response.status_code == 200:
-            answer = response.json().get("answer", "No answer returned.")
-
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-
-            st.markdown(
-                f"""
-                <div class="response-box">
-                <h2>🌍 Your AI Travel Plan</h2>
-                <p><b>🕒 Generated:</b> {timestamp}</p>
-                <p><b>🤖 Agent:</b> Atriyo's Travel AI</p>
-                <hr>
-                {answer.replace("\n", "<br>")}
-                <hr>
-                <small>
-                ⚠️ This plan is AI-generated. Please verify prices, bookings, and travel requirements.
-                </small>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        else:
-            st.error(
-                f"❌ Bot failed to respond "
-                f"(status={response.status_code}): {response.text}"
-            )
+                stream=True,
+                timeout=(10, 300),
+            ) as response:
+                if response.status_code != 200:
+                    st.error(
+                        f"❌ Bot failed to respond "
+                        f"(status={response.status_code}): {response.text}"
+                    )
+                    st.stop()
+
+                for event, data in iter_sse_events(response):
+                    if event == "token":
+                        answer += data.get("text", "")
+                        render_plan(plan_placeholder, answer, timestamp, done=False)
+
+                    elif event == "tool_start":
+                        # Text streamed before a tool call is only preamble;
+                        # the final turn carries the actual plan.
+                        answer = ""
+                        status.write(f"🔧 Running `{data.get('name')}`...")
+
+                    elif event == "tool_end":
+                        status.write(f"✅ `{data.get('name')}` finished")
+
+                    elif event == "done":
+                        answer = data.get("answer") or answer or "No answer returned."
+                        render_plan(plan_placeholder, answer, timestamp, done=True)
+                        status.update(label="✅ Plan ready", state="complete")
+                        finished = True
+
+                    elif event == "error":
+                        status.update(label="❌ Planning failed", state="error")
+                        st.error(f"❌ Bot failed to respond: {data.get('error')}")
+                        finished = True
+
+        except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ReadTimeout):
+            pass
+
+        if not finished:
+            # A proxy or load balancer cut the stream mid-plan; finish it as a job.
+            run_as_job(payload, status, plan_placeholder, timestamp)
 
     except requests.RequestException as e:
         st.error(
@@ -0,0 +1,81 @@
+import time
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    return CircuitBreaker("test", **{"consecutive_failures": 3, "min_calls": 4, "open_seconds": 0.1,
+                                     "max_open_seconds": 0.4, **kwargs})
+
+
+def test_opens_after_consecutive_failures():
+    breaker = _breaker()
+    for _ in range(2):
+        breaker.record_failure(0.1)
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_the_failure_streak():
+    breaker = _breaker(error_rate_threshold=1.1)
+    for _ in range(5):
+        breaker.record_failure(0.1)
+        breaker.record_failure(0.1)
+        breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_opens_on_error_rate_after_min_calls():
+    breaker = _breaker(consecutive_failures=100, error_rate_threshold=0.3, ewma_alpha=0.5)
+    breaker.record_failure(0.1)
+    breaker.record_failure(0.1)
+    assert breaker.state == CLOSED  # fewer than min_calls
+
+    breaker.record_success(0.1)
+    breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure(0.1)
+    time.sleep(0.12)
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # one probe at a time
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_with_doubled_cool_down():
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure(0.1)
+    time.sleep(0.12)
+    assert breaker.allow()
+
+    breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+    assert breaker.stats()["open_seconds"] == 0.2
+    time.sleep(0.1)
+    assert not breaker.allow()
+    time.sleep(0.12)
+    assert breaker.allow()
+
+
+def test_latency_p95_needs_min_calls():
+    breaker = _breaker()
+    for latency in (0.1, 0.2, 0.3):
+        breaker.record_success(latency)
+    assert breaker.latency_p95() is None
+
+    breaker.record_success(0.4)
+    assert breaker.latency_p95() == 0.4
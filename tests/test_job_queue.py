@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from utils.job_queue import (
+    CANCEL,
+    FAILED,
+    KEEP_GOING,
+    LOST,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    RedisJobBroker,
+    SQLiteJobBroker,
+)
+from utils.local_redis import LocalRedisServer
+
+LEASE = 0.2
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def broker(request, tmp_path):
+    if request.param == "sqlite":
+        yield SQLiteJobBroker(str(tmp_path / "jobs.sqlite3"))
+        return
+
+    server = LocalRedisServer().start()
+    try:
+        yield RedisJobBroker(server.url, key_prefix=f"test:{time.monotonic_ns()}:")
+    finally:
+        server.stop()
+
+
+def test_claim_takes_each_queued_job_once(broker):
+    job = broker.submit({"query": "Goa"})
+
+    claimed = broker.claim("w1", LEASE)
+    assert claimed["id"] == job["id"]
+    assert (claimed["status"], claimed["worker"], claimed["attempts"]) == (RUNNING, "w1", 1)
+    assert broker.claim("w2", LEASE) is None
+
+
+def test_finished_job_keeps_its_result(broker):
+    job = broker.submit({"query": "Goa"})
+    broker.claim("w1", LEASE)
+
+    assert broker.heartbeat(job["id"], "w1", LEASE, {"step": 1}) == KEEP_GOING
+    broker.finish(job["id"], "w1", SUCCEEDED, {"answer": "plan"})
+
+    done = broker.get(job["id"])
+    assert (done["status"], done["result"]) == (SUCCEEDED, {"answer": "plan"})
+    assert broker.claim("w2", LEASE) is None
+
+
+def test_lost_worker_job_is_retried_by_another_worker(broker):
+    job = broker.submit({"query": "Goa"}, max_attempts=2)
+    broker.claim("w1", LEASE)
+    time.sleep(LEASE + 0.05)
+
+    assert broker.reap() == 0
+    retried = broker.claim("w2", LEASE)
+    assert (retried["id"], retried["worker"], retried["attempts"]) == (job["id"], "w2", 2)
+    # The first worker lost its lease and must stop.
+    assert broker.heartbeat(job["id"], "w1", LEASE, {}) == LOST
+
+
+def test_exhausted_job_is_failed_not_reclaimed(broker):
+    job = broker.submit({"query": "Goa"}, max_attempts=1)
+    broker.claim("w1", LEASE)
+    time.sleep(LEASE + 0.05)
+
+    assert broker.claim("w2", LEASE) is None
+    assert broker.reap() == 1
+    failed = broker.get(job["id"])
+    assert (failed["status"], failed["error"], failed["attempts"]) == (FAILED, "worker lost", 1)
+    assert broker.claim("w2", LEASE) is None
+
+
+def test_requeue_without_counting_the_attempt(broker):
+    job = broker.submit({"query": "Goa"}, max_attempts=1)
+    broker.claim("w1", LEASE)
+    broker.requeue(job["id"], "w1", "worker shut down", count_attempt=False)
+
+    assert broker.get(job["id"])["status"] == QUEUED
+    assert broker.claim("w2", LEASE)["attempts"] == 1
+
+
+def test_cancel(broker):
+    queued = broker.submit({"query": "Goa"})
+    assert broker.cancel(queued["id"])["status"] == "cancelled"
+
+    running = broker.submit({"query": "Kyoto"})
+    broker.claim("w1", LEASE)
+    assert broker.cancel(running["id"])["cancel_requested"]
+    assert broker.heartbeat(running["id"], "w1", LEASE, {}) == CANCEL
+
+
+def test_redis_claim_fails_a_queued_job_without_attempts_left():
+    server = LocalRedisServer().start()
+    try:
+        broker = RedisJobBroker(server.url, key_prefix="test:exhausted:")
+        job = broker.submit({"query": "Goa"}, max_attempts=1)
+        broker.claim("w1", LEASE)
+        broker.requeue(job["id"], "w1", "boom")
+
+        assert broker.claim("w2", LEASE) is None
+        assert broker.get(job["id"])["status"] == FAILED
+        assert broker.stats()["running"] == 0
+    finally:
+        server.stop()
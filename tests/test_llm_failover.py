@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from utils.circuit_breaker import CircuitBreaker
+from utils.llm_failover import FailoverChatModel
+
+
+class _Provider(BaseChatModel):
+    """Answers `reply` after `delay` seconds, or raises `error`."""
+
+    reply: str = "ok"
+    delay: float = 0.0
+    error: str = ""
+    closed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "test"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.error:
+            raise RuntimeError(self.error)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._generate(messages)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        try:
+            if self.error:
+                raise RuntimeError(self.error)
+            for token in self.reply.split():
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+        finally:
+            self.closed += 1
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error:
+                raise RuntimeError(self.error)
+            for token in self.reply.split():
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+        finally:
+            self.closed += 1
+
+
+def _failover(*providers: _Provider, **kwargs) -> FailoverChatModel:
+    return FailoverChatModel(
+        providers=[f"p{i}" for i in range(len(providers))],
+        clients=list(providers),
+        breakers=[CircuitBreaker(f"llm:p{i}", consecutive_failures=2) for i in range(len(providers))],
+        **kwargs,
+    )
+
+
+MESSAGES = [HumanMessage(content="Plan a trip to Goa")]
+
+
+def test_slow_first_token_fails_over_and_closes_the_stream():
+    slow, fast = _Provider(reply="slow answer", delay=1.0), _Provider(reply="fast answer")
+    model = _failover(slow, fast, first_token_timeout=0.05)
+
+    async def collect():
+        return "".join([chunk.content async for chunk in model.astream(MESSAGES)])
+
+    assert asyncio.run(collect()).strip() == "fast answer"
+    assert slow.closed == 1
+    assert model.breakers[0].stats()["failures"] == 1
+    assert model.breakers[1].stats()["successes"] == 1
+    assert set(model.health()["providers"]) == {"p0", "p1"}
+
+
+def test_closing_the_failover_stream_closes_the_provider_stream():
+    provider = _Provider(reply="one two three four")
+    model = _failover(provider, _Provider())
+
+    async def first_chunk():
+        stream = model.astream(MESSAGES)
+        chunk = await anext(stream)
+        await stream.aclose()
+        return chunk, provider.closed
+
+    chunk, closed = asyncio.run(first_chunk())
+    assert chunk.content == "one "
+    assert closed == 1
+
+
+def test_stream_error_before_output_fails_over():
+    broken, healthy = _Provider(error="502 Bad Gateway"), _Provider(reply="from backup")
+    model = _failover(broken, healthy)
+
+    assert "".join(c.content for c in model.stream(MESSAGES)).strip() == "from backup"
+    assert broken.closed == 1
+
+
+def test_generate_timeout_fails_over():
+    model = _failover(_Provider(reply="late", delay=1.0), _Provider(reply="on time"), timeout=0.05)
+
+    assert asyncio.run(model.ainvoke(MESSAGES)).content == "on time"
+    assert model.breakers[0].stats()["failures"] == 1
+
+
+def test_all_providers_failing_raises_the_last_error():
+    model = _failover(_Provider(error="first down"), _Provider(error="second down"))
+
+    with pytest.raises(RuntimeError, match="second down"):
+        model.invoke(MESSAGES)
@@ -0,0 +1,139 @@
+import asyncio
+
+import httpx
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from utils import llm_pool
+from utils.llm_pool import KeyState, PooledChatModel, is_transient
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class _ConnectionError(Exception):
+    """Like the SDKs' APIConnectionError: raised from the httpx error."""
+
+
+class _Member(BaseChatModel):
+    """Raises the queued `errors` one per call, then answers `reply`."""
+
+    reply: str = "ok"
+    errors: list = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "test"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._generate(messages)
+
+
+def _pool(*members: _Member, **kwargs) -> PooledChatModel:
+    return PooledChatModel(
+        clients=list(members),
+        states=[KeyState(f"k{i}") for i in range(len(members))],
+        **kwargs,
+    )
+
+
+def _connection_error() -> Exception:
+    try:
+        try:
+            raise httpx.ConnectError("refused")
+        except httpx.ConnectError as e:
+            raise _ConnectionError("Connection error.") from e
+    except _ConnectionError as e:
+        return e
+
+
+def test_transient_errors():
+    assert is_transient(_StatusError(500))
+    assert is_transient(_StatusError(503))
+    assert is_transient(_StatusError(408))
+    assert is_transient(_connection_error())
+    assert is_transient(httpx.ReadTimeout("timed out"))
+    assert not is_transient(_StatusError(400))
+    assert not is_transient(_StatusError(429))
+    assert not is_transient(ValueError("bad"))
+
+
+@pytest.mark.parametrize("error", [_StatusError(502), _connection_error()])
+def test_transient_error_is_retried_on_another_member(error):
+    failing = _Member(reply="a", errors=[error])
+    healthy = _Member(reply="b")
+    pool = _pool(failing, healthy)
+    # Make the failing member the first pick.
+    pool.states[1].backoff(0.01)
+
+    result = pool.invoke([HumanMessage(content="hi")])
+
+    assert result.content == "b"
+    assert failing.calls == 1 and healthy.calls == 1
+
+
+def test_async_transient_error_is_retried_on_another_member():
+    failing = _Member(reply="a", errors=[_StatusError(500)])
+    healthy = _Member(reply="b")
+    pool = _pool(failing, healthy)
+    pool.states[1].backoff(0.01)
+
+    result = asyncio.run(pool.ainvoke([HumanMessage(content="hi")]))
+
+    assert result.content == "b"
+
+
+def test_transient_retries_are_bounded(monkeypatch):
+    monkeypatch.setattr(llm_pool, "RETRY_COOLDOWN", 0.01)
+    members = [_Member(errors=[_StatusError(500)] * 5) for _ in range(2)]
+    pool = _pool(*members, max_retries=2)
+
+    with pytest.raises(_StatusError):
+        pool.invoke([HumanMessage(content="hi")])
+
+    assert sum(m.calls for m in members) == 3
+
+
+def test_client_errors_are_not_retried():
+    members = [_Member(errors=[_StatusError(400)]), _Member(errors=[_StatusError(400)])]
+    pool = _pool(*members)
+
+    with pytest.raises(_StatusError):
+        pool.invoke([HumanMessage(content="hi")])
+
+    assert sum(m.calls for m in members) == 1
+
+
+def test_rate_limited_member_moves_on():
+    limited = _Member(reply="a", errors=[_StatusError(429)])
+    healthy = _Member(reply="b")
+    pool = _pool(limited, healthy)
+    pool.states[1].backoff(0.01)
+
+    assert pool.invoke([HumanMessage(content="hi")]).content == "b"
+    assert pool.states[0].cooldown_until > 0
+
+
+def test_aclose_closes_member_http_clients():
+    async def run():
+        clients = [httpx.Client(), httpx.AsyncClient(), httpx.Client(), httpx.AsyncClient()]
+        pool = llm_pool.register_pool(_pool(_Member(), _Member(), http_clients=clients))
+        await llm_pool.aclose_llm_pools()
+        return clients, pool
+
+    clients, pool = asyncio.run(run())
+
+    assert all(client.is_closed for client in clients)
+    assert pool not in llm_pool._pools
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from tools.place_search_tool import PlaceSearchTool
+from utils.circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from utils.place_info_search import GooglePlaceSearchTool, TavilyPlaceSearchTool
+from utils.place_records import PlaceResults
+
+
+class _MapsClient:
+    def __init__(self, response):
+        self.response = response
+
+    def places(self, query):
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+class _Tavily:
+    def __init__(self, response):
+        self.response = response
+
+    def invoke(self, payload):
+        return self.response
+
+    async def ainvoke(self, payload):
+        return self.response
+
+
+def _google(response, breaker: CircuitBreaker) -> GooglePlaceSearchTool:
+    google = GooglePlaceSearchTool.__new__(GooglePlaceSearchTool)
+    google.places_wrapper = type("Wrapper", (), {"google_map_client": _MapsClient(response)})()
+    google.cache = None
+    google.breaker = breaker
+    return google
+
+
+def _tavily(response, breaker: CircuitBreaker) -> TavilyPlaceSearchTool:
+    tavily = TavilyPlaceSearchTool.__new__(TavilyPlaceSearchTool)
+    tavily.tavily_tool = _Tavily(response)
+    tavily.cache = None
+    tavily.breaker = breaker
+    return tavily
+
+
+def _place_search(google, tavily) -> PlaceSearchTool:
+    search = PlaceSearchTool.__new__(PlaceSearchTool)
+    search.google_places_search = google
+    search.google_breaker = google.breaker
+    search.tavily_search = tavily
+    search.tavily_breaker = tavily.breaker
+    search.hedging = False
+    search.max_tokens, search.default_max_tokens, search.max_places = {}, 400, 8
+    return search
+
+
+GOOGLE_RESULT = {"status": "OK", "results": [{"name": "Fort Aguada", "rating": 4.4, "user_ratings_total": 900}]}
+TAVILY_RESULT = {"answer": "Goa has beaches.", "results": [{"title": "Baga Beach", "content": "Busy beach"}]}
+
+
+def test_empty_google_result_is_a_success():
+    breaker = CircuitBreaker("google_places", consecutive_failures=2)
+    google = _google({"status": "ZERO_RESULTS", "results": []}, breaker)
+
+    for _ in range(5):
+        assert google.search("attractions", "Nowhere").places == []
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()["failures"] == 0
+
+
+def test_empty_tavily_result_is_a_success():
+    breaker = CircuitBreaker("tavily", consecutive_failures=2)
+    tavily = _tavily({"answer": None, "results": []}, breaker)
+
+    for _ in range(5):
+        result = tavily.search("attractions", "Nowhere")
+        assert not result.summary and not result.places
+
+    assert breaker.state == CLOSED
+
+
+def test_google_errors_still_count_as_failures():
+    breaker = CircuitBreaker("google_places", consecutive_failures=2)
+    google = _google(RuntimeError("OVER_QUERY_LIMIT"), breaker)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="Google Places API failed"):
+            google.search("attractions", "Goa")
+    assert breaker.state == OPEN
+
+
+@pytest.mark.parametrize("run", ["sync", "async"])
+def test_empty_google_result_falls_back_to_tavily(run):
+    search = _place_search(
+        _google({"status": "ZERO_RESULTS", "results": []}, CircuitBreaker("google_places")),
+        _tavily(TAVILY_RESULT, CircuitBreaker("tavily")),
+    )
+
+    answer = search._search("attractions", "Goa") if run == "sync" else asyncio.run(
+        search._asearch("attractions", "Goa"))
+
+    assert answer.startswith("Google returned no results.")
+    assert "Baga Beach" in answer
+
+
+def test_google_answer_when_it_has_places():
+    search = _place_search(
+        _google(GOOGLE_RESULT, CircuitBreaker("google_places")),
+        _tavily(TAVILY_RESULT, CircuitBreaker("tavily")),
+    )
+    assert "Fort Aguada" in search._search("attractions", "Goa")
+
+
+def test_no_results_anywhere_is_reported_plainly():
+    search = _place_search(
+        _google({"status": "ZERO_RESULTS", "results": []}, CircuitBreaker("google_places")),
+        _tavily({"answer": None, "results": []}, CircuitBreaker("tavily")),
+    )
+    assert search._search("attractions", "Nowhere") == (
+        "Google returned no results.\nNo attractions found for Nowhere."
+    )
+    assert isinstance(search.tavily_search.search("attractions", "Nowhere"), PlaceResults)
@@ -0,0 +1,33 @@
+import importlib
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+@pytest.fixture
+def main(monkeypatch):
+    # The scripted fake LLM needs no API keys.
+    monkeypatch.setenv("MODEL_PROVIDER", "fake")
+    return importlib.import_module("main")
+
+
+def _plan(*tool_messages):
+    return {"messages": [HumanMessage(content="Plan a trip to Goa"), *tool_messages, AIMessage(content="Day 1 ...")]}
+
+
+def test_plan_without_tool_errors_is_cacheable(main):
+    assert main._is_cacheable(_plan(ToolMessage(content="Sunny, 31°C", tool_call_id="1")))
+
+
+@pytest.mark.parametrize("message", [
+    ToolMessage(content="Error: timed out", tool_call_id="1", status="error"),
+    ToolMessage(content="Failed to fetch weather for Goa: 503", tool_call_id="1"),
+    ToolMessage(content="Could not fetch forecast for Goa", tool_call_id="1"),
+])
+def test_plan_with_failed_lookup_is_not_cacheable(main, message):
+    assert not main._is_cacheable(_plan(message))
+
+
+def test_empty_output_is_not_cacheable(main):
+    assert not main._is_cacheable({})
+    assert not main._is_cacheable(None)
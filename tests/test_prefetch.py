@@ -0,0 +1,96 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+
+from agent.prefetch import PREFETCH_TOOLS, DataPrefetcher, parse_trip_request, trip_signature
+from agent.tool_executor import ToolExecutor
+
+
+@pytest.mark.parametrize("query, destination", [
+    ("Plan a 3-day trip to Goa with a budget of 1000 USD", "Goa"),
+    ("I want to go to New York for a week", "New York"),
+    ("I want to visit Paris for 4 days", "Paris"),
+    ("We are planning to travel to Bali next month", "Bali"),
+    ("I would like to explore Kyoto", "Kyoto"),
+    ("I am travelling to Tokyo", "Tokyo"),
+    ("Suggest a 3 day itinerary for Kerala", "Kerala"),
+    ("Plan a trip for my family to Rome", "Rome"),
+    ("Plan a weekend for two in Paris", "Paris"),
+    ("5 days in Goa", "Goa"),
+    ("goa trip 5 days", "goa"),
+    ("Kerala itinerary", "Kerala"),
+])
+def test_destination(query, destination):
+    assert parse_trip_request(query).destination == destination
+
+
+@pytest.mark.parametrize("query", [
+    "Plan a trip for a week",
+    "What should I do this weekend?",
+    "Plan a trip for my family",
+])
+def test_no_destination(query):
+    assert parse_trip_request(query).destination is None
+
+
+@pytest.mark.parametrize("query, days", [
+    ("I want to go to New York for a week", 7),
+    ("Suggest a 3 day itinerary for Kerala", 3),
+    ("Plan a 5-night stay in Goa", 5),
+    ("Two weeks in Japan", 14),
+    ("A weekend in Paris", 2),
+])
+def test_days(query, days):
+    assert parse_trip_request(query).days == days
+
+
+@pytest.mark.parametrize("query, budget, currency", [
+    ("Plan a 3-day trip to Goa with a budget of 1000 USD", 1000, "USD"),
+    ("Trip to Goa under ₹50k", 50_000, "INR"),
+    ("Trip to Kerala within 2 lakh rupees", 200_000, "INR"),
+    ("Trip to Paris with a budget of €1,500", 1_500, "EUR"),
+])
+def test_budget(query, budget, currency):
+    trip = parse_trip_request(query)
+    assert (trip.budget, trip.currency) == (budget, currency)
+
+
+def test_signature_normalizes_destination():
+    assert trip_signature("I want to visit  Paris for 4 days") == ("paris", 4, None, None)
+    assert trip_signature("I want to go to New York for a week")[0] == "new york"
+
+
+def _prefetcher() -> DataPrefetcher:
+    def tool(name: str, arg: str) -> StructuredTool:
+        return StructuredTool.from_function(
+            func=lambda **kwargs: "ok", name=name, description=name,
+            args_schema={"type": "object", "properties": {arg: {"type": "string"}}},
+        )
+
+    return DataPrefetcher(ToolExecutor([tool(name, arg) for name, arg in PREFETCH_TOOLS.items()]))
+
+
+def test_prefetch_plans_calls_for_the_destination():
+    request = _prefetcher()._plan({"messages": [HumanMessage(content="I want to visit Paris for 4 days")]})
+
+    assert {call["name"] for call in request.tool_calls} == set(PREFETCH_TOOLS)
+    assert {next(iter(call["args"].values())) for call in request.tool_calls} == {"Paris"}
+
+
+def test_prefetch_refetches_failed_session_results():
+    prefetcher = _prefetcher()
+    first = prefetcher._plan({"messages": [HumanMessage(content="Trip to Goa")]})
+    results = [
+        ToolMessage(content="Weather failed", tool_call_id=call["id"], status="error")
+        if call["name"] == "get_current_weather"
+        else ToolMessage(content="Failed to fetch forecast for Goa: 502", tool_call_id=call["id"])
+        if call["name"] == "get_weather_forecast"
+        else ToolMessage(content="ok", tool_call_id=call["id"])
+        for call in first.tool_calls
+    ]
+    history = [HumanMessage(content="Trip to Goa"), first, *results, AIMessage(content="plan")]
+
+    second = prefetcher._plan({"messages": [*history, HumanMessage(content="Make it 5 days in Goa")]})
+
+    assert {call["name"] for call in second.tool_calls} == {"get_current_weather", "get_weather_forecast"}
+    assert not {call["id"] for call in second.tool_calls} & {call["id"] for call in first.tool_calls}
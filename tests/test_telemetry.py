@@ -0,0 +1,30 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from agent.model_router import ROUTER, SUMMARIZER, SYNTHESIZER, ModelRouter
+from benchmarks.fake_llm import ScriptedChatModel
+from utils.telemetry import LLM_CALLS, LLM_TTFT
+
+
+def _router(model_name: str) -> ModelRouter:
+    router = ScriptedChatModel(model_name=model_name, first_token_ms=1, token_latency_ms=0, script={"turns": []})
+    synthesizer = ScriptedChatModel(first_token_ms=1, token_latency_ms=0, script={"turns": []})
+    return ModelRouter({ROUTER: router, SYNTHESIZER: synthesizer, SUMMARIZER: synthesizer}, [])
+
+
+def _calls(model: str, outcome: str) -> float:
+    return LLM_CALLS.labels(ROUTER, model, outcome).value
+
+
+def test_router_stopping_at_its_answer_is_not_an_error():
+    router = _router("router-abort")
+    messages = [HumanMessage(content="Plan a 3-day trip to Goa")]
+
+    answer = router.invoke(messages)
+    asyncio.run(router.ainvoke(messages))
+
+    assert answer.content.startswith("# 3-day trip to Goa")
+    assert _calls("router-abort", "aborted") == 2
+    assert _calls("router-abort", "error") == 0
+    assert LLM_TTFT.labels(ROUTER, "router-abort").count == 2
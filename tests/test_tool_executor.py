@@ -0,0 +1,168 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+
+from agent.tool_executor import ToolExecutor, ToolResultMemo, deadline_config, has_failed_results
+from tools.weather_info_tool import WeatherInfoTool
+
+
+def _call(name: str, city: str, call_id: str) -> dict:
+    return {"name": name, "args": {"city": city}, "id": call_id, "type": "tool_call"}
+
+
+def _state(*calls: dict, history=()) -> dict:
+    return {"messages": [*history, HumanMessage(content="hi"), AIMessage(content="", tool_calls=list(calls))]}
+
+
+class _Counter:
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.fail = fail
+
+    def __call__(self, city: str) -> str:
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"upstream down for {city}")
+        return f"Current weather in {city}: 30°C"
+
+
+def _executor(counter: _Counter) -> ToolExecutor:
+    def get_current_weather(city: str) -> str:
+        """Get current weather for a city."""
+        return counter(city)
+
+    return ToolExecutor([StructuredTool.from_function(func=get_current_weather)])
+
+
+class _FailingWeatherService:
+    def get_current_weather(self, place):
+        raise RuntimeError("OpenWeather API failed (status=502)")
+
+    async def aget_current_weather(self, place):
+        raise RuntimeError("OpenWeather API failed (status=502)")
+
+    def get_forecast_weather(self, place):
+        return {}
+
+    async def aget_forecast_weather(self, place):
+        return {}
+
+
+def _weather_tools():
+    weather = WeatherInfoTool.__new__(WeatherInfoTool)
+    weather.weather_service = _FailingWeatherService()
+    return weather._setup_tools()
+
+
+def test_memo_reuses_success_with_fresh_id():
+    counter = _Counter()
+    executor = _executor(counter)
+    memo = ToolResultMemo()
+
+    first = executor.run(_state(_call("get_current_weather", "Goa", "a")), deadline_config(tool_results=memo))
+    second = executor.run(_state(_call("get_current_weather", " goa ", "b")), deadline_config(tool_results=memo))
+
+    assert counter.calls == 1
+    [original], [reused] = first["messages"], second["messages"]
+    assert reused.content == original.content
+    assert reused.tool_call_id == "b"
+    assert reused.id is None or reused.id != original.id
+    assert reused.response_metadata["status"] == "reused"
+    assert memo.stats() == {"results": 1, "hits": 1}
+
+
+def test_memo_skips_errors():
+    counter = _Counter(fail=True)
+    executor = _executor(counter)
+    memo = ToolResultMemo()
+
+    for call_id in ("a", "b"):
+        [message] = executor.run(
+            _state(_call("get_current_weather", "Goa", call_id)), deadline_config(tool_results=memo)
+        )["messages"]
+        assert message.status == "error"
+
+    assert counter.calls == 2
+    assert memo.stats()["results"] == 0
+
+
+def test_async_memo_skips_errors():
+    counter = _Counter(fail=True)
+    executor = _executor(counter)
+    memo = ToolResultMemo()
+
+    async def run(call_id):
+        state = _state(_call("get_current_weather", "Goa", call_id))
+        return await executor.arun(state, deadline_config(tool_results=memo))
+
+    assert asyncio.run(run("a"))["messages"][0].status == "error"
+    assert asyncio.run(run("b"))["messages"][0].status == "error"
+    assert counter.calls == 2
+
+
+def test_failed_earlier_result_is_not_reused():
+    counter = _Counter(fail=True)
+    executor = _executor(counter)
+    first = executor.run(_state(_call("get_current_weather", "Goa", "a")), deadline_config())
+
+    counter.fail = False
+    history = [HumanMessage(content="hi"), AIMessage(content="", tool_calls=[_call("get_current_weather", "Goa", "a")]),
+               *first["messages"]]
+    [message] = executor.run(
+        _state(_call("get_current_weather", "Goa", "b"), history=history), deadline_config()
+    )["messages"]
+
+    assert counter.calls == 2
+    assert message.status != "error"
+    assert message.response_metadata["status"] == "ok"
+
+
+def test_weather_failures_are_tool_errors():
+    executor = ToolExecutor(_weather_tools())
+    memo = ToolResultMemo()
+    state = _state(
+        _call("get_current_weather", "Goa", "a"),
+        _call("get_weather_forecast", "Goa", "b"),
+    )
+
+    sync = executor.run(state, deadline_config(tool_results=memo))["messages"]
+    asynchronous = asyncio.run(executor.arun(state, deadline_config(tool_results=memo)))["messages"]
+
+    for message in (*sync, *asynchronous):
+        assert message.status == "error"
+        assert message.response_metadata["status"] == "error"
+    assert "Failed to fetch current weather for Goa" in sync[0].content
+    assert "Could not fetch forecast for Goa" in sync[1].content
+    assert memo.stats()["results"] == 0
+
+
+def test_session_does_not_reuse_legacy_failure_strings():
+    counter = _Counter()
+    executor = _executor(counter)
+    first_turn = [
+        HumanMessage(content="Plan a trip to Goa"),
+        AIMessage(content="", tool_calls=[_call("get_current_weather", "Goa", "a")]),
+        ToolMessage(content="Failed to fetch current weather for Goa: timed out", tool_call_id="a"),
+        AIMessage(content="Here is your plan"),
+    ]
+
+    [message] = executor.run(
+        _state(_call("get_current_weather", "Goa", "b"), history=first_turn), deadline_config()
+    )["messages"]
+
+    assert counter.calls == 1
+    assert message.content == "Current weather in Goa: 30°C"
+
+
+def test_has_failed_results():
+    plan = [HumanMessage(content="Trip to Goa"), AIMessage(content="", tool_calls=[_call("get_current_weather", "Goa", "a")])]
+    ok = ToolMessage(content="Current weather in Goa: 30°C", tool_call_id="a")
+    error = ToolMessage(content='{"status": "timed_out"}', tool_call_id="a", status="error")
+    legacy = ToolMessage(content="Could not fetch forecast for Goa", tool_call_id="a")
+
+    assert not has_failed_results([*plan, ok, AIMessage(content="plan")])
+    assert has_failed_results([*plan, error, AIMessage(content="plan")])
+    assert has_failed_results([*plan, legacy, AIMessage(content="plan")])
+    # Only tool results count: the final answer may mention a failure.
+    assert not has_failed_results([*plan, ok, AIMessage(content="Failed to fetch tickets, book early")])
@@ -1,9 +1,6 @@
-from langchain_community.utilities.alpha_vantage import AlphaVantageAPIWrapper
 from langchain.tools import tool
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from langchain_core.tools import StructuredTool
+from utils.currency_converter import aalpha_vantage_rate, alpha_vantage_rate
 
 
 @tool
@@ -18,26 +15,35 @@ def add(a: int, b: int) -> int:
     return a + b
 
 
-@tool
-def currency_converter(from_curr: str, to_curr: str, value: float) -> float:
+def _currency_converter(from_curr: str, to_curr: str, value: float) -> float:
     """Convert currency using real-time Alpha Vantage rates."""
-    api_key = os.getenv("ALPHAVANTAGE_API_KEY")
-    if not api_key:
-        raise EnvironmentError("ALPHAVANTAGE_API_KEY is not set")
+    try:
+        return value * alpha_vantage_rate(from_curr, to_curr)
 
-    os.environ["ALPHAVANTAGE_API_KEY"] = api_key
-    alpha_vantage = AlphaVantageAPIWrapper()
+    except EnvironmentError:
+        raise
+
+    except Exception as e:
+        raise RuntimeError(
+            f"Currency conversion failed ({from_curr} → {to_curr}, value={value}): {e}"
+        ) from e
 
-    try:
-        response = alpha_vantage.get_exchange_rate(from_curr, to_curr)
 
-        rate = float(
-            response["Realtime Currency Exchange Rate"]["5. Exchange Rate"]
-        )
+async def _acurrency_converter(from_curr: str, to_curr: str, value: float) -> float:
+    try:
+        return value * await aalpha_vantage_rate(from_curr, to_curr)
 
-        return value * rate
+    except EnvironmentError:
+        raise
 
     except Exception as e:
         raise RuntimeError(
             f"Currency conversion failed ({from_curr} → {to_curr}, value={value}): {e}"
         ) from e
+
+
+currency_converter = StructuredTool.from_function(
+    func=_currency_converter,
+    coroutine=_acurrency_converter,
+    name="currency_converter",
+)
@@ -1,25 +1,25 @@
-import os
 from utils.currency_converter import CurrencyConverter
 from typing import List
-from langchain.tools import tool
-from dotenv import load_dotenv
+from langchain_core.tools import StructuredTool
+from utils.settings import get_settings
 
 
 class CurrencyConverterTool:
     def __init__(self):
-        load_dotenv()
+        settings = get_settings()
 
-        self.api_key = os.getenv("EXCHANGE_RATE_API_KEY")
+        self.api_key = settings.exchange_rate_api_key
         if not self.api_key:
             raise EnvironmentError("EXCHANGE_RATE_API_KEY is not set")
 
-        self.currency_service = CurrencyConverter(self.api_key)
+        self.currency_service = CurrencyConverter.from_config(
+            self.api_key, settings.section("cache").get("currency")
+        )
         self.currency_converter_tool_list = self._setup_tools()
 
     def _setup_tools(self) -> List:
         """Setup all tools for the currency converter tool"""
 
-        @tool("convert_currency")
         def convert_currency(amount: float, from_currency: str, to_currency: str) -> float:
             """
             Convert an amount of money from one currency to another.
@@ -40,4 +40,19 @@ class CurrencyConverterTool:
                     f"({amount} {from_currency} → {to_currency}): {e}"
                 ) from e
 
-        return [convert_currency]
+        async def aconvert_currency(amount: float, from_currency: str, to_currency: str) -> float:
+            try:
+                return await self.currency_service.aconvert(amount, from_currency, to_currency)
+            except Exception as e:
+                raise RuntimeError(
+                    f"Currency conversion failed "
+                    f"({amount} {from_currency} → {to_currency}): {e}"
+                ) from e
+
+        return [
+            StructuredTool.from_function(
+                func=convert_currency,
+                coroutine=aconvert_currency,
+                name="convert_currency",
+            ),
+        ]
@@ -1,6 +1,6 @@
 from utils.expense_calculator import Calculator
 from typing import List
-from langchain.tools import tool
+from langchain_core.tools import StructuredTool
 
 
 class CalculatorTool:
@@ -11,7 +11,6 @@ class CalculatorTool:
     def _setup_tools(self) -> List:
         """Setup all tools for the calculator tool"""
 
-        @tool("estimate_total_hotel_cost")
         def estimate_total_hotel_cost(price_per_night: float, total_days: int) -> float:
             """
             Calculate total hotel cost.
@@ -33,7 +32,6 @@ class CalculatorTool:
                     f"(price_per_night={price_per_night}, total_days={total_days}): {e}"
                 ) from e
 
-        @tool("calculate_total_expense")
         def calculate_total_expense(costs: list[float]) -> float:
             """
             Calculate total expense of the trip.
@@ -56,7 +54,6 @@ class CalculatorTool:
                     f"Failed to calculate total expense (costs={costs}): {e}"
                 ) from e
 
-        @tool("calculate_daily_expense_budget")
         def calculate_daily_expense_budget(total_cost: float, days: int) -> float:
             """
             Calculate daily expense budget.
@@ -83,8 +80,31 @@ class CalculatorTool:
                     f"(total_cost={total_cost}, days={days}): {e}"
                 ) from e
 
+        # Pure arithmetic: the async variants run inline instead of paying for
+        # a thread-pool hop.
+        async def aestimate_total_hotel_cost(price_per_night: float, total_days: int) -> float:
+            return estimate_total_hotel_cost(price_per_night, total_days)
+
+        async def acalculate_total_expense(costs: list[float]) -> float:
+            return calculate_total_expense(costs)
+
+        async def acalculate_daily_expense_budget(total_cost: float, days: int) -> float:
+            return calculate_daily_expense_budget(total_cost, days)
+
         return [
-            estimate_total_hotel_cost,
-            calculate_total_expense,
-            calculate_daily_expense_budget,
+            StructuredTool.from_function(
+                func=estimate_total_hotel_cost,
+                coroutine=aestimate_total_hotel_cost,
+                name="estimate_total_hotel_cost",
+            ),
+            StructuredTool.from_function(
+                func=calculate_total_expense,
+                coroutine=acalculate_total_expense,
+                name="calculate_total_expense",
+            ),
+            StructuredTool.from_function(
+                func=calculate_daily_expense_budget,
+                coroutine=acalculate_daily_expense_budget,
+                name="calculate_daily_expense_budget",
+            ),
         ]
@@ -1,147 +1,282 @@
-import os
-from utils.place_info_search import GooglePlaceSearchTool, TavilyPlaceSearchTool
+import asyncio
+from typing import Optional
+from logger.logging import get_logger
+from utils.circuit_breaker import CircuitBreaker
+from utils.place_info_search import (
+    GooglePlaceSearchTool,
+    PlaceSearchCache,
+    TavilyPlaceSearchTool,
+)
+from utils.place_records import (
+    DEFAULT_MAX_PLACES,
+    DEFAULT_MAX_TOKENS,
+    LINE_FORMAT,
+    PlaceResults,
+    format_places,
+)
 from typing import List
-from langchain.tools import tool
-from dotenv import load_dotenv
+from langchain_core.tools import StructuredTool
+from utils.settings import get_settings
+
+
+log = get_logger("place_search")
+
+
+GOOGLE_HEADERS = {
+    "attractions": "Following are the attractions of {place} as suggested by Google",
+    "restaurants": "Following are the restaurants of {place} as suggested by Google",
+    "activities": "Following are the activities in and around {place} as suggested by Google",
+    "transportation": (
+        "Following are the modes of transportation available in {place} "
+        "as suggested by Google"
+    ),
+}
+
+TAVILY_HEADERS = {
+    "attractions": "Following are the attractions of {place} (via Tavily)",
+    "restaurants": "Following are the restaurants of {place} (via Tavily)",
+    "activities": "Following are the activities of {place} (via Tavily)",
+    "transportation": (
+        "Following are the modes of transportation available in {place} "
+        "(via Tavily)"
+    ),
+}
+
+DEFAULT_HEDGE_MIN_DELAY = 0.3
+DEFAULT_HEDGE_MAX_DELAY = 5.0
 
 
 class PlaceSearchTool:
+    """Place search tools: Google Places first, Tavily as the fallback.
+
+    Each provider has a circuit breaker fed by its live latency and error
+    EWMAs. While Google's circuit is open, calls go straight to Tavily.
+    With hedging on, the async path also starts Tavily once Google has
+    been silent for its observed p95 latency and returns whichever
+    answers first.
+    """
+
     def __init__(self):
-        load_dotenv()
+        settings = get_settings()
+        search_config = settings.section("place_search")
+        hedging_config = search_config.get("hedging", {})
+        breaker_config = search_config.get("breaker")
+
+        self.google_api_key = settings.gplaces_api_key
+        self.cache = PlaceSearchCache.from_config(
+            settings.section("cache").get("places")
+        )
+        self.google_breaker = CircuitBreaker.from_config("google_places", breaker_config)
+        self.tavily_breaker = CircuitBreaker.from_config("tavily", breaker_config)
 
-        self.google_api_key = os.getenv("GPLACES_API_KEY")
+        self.hedging = bool(hedging_config.get("enabled", True))
+        self.hedge_min_delay = float(hedging_config.get("min_delay_seconds", DEFAULT_HEDGE_MIN_DELAY))
+        self.hedge_max_delay = float(hedging_config.get("max_delay_seconds", DEFAULT_HEDGE_MAX_DELAY))
+
+        # Token budget of each category's tool output.
+        output_config = search_config.get("output", {})
+        budgets = dict(output_config.get("max_tokens") or {})
+        self.default_max_tokens = int(budgets.pop("default", DEFAULT_MAX_TOKENS))
+        self.max_tokens = {category: int(tokens) for category, tokens in budgets.items()}
+        self.max_places = int(output_config.get("max_places", DEFAULT_MAX_PLACES))
 
         if not self.google_api_key:
-            print(
-                "⚠️ GPLACES_API_KEY not set — Google Places disabled, using Tavily only")
+            log.warning("⚠️ GPLACES_API_KEY not set — Google Places disabled, using Tavily only")
             self.google_places_search = None
         else:
             self.google_places_search = GooglePlaceSearchTool(
-                self.google_api_key)
+                self.google_api_key, cache=self.cache, breaker=self.google_breaker)
 
-        self.tavily_search = TavilyPlaceSearchTool()
+        self.tavily_search = TavilyPlaceSearchTool(
+            cache=self.cache, breaker=self.tavily_breaker)
         self.place_search_tool_list = self._setup_tools()
 
+    def _format(self, category: str, result: PlaceResults) -> str:
+        """Best-ranked places as dense lines within the category's token budget."""
+        return format_places(
+            result,
+            max_tokens=self.max_tokens.get(category, self.default_max_tokens),
+            max_places=self.max_places,
+        )
+
+    def _google_answer(self, category: str, place: str, result: PlaceResults) -> str:
+        header = GOOGLE_HEADERS[category].format(place=place)
+        return f"{header} ({LINE_FORMAT}):\n{self._format(category, result)}"
+
+    def _tavily_answer(self, category: str, place: str, result: PlaceResults, reason: str) -> str:
+        if not result.summary and not result.places:
+            return f"{reason}\nNo {category} found for {place}."
+        header = TAVILY_HEADERS[category].format(place=place)
+        return f"{reason}\n{header}:\n{self._format(category, result)}"
+
+    def _google_available(self) -> Optional[str]:
+        """None if Google may be called now, else the reason it is skipped."""
+        if not self.google_places_search:
+            return "Google returned no results."
+        if not self.google_breaker.allow():
+            return "Google Places is unavailable (circuit open)."
+        return None
+
+    def _hedge_delay(self) -> Optional[float]:
+        """How long to wait for Google before also asking Tavily."""
+        if not self.hedging:
+            return None
+
+        # A degraded Google is raced against Tavily right away.
+        if self.google_breaker.error_ewma >= self.google_breaker.error_rate_threshold:
+            return 0.0
+
+        p95 = self.google_breaker.latency_p95()
+        if p95 is None:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, p95))
+
+    def _search(self, category: str, place: str) -> str:
+        """Search Google Places first, falling back to Tavily."""
+        skip_reason = self._google_available()
+        if skip_reason:
+            tavily_result = self.tavily_search.search(category, place)
+            return self._tavily_answer(category, place, tavily_result, skip_reason)
+
+        try:
+            result = self.google_places_search.search(category, place)
+            if result.places:
+                return self._google_answer(category, place, result)
+
+            tavily_result = self.tavily_search.search(category, place)
+            return self._tavily_answer(
+                category, place, tavily_result, "Google returned no results."
+            )
+
+        except Exception as e:
+            tavily_result = self.tavily_search.search(category, place)
+            return self._tavily_answer(
+                category, place, tavily_result, f"Google failed due to: {e}"
+            )
+
+    @staticmethod
+    def _detach(task: asyncio.Task) -> None:
+        """Let a losing task finish in the background (it still feeds the
+        cache and breaker) without an unretrieved-exception warning."""
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _ahedged(self, category: str, place: str, google: asyncio.Task, delay: float) -> str:
+        log.info("🏁 Hedging %s for %s: Google silent for %.2fs, asking Tavily too", category, place, delay)
+        tavily = asyncio.ensure_future(self.tavily_search.asearch(category, place))
+        pending = {google, tavily}
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            if google in done and not google.exception() and google.result().places:
+                tavily.cancel()
+                return self._google_answer(category, place, google.result())
+
+            if tavily in done and not tavily.exception():
+                self._detach(google)
+                return self._tavily_answer(
+                    category, place, tavily.result(),
+                    "Google was slower than usual; answered by the hedged Tavily request.",
+                )
+
+        # Both failed (or Google came back empty and Tavily failed).
+        return await tavily
+
+    async def _asearch(self, category: str, place: str) -> str:
+        """Async counterpart of `_search`, with optional hedging."""
+        skip_reason = self._google_available()
+        if skip_reason:
+            tavily_result = await self.tavily_search.asearch(category, place)
+            return self._tavily_answer(category, place, tavily_result, skip_reason)
+
+        google = asyncio.ensure_future(self.google_places_search.asearch(category, place))
+        delay = self._hedge_delay()
+        if delay is not None:
+            try:
+                done, _ = await asyncio.wait({google}, timeout=delay)
+            except asyncio.CancelledError:
+                google.cancel()
+                raise
+            if not done:
+                return await self._ahedged(category, place, google, delay)
+
+        try:
+            result = await google
+            if result.places:
+                return self._google_answer(category, place, result)
+
+            tavily_result = await self.tavily_search.asearch(category, place)
+            return self._tavily_answer(
+                category, place, tavily_result, "Google returned no results."
+            )
+
+        except Exception as e:
+            tavily_result = await self.tavily_search.asearch(category, place)
+            return self._tavily_answer(
+                category, place, tavily_result, f"Google failed due to: {e}"
+            )
+
+    def health(self) -> dict:
+        """Breaker state and latency/error EWMAs per provider."""
+        return {
+            "google_places": {
+                "enabled": self.google_places_search is not None,
+                **self.google_breaker.stats(),
+            },
+            "tavily": self.tavily_breaker.stats(),
+            "hedging": self.hedging,
+        }
+
     def _setup_tools(self) -> List:
         """Setup all tools for the place search tool"""
 
-        @tool("search_attractions")
         def search_attractions(place: str) -> str:
             """Search tourist attractions in a place."""
-            try:
-                if self.google_places_search:
-                    result = self.google_places_search.google_search_attractions(
-                        place)
-                    if result:
-                        return (
-                            f"Following are the attractions of {place} "
-                            f"as suggested by Google:\n{result}"
-                        )
-
-                tavily_result = self.tavily_search.tavily_search_attractions(
-                    place)
-                return (
-                    f"Google returned no results.\n"
-                    f"Following are the attractions of {place} (via Tavily):\n{tavily_result}"
-                )
+            return self._search("attractions", place)
 
-            except Exception as e:
-                tavily_result = self.tavily_search.tavily_search_attractions(
-                    place)
-                return (
-                    f"Google failed due to: {e}\n"
-                    f"Following are the attractions of {place} (via Tavily):\n{tavily_result}"
-                )
+        async def asearch_attractions(place: str) -> str:
+            return await self._asearch("attractions", place)
 
-        @tool("search_restaurants")
         def search_restaurants(place: str) -> str:
             """Search restaurants in a place."""
-            try:
-                if self.google_places_search:
-                    result = self.google_places_search.google_search_restaurants(
-                        place)
-                    if result:
-                        return (
-                            f"Following are the restaurants of {place} "
-                            f"as suggested by Google:\n{result}"
-                        )
-
-                tavily_result = self.tavily_search.tavily_search_restaurants(
-                    place)
-                return (
-                    f"Google returned no results.\n"
-                    f"Following are the restaurants of {place} (via Tavily):\n{tavily_result}"
-                )
+            return self._search("restaurants", place)
 
-            except Exception as e:
-                tavily_result = self.tavily_search.tavily_search_restaurants(
-                    place)
-                return (
-                    f"Google failed due to: {e}\n"
-                    f"Following are the restaurants of {place} (via Tavily):\n{tavily_result}"
-                )
+        async def asearch_restaurants(place: str) -> str:
+            return await self._asearch("restaurants", place)
 
-        @tool("search_activities")
         def search_activities(place: str) -> str:
             """Search activities in and around a place."""
-            try:
-                if self.google_places_search:
-                    result = self.google_places_search.google_search_activity(
-                        place)
-                    if result:
-                        return (
-                            f"Following are the activities in and around {place} "
-                            f"as suggested by Google:\n{result}"
-                        )
-
-                tavily_result = self.tavily_search.tavily_search_activity(
-                    place)
-                return (
-                    f"Google returned no results.\n"
-                    f"Following are the activities of {place} (via Tavily):\n{tavily_result}"
-                )
+            return self._search("activities", place)
 
-            except Exception as e:
-                tavily_result = self.tavily_search.tavily_search_activity(
-                    place)
-                return (
-                    f"Google failed due to: {e}\n"
-                    f"Following are the activities of {place} (via Tavily):\n{tavily_result}"
-                )
+        async def asearch_activities(place: str) -> str:
+            return await self._asearch("activities", place)
 
-        @tool("search_transportation")
         def search_transportation(place: str) -> str:
             """Search transportation options in a place."""
-            try:
-                if self.google_places_search:
-                    result = self.google_places_search.google_search_transportation(
-                        place)
-                    if result:
-                        return (
-                            f"Following are the modes of transportation available in {place} "
-                            f"as suggested by Google:\n{result}"
-                        )
-
-                tavily_result = self.tavily_search.tavily_search_transportation(
-                    place)
-                return (
-                    f"Google returned no results.\n"
-                    f"Following are the modes of transportation available in {place} "
-                    f"(via Tavily):\n{tavily_result}"
-                )
+            return self._search("transportation", place)
 
-            except Exception as e:
-                tavily_result = self.tavily_search.tavily_search_transportation(
-                    place)
-                return (
-                    f"Google failed due to: {e}\n"
-                    f"Following are the modes of transportation available in {place} "
-                    f"(via Tavily):\n{tavily_result}"
-                )
+        async def asearch_transportation(place: str) -> str:
+            return await self._asearch("transportation", place)
 
         return [
-            search_attractions,
-            search_restaurants,
-            search_activities,
-            search_transportation,
+            StructuredTool.from_function(
+                func=search_attractions,
+                coroutine=asearch_attractions,
+                name="search_attractions",
+            ),
+            StructuredTool.from_function(
+                func=search_restaurants,
+                coroutine=asearch_restaurants,
+                name="search_restaurants",
+            ),
+            StructuredTool.from_function(
+                func=search_activities,
+                coroutine=asearch_activities,
+                name="search_activities",
+            ),
+            StructuredTool.from_function(
+                func=search_transportation,
+                coroutine=asearch_transportation,
+                name="search_transportation",
+            ),
         ]
@@ -1,81 +1,116 @@
-import os
-from utils.weather_info import WeatherForecastTool
-from langchain.tools import tool
+from utils.settings import get_settings
+from utils.weather_info import WeatherCache, WeatherForecastTool
+from langchain_core.tools import StructuredTool
 from typing import List
-from dotenv import load_dotenv
 
 
 class WeatherInfoTool:
     def __init__(self):
-        load_dotenv()
+        settings = get_settings()
 
-        self.api_key = os.getenv("OPENWEATHERMAP_API_KEY")
+        self.api_key = settings.openweathermap_api_key
         if not self.api_key:
             raise EnvironmentError("OPENWEATHERMAP_API_KEY is not set")
 
-        self.weather_service = WeatherForecastTool(self.api_key)
+        self.cache = WeatherCache.from_config(
+            settings.section("cache").get("weather")
+        )
+        self.weather_service = WeatherForecastTool(self.api_key, cache=self.cache)
         self.weather_tool_list = self._setup_tools()
 
-    def _setup_tools(self) -> List:
-        """Setup all tools for the weather forecast tool"""
+    @staticmethod
+    def _format_current_weather(city: str, weather_data: dict) -> str:
+        """Render a current-weather payload for the LLM."""
+        if not weather_data:
+            raise RuntimeError(f"Could not fetch current weather for {city}")
 
-        @tool("get_current_weather")
-        def get_current_weather(city: str) -> str:
-            """Get current weather for a city."""
-            try:
-                weather_data = self.weather_service.get_current_weather(city)
+        temp = weather_data.get("main", {}).get("temp", "N/A")
+        desc = weather_data.get("weather", [{}])[
+            0].get("description", "N/A")
 
-                if not weather_data:
-                    return f"Could not fetch current weather for {city}"
+        return f"Current weather in {city}: {temp}°C, {desc}"
 
-                temp = weather_data.get("main", {}).get("temp", "N/A")
-                desc = weather_data.get("weather", [{}])[
-                    0].get("description", "N/A")
+    @staticmethod
+    def _format_forecast(city: str, forecast_data: dict) -> str:
+        """Render a forecast payload as a daily summary for the LLM."""
+        if not forecast_data or "list" not in forecast_data:
+            raise RuntimeError(f"Could not fetch forecast for {city}")
 
-                return f"Current weather in {city}: {temp}°C, {desc}"
+        daily_seen = set()
+        forecast_summary = []
 
-            except Exception as e:
-                return f"Failed to fetch current weather for {city}: {e}"
+        for item in forecast_data["list"]:
+            date = item.get("dt_txt", "").split(" ")[0]
+            if not date or date in daily_seen:
+                continue
 
-        @tool("get_weather_forecast")
-        def get_weather_forecast(city: str) -> str:
-            """Get 5-day weather forecast for a city (daily summary)."""
-            try:
-                forecast_data = self.weather_service.get_forecast_weather(city)
+            daily_seen.add(date)
 
-                if not forecast_data or "list" not in forecast_data:
-                    return f"Could not fetch forecast for {city}"
+            temp = item.get("main", {}).get("temp", "N/A")
+            desc = item.get("weather", [{}])[
+                0].get("description", "N/A")
 
-                daily_seen = set()
-                forecast_summary = []
+            forecast_summary.append(
+                f"{date}: {temp}°C, {desc}"
+            )
 
-                for item in forecast_data["list"]:
-                    date = item.get("dt_txt", "").split(" ")[0]
-                    if not date or date in daily_seen:
-                        continue
+            if len(forecast_summary) >= 5:
+                break
 
-                    daily_seen.add(date)
+        if not forecast_summary:
+            raise RuntimeError(f"Could not fetch forecast for {city}")
 
-                    temp = item.get("main", {}).get("temp", "N/A")
-                    desc = item.get("weather", [{}])[
-                        0].get("description", "N/A")
+        return (
+            f"Weather forecast for {city} (next 5 days):\n"
+            + "\n".join(forecast_summary)
+        )
+
+    def _setup_tools(self) -> List:
+        """Setup all tools for the weather forecast tool"""
 
-                    forecast_summary.append(
-                        f"{date}: {temp}°C, {desc}"
-                    )
+        def get_current_weather(city: str) -> str:
+            """Get current weather for a city."""
+            try:
+                weather_data = self.weather_service.get_current_weather(city)
+            except Exception as e:
+                raise RuntimeError(f"Failed to fetch current weather for {city}: {e}") from e
 
-                    if len(forecast_summary) >= 5:
-                        break
+            return self._format_current_weather(city, weather_data)
 
-                if not forecast_summary:
-                    return f"Could not fetch forecast for {city}"
+        async def aget_current_weather(city: str) -> str:
+            try:
+                weather_data = await self.weather_service.aget_current_weather(city)
+            except Exception as e:
+                raise RuntimeError(f"Failed to fetch current weather for {city}: {e}") from e
 
-                return (
-                    f"Weather forecast for {city} (next 5 days):\n"
-                    + "\n".join(forecast_summary)
-                )
+            return self._format_current_weather(city, weather_data)
 
+        def get_weather_forecast(city: str) -> str:
+            """Get 5-day weather forecast for a city (daily summary)."""
+            try:
+                forecast_data = self.weather_service.get_forecast_weather(city)
             except Exception as e:
-                return f"Failed to fetch forecast for {city}: {e}"
+                raise RuntimeError(f"Failed to fetch forecast for {city}: {e}") from e
 
-        return [get_current_weather, get_weather_forecast]
+            return self._format_forecast(city, forecast_data)
+
+        async def aget_weather_forecast(city: str) -> str:
+            try:
+                forecast_data = await self.weather_service.aget_forecast_weather(city)
+            except Exception as e:
+                raise RuntimeError(f"Failed to fetch forecast for {city}: {e}") from e
+
+            return self._format_forecast(city, forecast_data)
+
+        return [
+            StructuredTool.from_function(
+                func=get_current_weather,
+                coroutine=aget_current_weather,
+                name="get_current_weather",
+            ),
+            StructuredTool.from_function(
+                func=get_weather_forecast,
+                coroutine=aget_weather_forecast,
+                name="get_weather_forecast",
+            ),
+        ]
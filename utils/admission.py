@@ -0,0 +1,232 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)  # served in this order
+
+DEFAULT_MAX_IN_FLIGHT = 32
+DEFAULT_MAX_QUEUE = 256
+DEFAULT_MAX_PER_CLIENT = 8
+DEFAULT_MAX_WAIT = 30.0
+
+# Initial guess for one graph run until real timings come in.
+DEFAULT_SERVICE_SECONDS = 10.0
+EWMA_ALPHA = 0.2
+WAIT_SAMPLES = 1000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted; carries the HTTP response fields."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("client", "priority", "future", "enqueued_at")
+
+    def __init__(self, client: str, priority: str, future: asyncio.Future):
+        self.client = client
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class Ticket:
+    """Proof of admission; pass it back to `AdmissionController.release`."""
+
+    __slots__ = ("client", "admitted_at", "released")
+
+    def __init__(self, client: str):
+        self.client = client
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+
+class AdmissionController:
+    """Bounded-concurrency front door for graph runs.
+
+    At most `max_in_flight` requests run at once. Others wait in a queue
+    per priority class; interactive requests are always dispatched before
+    batch ones, and within a class clients are served round-robin so one
+    caller cannot monopolize the workers. Requests are rejected fast:
+    429 when a client exceeds its own quota, 503 when the queue is full or
+    the wait exceeds `max_wait` - both with a Retry-After estimate.
+
+    Meant to be used from a single event loop (one per server worker).
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        max_per_client: int = DEFAULT_MAX_PER_CLIENT,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_per_client = max_per_client
+        self.max_wait = max_wait
+
+        self.in_flight = 0
+        self._queues = {p: OrderedDict() for p in PRIORITIES}
+        self._queued = 0
+        self._per_client = {}
+        self._service_seconds = DEFAULT_SERVICE_SECONDS
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._counts = {"admitted": 0, "queued": 0, "rejected_client_quota": 0,
+                        "rejected_queue_full": 0, "rejected_wait_timeout": 0}
+
+    @classmethod
+    def from_config(cls, admission_config: Optional[dict]) -> Optional["AdmissionController"]:
+        """Build the controller from the `admission` section of config.yaml."""
+        admission_config = admission_config or {}
+        if not admission_config.get("enabled", True):
+            return None
+
+        return cls(
+            max_in_flight=int(admission_config.get("max_in_flight", DEFAULT_MAX_IN_FLIGHT)),
+            max_queue=int(admission_config.get("max_queue", DEFAULT_MAX_QUEUE)),
+            max_per_client=int(admission_config.get("max_per_client", DEFAULT_MAX_PER_CLIENT)),
+            max_wait=float(admission_config.get("max_wait_seconds", DEFAULT_MAX_WAIT)),
+        )
+
+    # ---------------------------
+    # Helpers
+    # ---------------------------
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the average run time."""
+        backlog = (self._queued + 1) / max(1, self.max_in_flight)
+        return max(1, math.ceil(self._service_seconds * backlog))
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        self._counts[f"rejected_{reason}"] += 1
+        return AdmissionRejected(status_code, reason, self.retry_after())
+
+    def _client_delta(self, client: str, delta: int) -> None:
+        count = self._per_client.get(client, 0) + delta
+        if count > 0:
+            self._per_client[client] = count
+        else:
+            self._per_client.pop(client, None)
+
+    def _admit(self, client: str) -> Ticket:
+        self.in_flight += 1
+        self._counts["admitted"] += 1
+        return Ticket(client)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                client, waiters = next(iter(queue.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    queue.move_to_end(client)  # round-robin between clients
+                else:
+                    del queue[client]
+
+                self._queued -= 1
+                if not waiter.future.done():
+                    return waiter
+        return None
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.max_in_flight:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._waits.append(time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(self._admit(waiter.client))
+
+    def _dequeue(self, waiter: _Waiter) -> None:
+        queue = self._queues[waiter.priority]
+        waiters = queue.get(waiter.client)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued -= 1
+            if not waiters:
+                del queue[waiter.client]
+
+    # ---------------------------
+    # Admission
+    # ---------------------------
+    async def acquire(self, client: str, priority: str = INTERACTIVE) -> Ticket:
+        """Wait for a slot; raises `AdmissionRejected` instead of overloading."""
+        priority = priority if priority in PRIORITIES else INTERACTIVE
+
+        if self._per_client.get(client, 0) >= self.max_per_client:
+            raise self._reject(429, "client_quota")
+
+        if self.in_flight < self.max_in_flight and not self._queued:
+            self._client_delta(client, 1)
+            self._waits.append(0.0)
+            return self._admit(client)
+
+        if self._queued >= self.max_queue:
+            raise self._reject(503, "queue_full")
+
+        waiter = _Waiter(client, priority, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(client, deque()).append(waiter)
+        self._queued += 1
+        self._counts["queued"] += 1
+        self._client_delta(client, 1)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait)
+
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as we gave up: hand the slot back.
+                self.release(waiter.future.result())
+            else:
+                waiter.future.cancel()
+                self._dequeue(waiter)
+                self._client_delta(client, -1)
+
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(503, "wait_timeout") from e
+            raise
+
+    def release(self, ticket: Ticket) -> None:
+        if ticket.released:
+            return
+
+        ticket.released = True
+        elapsed = time.monotonic() - ticket.admitted_at
+        self._service_seconds += EWMA_ALPHA * (elapsed - self._service_seconds)
+
+        self.in_flight -= 1
+        self._client_delta(ticket.client, -1)
+        self._dispatch()
+
+    # ---------------------------
+    # Metrics
+    # ---------------------------
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1)
+
+        return {
+            **self._counts,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": {p: sum(len(w) for w in q.values()) for p, q in self._queues.items()},
+            "max_queue": self.max_queue,
+            "clients": len(self._per_client),
+            "wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99)},
+            "avg_service_seconds": round(self._service_seconds, 2),
+            "retry_after_seconds": self.retry_after(),
+        }
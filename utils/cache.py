@@ -0,0 +1,404 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, NamedTuple, Optional, Tuple
+
+from logger.logging import get_logger
+from utils.profiler import JSON_PARSING, phase
+from utils.singleflight import SingleFlight
+from utils.thread_pool import get_executor, run_in_thread
+
+
+log = get_logger("cache")
+
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+def normalize_key(text: str) -> str:
+    """Normalize free text for cache keys ("  Goa, India " -> "goa india")."""
+    return " ".join(re.sub(r"[^\w\s-]", " ", str(text).lower()).split())
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float
+    ttl: float
+    stale_ttl: float
+
+    def state(self, now: float) -> str:
+        age = now - self.stored_at
+        if age < self.ttl:
+            return FRESH
+        if age < self.ttl + self.stale_ttl:
+            return STALE
+        return MISS
+
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters."""
+
+    FIELDS = ("hits", "stale_hits", "misses", "evictions", "expirations", "writes", "refresh_errors")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {field: 0 for field in self.FIELDS}
+
+    def incr(self, field: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[field] += amount
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+
+        lookups = counts["hits"] + counts["stale_hits"] + counts["misses"]
+        counts["hit_ratio"] = (
+            round((counts["hits"] + counts["stale_hits"]) / lookups, 4) if lookups else 0.0
+        )
+        return counts
+
+
+class LRUCache:
+    """Bounded in-memory LRU of `CacheEntry` objects.
+
+    With `max_age`, an entry is dropped that many seconds after it was
+    copied in, so a shared tier behind it is re-read (and writes or
+    deletes by other workers become visible) within that bound.
+    """
+
+    def __init__(self, max_entries: int = 1024, stats: Optional[CacheStats] = None,
+                 max_age: Optional[float] = None):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be greater than zero")
+
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.stats = stats or CacheStats()
+        # key -> (entry, monotonic time it was copied in)
+        self._entries: "OrderedDict[str, Tuple[CacheEntry, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+
+            entry, copied_at = item
+            if self.max_age is not None and time.monotonic() - copied_at >= self.max_age:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.incr("evictions")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheStore:
+    """On-disk store that survives restarts and is shared by workers on one host."""
+
+    def __init__(self, path: str, table: str = "cache"):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name '{table}'")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, ttl REAL NOT NULL, stale_ttl REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, stored_at, ttl, stale_ttl FROM {self.table} WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        value, stored_at, ttl, stale_ttl = row
+        with phase(JSON_PARSING):
+            value = json.loads(value)
+        return CacheEntry(value, stored_at, ttl, stale_ttl)
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, value, stored_at, ttl, stale_ttl) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(entry.value), entry.stored_at, entry.ttl, entry.stale_ttl),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Delete entries past their stale window; returns the number removed."""
+        now = time.time() if now is None else now
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE stored_at + ttl + stale_ttl <= ?",
+                (now,),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """Per-worker in-memory LRU (L1) in front of an optional shared store.
+
+    The store is SQLite, a shared-memory file or Redis (see
+    `utils.shared_cache`). Both tiers hold the same `CacheEntry`, so an
+    entry is fresh, stale or expired at the same moment in either;
+    `local_ttl` bounds how long L1 trusts its copy before re-reading the
+    store.
+
+    Entries have a TTL plus a stale window. A stale entry is served
+    immediately while a single background refresh replaces it
+    (stale-while-revalidate). Concurrent misses for the same key share one
+    computation.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        store=None,
+        default_ttl: float = 3600.0,
+        default_stale_ttl: float = 0.0,
+        local_ttl: Optional[float] = None,
+    ):
+        self.stats = CacheStats()
+        self.memory = LRUCache(max_entries, stats=self.stats, max_age=local_ttl)
+        self.store = store
+        self.default_ttl = default_ttl
+        self.default_stale_ttl = default_stale_ttl
+        self.singleflight = SingleFlight()
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._background_tasks = set()
+
+    # ---------------------------
+    # Raw access
+    # ---------------------------
+    def _entry(self, key: str) -> Optional[CacheEntry]:
+        entry = self.memory.get(key)
+
+        if entry is None and self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                self.memory.set(key, entry)
+
+        return entry
+
+    def peek(self, key: str) -> Tuple[Any, str]:
+        """Like `lookup` but without touching the hit/miss counters."""
+        entry = self._entry(key)
+        if entry is None:
+            return None, MISS
+
+        state = entry.state(time.time())
+        return (None, MISS) if state == MISS else (entry.value, state)
+
+    def lookup(self, key: str) -> Tuple[Any, str]:
+        """Return (value, state) where state is fresh, stale or miss."""
+        now = time.time()
+        entry = self._entry(key)
+
+        if entry is None:
+            self.stats.incr("misses")
+            return None, MISS
+
+        state = entry.state(now)
+        if state == FRESH:
+            self.stats.incr("hits")
+        elif state == STALE:
+            self.stats.incr("stale_hits")
+        else:
+            self.stats.incr("expirations")
+            self.stats.incr("misses")
+            self.delete(key)
+            return None, MISS
+
+        return entry.value, state
+
+    async def alookup(self, key: str) -> Tuple[Any, str]:
+        """`lookup` that reads the store off the event loop on an L1 miss."""
+        if self.store is None or self.memory.get(key) is not None:
+            return self.lookup(key)
+        return await run_in_thread(self.lookup, key)
+
+    def get(self, key: str) -> Any:
+        """Return a fresh or stale value, or None."""
+        return self.lookup(key)[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, stale_ttl: Optional[float] = None) -> None:
+        entry = CacheEntry(
+            value,
+            time.time(),
+            self.default_ttl if ttl is None else ttl,
+            self.default_stale_ttl if stale_ttl is None else stale_ttl,
+        )
+        self.memory.set(key, entry)
+        if self.store is not None:
+            self.store.set(key, entry)
+        self.stats.incr("writes")
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None,
+                   stale_ttl: Optional[float] = None) -> None:
+        if self.store is None:
+            self.set(key, value, ttl, stale_ttl)
+        else:
+            await run_in_thread(self.set, key, value, ttl, stale_ttl)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.store is not None:
+            self.store.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    # ---------------------------
+    # Read-through helpers
+    # ---------------------------
+    def _claim_refresh(self, key: str) -> bool:
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, key: str) -> None:
+        with self._refresh_lock:
+            self._refreshing.discard(key)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+    ) -> Any:
+        value, state = self.lookup(key)
+
+        if state == FRESH:
+            return value
+
+        if state == STALE:
+            if self._claim_refresh(key):
+                get_executor().submit(self._refresh, key, compute, ttl, stale_ttl)
+            return value
+
+        def _compute_and_store():
+            result = compute()
+            self.set(key, result, ttl, stale_ttl)
+            return result
+
+        return self.singleflight.do(key, _compute_and_store)
+
+    def _refresh(self, key, compute, ttl, stale_ttl) -> None:
+        try:
+            self.set(key, compute(), ttl, stale_ttl)
+        except Exception as e:
+            # Keep serving the stale value; the next lookup retries.
+            self.stats.incr("refresh_errors")
+            log.warning("⚠️ Cache refresh failed for %s: %s", key, e)
+        finally:
+            self._release_refresh(key)
+
+    async def aget_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+    ) -> Any:
+        value, state = await self.alookup(key)
+
+        if state == FRESH:
+            return value
+
+        if state == STALE:
+            if self._claim_refresh(key):
+                task = asyncio.create_task(self._arefresh(key, compute, ttl, stale_ttl))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return value
+
+        async def _compute_and_store():
+            result = await compute()
+            await self.aset(key, result, ttl, stale_ttl)
+            return result
+
+        return await self.singleflight.ado(key, _compute_and_store)
+
+    async def _arefresh(self, key, compute, ttl, stale_ttl) -> None:
+        try:
+            await self.aset(key, await compute(), ttl, stale_ttl)
+        except Exception as e:
+            self.stats.incr("refresh_errors")
+            log.warning("⚠️ Cache refresh failed for %s: %s", key, e)
+        finally:
+            self._release_refresh(key)
+
+    def stats_dict(self) -> dict:
+        stats = {
+            **self.stats.as_dict(),
+            "entries": len(self.memory),
+            "coalesced": self.singleflight.stats()["shared"],
+        }
+        if hasattr(self.store, "stats"):
+            stats["shared"] = self.store.stats()
+        return stats
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from logger.logging import get_logger
+
+
+log = get_logger("circuit_breaker")
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_ERROR_RATE_THRESHOLD = 0.5
+DEFAULT_CONSECUTIVE_FAILURES = 5
+DEFAULT_MIN_CALLS = 10
+DEFAULT_OPEN_SECONDS = 30.0
+DEFAULT_MAX_OPEN_SECONDS = 300.0
+DEFAULT_EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 200
+
+
+class CircuitBreaker:
+    """Per-provider health tracker and circuit breaker.
+
+    Every upstream call reports its latency and outcome. The breaker keeps
+    EWMAs of latency and error rate plus a window of recent latencies (for
+    p95). It opens after `consecutive_failures` failures in a row, or when
+    the error-rate EWMA crosses `error_rate_threshold` over at least
+    `min_calls` calls. While open, callers skip the provider; after
+    `open_seconds` a single probe call is let through (half-open). A
+    successful probe closes the circuit, a failed one re-opens it with the
+    cool-down doubled up to `max_open_seconds`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        error_rate_threshold: float = DEFAULT_ERROR_RATE_THRESHOLD,
+        consecutive_failures: int = DEFAULT_CONSECUTIVE_FAILURES,
+        min_calls: int = DEFAULT_MIN_CALLS,
+        open_seconds: float = DEFAULT_OPEN_SECONDS,
+        max_open_seconds: float = DEFAULT_MAX_OPEN_SECONDS,
+        ewma_alpha: float = DEFAULT_EWMA_ALPHA,
+    ):
+        self.name = name
+        self.error_rate_threshold = error_rate_threshold
+        self.consecutive_failures = consecutive_failures
+        self.min_calls = min_calls
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.ewma_alpha = ewma_alpha
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.calls = 0
+        self.failures_in_row = 0
+        self.error_ewma = 0.0
+        self.latency_ewma: Optional[float] = None
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._open_seconds = open_seconds
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._counts = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @classmethod
+    def from_config(cls, name: str, breaker_config: Optional[dict]) -> "CircuitBreaker":
+        breaker_config = breaker_config or {}
+        return cls(
+            name,
+            error_rate_threshold=float(
+                breaker_config.get("error_rate_threshold", DEFAULT_ERROR_RATE_THRESHOLD)
+            ),
+            consecutive_failures=int(
+                breaker_config.get("consecutive_failures", DEFAULT_CONSECUTIVE_FAILURES)
+            ),
+            min_calls=int(breaker_config.get("min_calls", DEFAULT_MIN_CALLS)),
+            open_seconds=float(breaker_config.get("open_seconds", DEFAULT_OPEN_SECONDS)),
+            max_open_seconds=float(
+                breaker_config.get("max_open_seconds", DEFAULT_MAX_OPEN_SECONDS)
+            ),
+        )
+
+    # ---------------------------
+    # Gate
+    # ---------------------------
+    def allow(self) -> bool:
+        """Whether a call may go to this provider right now."""
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == OPEN and now - self._opened_at >= self._open_seconds:
+                self.state = HALF_OPEN
+                self._probe_started_at = None
+
+            if self.state == HALF_OPEN:
+                # One probe at a time; a probe that never reports (e.g. it
+                # was answered from cache) frees the slot after a cool-down.
+                stale = (
+                    self._probe_started_at is not None
+                    and now - self._probe_started_at >= self.base_open_seconds
+                )
+                if self._probe_started_at is None or stale:
+                    self._probe_started_at = now
+                    return True
+
+            if self.state == CLOSED:
+                return True
+
+            self._counts["rejected"] += 1
+            return False
+
+    def _open(self, now: float) -> None:
+        if self.state == HALF_OPEN:
+            self._open_seconds = min(self._open_seconds * 2, self.max_open_seconds)
+        else:
+            self._open_seconds = self.base_open_seconds
+
+        self.state = OPEN
+        self._opened_at = now
+        self._counts["opened"] += 1
+        log.warning("⛔ Circuit for %s opened for %.0fs (error rate %.2f, %d failures in a row)",
+                    self.name, self._open_seconds, self.error_ewma, self.failures_in_row)
+
+    # ---------------------------
+    # Outcomes
+    # ---------------------------
+    def _observe(self, latency: float, failed: bool) -> None:
+        self.calls += 1
+        self.error_ewma += self.ewma_alpha * ((1.0 if failed else 0.0) - self.error_ewma)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.ewma_alpha * (latency - self.latency_ewma)
+        self._latencies.append(latency)
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._observe(latency, failed=False)
+            self._counts["successes"] += 1
+            self.failures_in_row = 0
+
+            if self.state != CLOSED:
+                log.info("✅ Circuit for %s closed", self.name)
+                self.state = CLOSED
+                self._open_seconds = self.base_open_seconds
+
+    def record_failure(self, latency: float) -> None:
+        with self._lock:
+            self._observe(latency, failed=True)
+            self._counts["failures"] += 1
+            self.failures_in_row += 1
+            now = time.monotonic()
+
+            if self.state == HALF_OPEN:
+                self._open(now)
+            elif self.state == CLOSED and (
+                self.failures_in_row >= self.consecutive_failures
+                or (self.calls >= self.min_calls and self.error_ewma >= self.error_rate_threshold)
+            ):
+                self._open(now)
+
+    # ---------------------------
+    # Introspection
+    # ---------------------------
+    def latency_p95(self) -> Optional[float]:
+        """p95 of recent call latencies, or None before `min_calls` samples."""
+        with self._lock:
+            if len(self._latencies) < self.min_calls:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def stats(self) -> dict:
+        p95 = self.latency_p95()
+        with self._lock:
+            return {
+                **self._counts,
+                "state": self.state,
+                "error_rate_ewma": round(self.error_ewma, 3),
+                "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma else None,
+                "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "open_seconds": self._open_seconds,
+            }
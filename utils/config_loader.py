@@ -1,9 +1,32 @@
 import yaml
 import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
 
 
-def load_config(config_path: str = "config/config.yaml") -> dict:
-    with open(config_path, "r") as file:
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIG_PATH = "config/config.yaml"
+
+
+def resolve_config_path(config_path: Optional[str] = None) -> Path:
+    """Config file location: explicit path, $TRIP_PLANNER_CONFIG, or the repo default.
+
+    Relative paths are resolved against the project root, not the CWD.
+    """
+    path = Path(config_path or os.getenv("TRIP_PLANNER_CONFIG") or DEFAULT_CONFIG_PATH)
+    if not path.is_absolute():
+        path = PROJECT_ROOT / path
+    return path
+
+
+@lru_cache(maxsize=None)
+def _read_config(path: Path) -> dict:
+    with open(path, "r") as file:
         config = yaml.safe_load(file)
-        # print(config)
     return config
+
+
+def load_config(config_path: Optional[str] = None) -> dict:
+    """Parsed config.yaml, read once per process (treat it as read-only)."""
+    return _read_config(resolve_config_path(config_path))
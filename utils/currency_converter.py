@@ -1,51 +1,291 @@
-import requests
+from typing import Optional
+
+import httpx
+from logger.logging import get_logger
+from utils.cache import TieredCache
+from utils.http_client import get_http_client
+from utils.profiler import JSON_PARSING, phase
+from utils.settings import get_settings
+from utils.shared_cache import build_tiered_cache
+
+
+log = get_logger("currency")
+
+
+DEFAULT_PIVOT_CURRENCY = "USD"
+DEFAULT_TABLE_TTL = 60 * 60          # ExchangeRate-API refreshes daily
+DEFAULT_TABLE_STALE_TTL = 24 * 60 * 60
+
+
+def _alpha_vantage_url() -> str:
+    return f"{get_settings().upstream_url('alphavantage')}/query/"
+
+
+def _alpha_vantage_params(from_currency: str, to_currency: str, api_key: Optional[str]) -> dict:
+    api_key = api_key or get_settings().alphavantage_api_key
+    if not api_key:
+        raise EnvironmentError("ALPHAVANTAGE_API_KEY is not set")
+
+    return {
+        "function": "CURRENCY_EXCHANGE_RATE",
+        "from_currency": from_currency,
+        "to_currency": to_currency,
+        "apikey": api_key,
+    }
+
+
+def _parse_alpha_vantage(data: dict) -> float:
+    if "Error Message" in data:
+        raise ValueError(f"API Error: {data['Error Message']}")
+
+    return float(data["Realtime Currency Exchange Rate"]["5. Exchange Rate"])
+
+
+def alpha_vantage_rate(from_currency: str, to_currency: str, api_key: Optional[str] = None) -> float:
+    """Return the real-time Alpha Vantage rate for one currency pair."""
+    params = _alpha_vantage_params(from_currency, to_currency, api_key)
+
+    try:
+        response = get_http_client().get(_alpha_vantage_url(), params=params, timeout=10)
+        response.raise_for_status()
+        with phase(JSON_PARSING):
+            data = response.json()
+        return _parse_alpha_vantage(data)
+
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise RuntimeError(
+            f"Alpha Vantage rate lookup failed ({from_currency} → {to_currency}): {e}"
+        ) from e
+
+
+async def aalpha_vantage_rate(from_currency: str, to_currency: str, api_key: Optional[str] = None) -> float:
+    """Async counterpart of `alpha_vantage_rate`."""
+    params = _alpha_vantage_params(from_currency, to_currency, api_key)
+
+    try:
+        response = await get_http_client().aget(_alpha_vantage_url(), params=params, timeout=10)
+        response.raise_for_status()
+        with phase(JSON_PARSING):
+            data = response.json()
+        return _parse_alpha_vantage(data)
+
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise RuntimeError(
+            f"Alpha Vantage rate lookup failed ({from_currency} → {to_currency}): {e}"
+        ) from e
 
 
 class CurrencyConverter:
-    def __init__(self, api_key: str):
+    """Currency conversion from one cached rate table.
+
+    A single table for the pivot currency is downloaded from ExchangeRate-API
+    and cached; every pair is then derived locally as a cross rate, so
+    conversions make no network call while the table is fresh or stale.
+    If ExchangeRate-API is unavailable, Alpha Vantage is used per pair when
+    ALPHAVANTAGE_API_KEY is set.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[TieredCache] = None,
+        pivot_currency: str = DEFAULT_PIVOT_CURRENCY,
+        table_ttl: float = DEFAULT_TABLE_TTL,
+        table_stale_ttl: float = DEFAULT_TABLE_STALE_TTL,
+    ):
         if not api_key:
             raise EnvironmentError(
                 "EXCHANGE_RATE_API_KEY is not set or invalid")
 
         self.api_key = api_key
-        self.base_url = f"https://v6.exchangerate-api.com/v6/{api_key}/latest"
+        self.base_url = f"{get_settings().upstream_url('exchangerate')}/{api_key}/latest"
+        self.cache = cache
+        self.pivot_currency = pivot_currency.upper()
+        self.table_ttl = table_ttl
+        self.table_stale_ttl = table_stale_ttl
+        self.alpha_vantage_api_key = get_settings().alphavantage_api_key
 
-    def convert(self, amount: float, from_currency: str, to_currency: str) -> float:
-        """Convert the amount from one currency to another using ExchangeRate-API."""
-        if amount < 0:
-            raise ValueError("Amount must be non-negative")
+    @classmethod
+    def from_config(cls, api_key: str, cache_config: Optional[dict]) -> "CurrencyConverter":
+        """Build a converter from the `cache.currency` section of config.yaml."""
+        cache_config = cache_config or {}
+        cache = None
 
-        from_currency = from_currency.upper()
-        to_currency = to_currency.upper()
+        if cache_config.get("enabled", True):
+            cache = build_tiered_cache(cache_config, "fx_rates", default_max_entries=256)
 
-        url = f"{self.base_url}/{from_currency}"
+        return cls(
+            api_key,
+            cache=cache,
+            pivot_currency=cache_config.get("pivot_currency", DEFAULT_PIVOT_CURRENCY),
+            table_ttl=float(cache_config.get("ttl_seconds", DEFAULT_TABLE_TTL)),
+            table_stale_ttl=float(cache_config.get("stale_seconds", DEFAULT_TABLE_STALE_TTL)),
+        )
+
+    # ---------------------------
+    # Rate tables
+    # ---------------------------
+    @staticmethod
+    def _extract_rates(response) -> dict:
+        """Validate an ExchangeRate-API response and return its rate table."""
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"ExchangeRate API call failed "
+                f"(status={response.status_code}, body={response.text})"
+            )
 
         try:
-            response = requests.get(url, timeout=10)
+            with phase(JSON_PARSING):
+                data = response.json()
+        except ValueError as e:
+            raise RuntimeError(
+                f"Invalid JSON response from ExchangeRate API: {response.text}"
+            ) from e
 
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"ExchangeRate API call failed "
-                    f"(status={response.status_code}, body={response.text})"
-                )
+        rates = data.get("conversion_rates")
+        if not isinstance(rates, dict):
+            raise RuntimeError(
+                f"Invalid API response format: missing 'conversion_rates'. "
+                f"Raw response: {data}"
+            )
 
-            data = response.json()
+        return {code: float(rate) for code, rate in rates.items()}
 
-            rates = data.get("conversion_rates")
-            if not isinstance(rates, dict):
-                raise RuntimeError(
-                    f"Invalid API response format: missing 'conversion_rates'. "
-                    f"Raw response: {data}"
-                )
+    def _fetch_rate_table(self, base_currency: str) -> dict:
+        try:
+            response = get_http_client().get(f"{self.base_url}/{base_currency}", timeout=10)
+            return self._extract_rates(response)
 
-            if to_currency not in rates:
-                raise ValueError(
-                    f"{to_currency} not found in exchange rates for {from_currency}."
-                )
+        except httpx.HTTPError as e:
+            raise RuntimeError(
+                f"Network error while calling ExchangeRate API: {e}"
+            ) from e
 
-            return float(amount) * float(rates[to_currency])
+    async def _afetch_rate_table(self, base_currency: str) -> dict:
+        try:
+            response = await get_http_client().aget(f"{self.base_url}/{base_currency}", timeout=10)
+            return self._extract_rates(response)
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise RuntimeError(
                 f"Network error while calling ExchangeRate API: {e}"
             ) from e
+
+    def rate_table(self) -> dict:
+        """Return the (cached) rate table for the pivot currency."""
+        base = self.pivot_currency
+        if self.cache is None:
+            return self._fetch_rate_table(base)
+
+        return self.cache.get_or_compute(
+            f"fx:table:{base}",
+            lambda: self._fetch_rate_table(base),
+            ttl=self.table_ttl,
+            stale_ttl=self.table_stale_ttl,
+        )
+
+    async def arate_table(self) -> dict:
+        """Async counterpart of `rate_table`."""
+        base = self.pivot_currency
+        if self.cache is None:
+            return await self._afetch_rate_table(base)
+
+        return await self.cache.aget_or_compute(
+            f"fx:table:{base}",
+            lambda: self._afetch_rate_table(base),
+            ttl=self.table_ttl,
+            stale_ttl=self.table_stale_ttl,
+        )
+
+    def refresh(self) -> None:
+        """Force a re-download of the pivot rate table (e.g. at start-up)."""
+        if self.cache is not None:
+            self.cache.delete(f"fx:table:{self.pivot_currency}")
+        self.rate_table()
+
+    @staticmethod
+    def cross_rate(table: dict, from_currency: str, to_currency: str) -> float:
+        """Derive from → to from a table quoted against any single base."""
+        for code in (from_currency, to_currency):
+            if code not in table:
+                raise ValueError(f"{code} not found in exchange rates.")
+
+        return table[to_currency] / table[from_currency]
+
+    # ---------------------------
+    # Alpha Vantage fallback
+    # ---------------------------
+    def _fallback_rate(self, from_currency: str, to_currency: str, error: Exception) -> float:
+        if not self.alpha_vantage_api_key:
+            raise error
+
+        log.warning("⚠️ ExchangeRate API unavailable (%s); falling back to Alpha Vantage", error)
+        def compute():
+            return alpha_vantage_rate(from_currency, to_currency, self.alpha_vantage_api_key)
+
+        if self.cache is None:
+            return compute()
+
+        return self.cache.get_or_compute(
+            f"fx:pair:{from_currency}:{to_currency}", compute, ttl=self.table_ttl,
+        )
+
+    async def _afallback_rate(self, from_currency: str, to_currency: str, error: Exception) -> float:
+        if not self.alpha_vantage_api_key:
+            raise error
+
+        log.warning("⚠️ ExchangeRate API unavailable (%s); falling back to Alpha Vantage", error)
+        def compute():
+            return aalpha_vantage_rate(from_currency, to_currency, self.alpha_vantage_api_key)
+
+        if self.cache is None:
+            return await compute()
+
+        return await self.cache.aget_or_compute(
+            f"fx:pair:{from_currency}:{to_currency}", compute, ttl=self.table_ttl,
+        )
+
+    # ---------------------------
+    # Conversion
+    # ---------------------------
+    @staticmethod
+    def _validate(amount: float, from_currency: str, to_currency: str):
+        if amount < 0:
+            raise ValueError("Amount must be non-negative")
+
+        return from_currency.upper(), to_currency.upper()
+
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        if from_currency == to_currency:
+            return 1.0
+
+        try:
+            table = self.rate_table()
+        except RuntimeError as e:
+            return self._fallback_rate(from_currency, to_currency, e)
+
+        return self.cross_rate(table, from_currency, to_currency)
+
+    async def arate(self, from_currency: str, to_currency: str) -> float:
+        if from_currency == to_currency:
+            return 1.0
+
+        try:
+            table = await self.arate_table()
+        except RuntimeError as e:
+            return await self._afallback_rate(from_currency, to_currency, e)
+
+        return self.cross_rate(table, from_currency, to_currency)
+
+    def convert(self, amount: float, from_currency: str, to_currency: str) -> float:
+        """Convert the amount from one currency to another using ExchangeRate-API."""
+        from_currency, to_currency = self._validate(amount, from_currency, to_currency)
+        return float(amount) * self.rate(from_currency, to_currency)
+
+    async def aconvert(self, amount: float, from_currency: str, to_currency: str) -> float:
+        """Async counterpart of `convert`."""
+        from_currency, to_currency = self._validate(amount, from_currency, to_currency)
+        return float(amount) * await self.arate(from_currency, to_currency)
+
+    def stats(self) -> dict:
+        return self.cache.stats_dict() if self.cache is not None else {}
@@ -0,0 +1,302 @@
+import asyncio
+import importlib.util
+import random
+import threading
+import time
+import weakref
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+from utils.config_loader import load_config
+from utils.telemetry import upstream_call
+
+
+DEFAULT_TIMEOUT = 10.0
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 50
+KEEPALIVE_EXPIRY = 30.0
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 0.2
+DEFAULT_BACKOFF_MAX = 5.0
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class HTTPClientConfig:
+    """Settings for the shared upstream HTTP clients (`http` in config.yaml)."""
+
+    def __init__(self, http_config: Optional[dict] = None):
+        http_config = http_config or {}
+        retries = http_config.get("retries", {})
+
+        self.timeout = float(http_config.get("timeout_seconds", DEFAULT_TIMEOUT))
+        self.max_connections = int(http_config.get("max_connections", MAX_CONNECTIONS))
+        self.max_keepalive_connections = int(
+            http_config.get("max_keepalive_connections", MAX_KEEPALIVE_CONNECTIONS)
+        )
+        self.keepalive_expiry = float(http_config.get("keepalive_expiry_seconds", KEEPALIVE_EXPIRY))
+        # HTTP/2 needs the optional `h2` package.
+        self.http2 = bool(http_config.get("http2", False)) and (
+            importlib.util.find_spec("h2") is not None
+        )
+
+        self.max_retries = int(retries.get("max_retries", DEFAULT_MAX_RETRIES))
+        self.backoff_base = float(retries.get("backoff_base_seconds", DEFAULT_BACKOFF_BASE))
+        self.backoff_max = float(retries.get("backoff_max_seconds", DEFAULT_BACKOFF_MAX))
+        self.retry_statuses = frozenset(retries.get("statuses", RETRYABLE_STATUSES))
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class PoolStats:
+    """Per-host request, retry and in-flight counters."""
+
+    FIELDS = ("requests", "retries", "failures", "in_flight", "max_in_flight")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host: str) -> dict:
+        if host not in self._hosts:
+            self._hosts[host] = {field: 0 for field in self.FIELDS}
+        return self._hosts[host]
+
+    def started(self, host: str) -> None:
+        with self._lock:
+            stats = self._host(host)
+            stats["requests"] += 1
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    def finished(self, host: str, failed: bool) -> None:
+        with self._lock:
+            stats = self._host(host)
+            stats["in_flight"] -= 1
+            if failed:
+                stats["failures"] += 1
+
+    def retried(self, host: str) -> None:
+        with self._lock:
+            self._host(host)["retries"] += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._hosts.items()}
+
+
+def _pool_connections(client) -> Optional[int]:
+    """Open connections in an httpx client's pool (httpcore internals)."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    return len(connections) if connections is not None else None
+
+
+class PooledHTTPClient:
+    """Keep-alive HTTP clients shared by every upstream integration.
+
+    Sync calls share one `httpx.Client`; async calls share one
+    `httpx.AsyncClient` per event loop. Connections are pooled per host.
+    Idempotent requests that fail with a transport error or a retryable
+    status are retried with jittered exponential backoff, honouring
+    `Retry-After`.
+    """
+
+    def __init__(self, config: Optional[HTTPClientConfig] = None):
+        self.config = config or HTTPClientConfig()
+        self.stats = PoolStats()
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_lock = threading.Lock()
+        # httpx.AsyncClient pools are bound to the loop that opened them.
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    # ---------------------------
+    # Clients
+    # ---------------------------
+    @property
+    def sync_client(self) -> httpx.Client:
+        if self._sync_client is None or self._sync_client.is_closed:
+            with self._sync_lock:
+                if self._sync_client is None or self._sync_client.is_closed:
+                    self._sync_client = httpx.Client(
+                        timeout=self.config.timeout,
+                        limits=self.config.limits,
+                        http2=self.config.http2,
+                    )
+        return self._sync_client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=self.config.timeout,
+                limits=self.config.limits,
+                http2=self.config.http2,
+            )
+            self._async_clients[loop] = client
+
+        return client
+
+    # ---------------------------
+    # Retry policy
+    # ---------------------------
+    def _should_retry(self, method: str, attempt: int, response=None, error=None) -> bool:
+        if method.upper() not in IDEMPOTENT_METHODS or attempt >= self.config.max_retries:
+            return False
+        if error is not None:
+            return isinstance(error, httpx.TransportError)
+        return response.status_code in self.config.retry_statuses
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.config.backoff_max)
+            except ValueError:
+                pass  # HTTP-date form; fall back to exponential backoff
+
+        # Full jitter: uniform in [0, base * 2^attempt], capped.
+        ceiling = min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    # ---------------------------
+    # Requests
+    # ---------------------------
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlsplit(url).netloc
+        attempt = 0
+
+        while True:
+            self.stats.started(host)
+            try:
+                with upstream_call(host, method.upper(), **{
+                    "http.request.method": method.upper(), "http.retry_count": attempt,
+                }) as call:
+                    response = self.sync_client.request(method, url, **kwargs)
+                    call.status(response.status_code)
+            except httpx.HTTPError as e:
+                self.stats.finished(host, failed=True)
+                if not self._should_retry(method, attempt, error=e):
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                failed = response.status_code >= 500
+                self.stats.finished(host, failed=failed)
+                if not self._should_retry(method, attempt, response=response):
+                    return response
+                delay = self._backoff(attempt, response)
+                response.close()
+
+            self.stats.retried(host)
+            attempt += 1
+            time.sleep(delay)
+
+    async def arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlsplit(url).netloc
+        attempt = 0
+
+        while True:
+            self.stats.started(host)
+            try:
+                with upstream_call(host, method.upper(), **{
+                    "http.request.method": method.upper(), "http.retry_count": attempt,
+                }) as call:
+                    response = await self.async_client.request(method, url, **kwargs)
+                    call.status(response.status_code)
+            except httpx.HTTPError as e:
+                self.stats.finished(host, failed=True)
+                if not self._should_retry(method, attempt, error=e):
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                failed = response.status_code >= 500
+                self.stats.finished(host, failed=failed)
+                if not self._should_retry(method, attempt, response=response):
+                    return response
+                delay = self._backoff(attempt, response)
+                await response.aclose()
+
+            self.stats.retried(host)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    # ---------------------------
+    # Lifecycle / introspection
+    # ---------------------------
+    def pool_stats(self) -> dict:
+        async_connections = [
+            _pool_connections(client)
+            for client in list(self._async_clients.values())
+            if not client.is_closed
+        ]
+        return {
+            "hosts": self.stats.as_dict(),
+            "limits": {
+                "max_connections": self.config.max_connections,
+                "max_keepalive_connections": self.config.max_keepalive_connections,
+            },
+            "http2": self.config.http2,
+            "open_connections": {
+                "sync": _pool_connections(self._sync_client) if self._sync_client else 0,
+                "async": sum(c for c in async_connections if c is not None),
+            },
+        }
+
+    def close(self) -> None:
+        with self._sync_lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+    async def aclose(self) -> None:
+        """Close the async client bound to the running loop."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.pop(loop, None)
+
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+
+_http_client: Optional[PooledHTTPClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> PooledHTTPClient:
+    """Return the process-wide pooled HTTP client."""
+    global _http_client
+
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = PooledHTTPClient(
+                    HTTPClientConfig(load_config().get("http"))
+                )
+
+    return _http_client
+
+
+async def aclose_http_clients() -> None:
+    """Close the shared clients (used on application shutdown)."""
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client.close()
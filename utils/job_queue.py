@@ -0,0 +1,544 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from logger.logging import get_logger
+from utils.settings import get_settings
+from utils.shared_cache import DEFAULT_REDIS_URL, RespClient
+from utils.thread_pool import run_in_thread
+
+
+log = get_logger("jobs")
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Answers from `heartbeat`.
+KEEP_GOING = "running"
+CANCEL = "cancel"
+LOST = "lost"
+
+DEFAULT_WORKERS = 4
+DEFAULT_LEASE_SECONDS = 30.0
+DEFAULT_POLL_SECONDS = 1.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETENTION_SECONDS = 24 * 60 * 60
+DEFAULT_SQLITE_PATH = ".cache/jobs.sqlite3"
+DEFAULT_REDIS_PREFIX = "trip:jobs:"
+
+
+def _new_job(payload: dict, max_attempts: int) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "payload": payload,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "worker": None,
+        "progress": {},
+        "result": None,
+        "error": None,
+        "cancel_requested": False,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+# ---------------------------
+# SQLite broker (one node)
+# ---------------------------
+class SQLiteJobBroker:
+    """Durable job queue in a SQLite file, shared by the workers on one node.
+
+    A claim takes the oldest queued job - or a running one whose lease ran
+    out because its worker died, if it has attempts left - inside one write
+    transaction, so no two workers get the same job. Workers renew the
+    lease while they run.
+    """
+
+    COLUMNS = ("id", "status", "payload", "attempts", "max_attempts", "worker", "progress",
+               "result", "error", "cancel_requested", "created_at", "started_at",
+               "finished_at", "lease_until")
+    JSON_COLUMNS = ("payload", "progress", "result")
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL, max_attempts INTEGER NOT NULL, worker TEXT, "
+            "progress TEXT, result TEXT, error TEXT, cancel_requested INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_until REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _row(self, row) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        for column in self.JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        job.pop("lease_until")
+        return job
+
+    def _select(self, job_id: str):
+        return self._conn.execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+
+    def submit(self, payload: dict, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> dict:
+        job = _new_job(payload, max_attempts)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, payload, attempts, max_attempts, progress, "
+                "cancel_requested, created_at) VALUES (?, ?, ?, 0, ?, '{}', 0, ?)",
+                (job["id"], QUEUED, json.dumps(payload), max_attempts, job["created_at"]),
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._row(self._select(job_id))
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # A job whose worker died on its last attempt is left to `reap`.
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? "
+                    "OR (status = ? AND lease_until < ? AND attempts < max_attempts) "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, lease_until = ? WHERE id = ?",
+                    (RUNNING, worker, now, now + lease_seconds, row[0]),
+                )
+                job = self._row(self._select(row[0]))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def heartbeat(self, job_id: str, worker: str, lease_seconds: float, progress: dict) -> str:
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET lease_until = ?, progress = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (time.time() + lease_seconds, json.dumps(progress, default=str),
+                 job_id, worker, RUNNING),
+            ).rowcount
+            if not updated:
+                return LOST
+            row = self._conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return CANCEL if row and row[0] else KEEP_GOING
+
+    def finish(self, job_id: str, worker: str, status: str, result=None,
+               error: Optional[str] = None, progress: Optional[dict] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                "progress = COALESCE(?, progress), lease_until = NULL "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(),
+                 json.dumps(progress, default=str) if progress is not None else None,
+                 job_id, worker, RUNNING),
+            )
+
+    def requeue(self, job_id: str, worker: str, error: Optional[str] = None,
+                count_attempt: bool = True) -> None:
+        """Put a running job back on the queue (retry, or hand-off on shutdown)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, error = ?, "
+                "attempts = attempts - ? WHERE id = ? AND worker = ? AND status = ?",
+                (QUEUED, error, 0 if count_attempt else 1, job_id, worker, RUNNING),
+            )
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, job_id, QUEUED),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                (job_id, RUNNING),
+            )
+            return self._row(self._select(job_id))
+
+    def reap(self) -> int:
+        """Fail jobs whose worker died on the last attempt; drop old finished jobs."""
+        now = time.time()
+        with self._lock:
+            lost = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                (FAILED, "worker lost", now, RUNNING, now),
+            ).rowcount
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) "
+                "AND finished_at < ?",
+                (*FINISHED, now - self.retention_seconds),
+            )
+        return lost
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {"broker": "sqlite", "jobs": dict(rows)}
+
+
+# ---------------------------
+# Redis-protocol broker (several nodes)
+# ---------------------------
+class RedisJobBroker:
+    """Job queue on a Redis-protocol server, shared by workers on every node.
+
+    Jobs are JSON records under `job:<id>`; queued ids sit in a list that
+    workers pop from, so work spreads over whichever nodes have free
+    workers. Running jobs have a lease in a sorted set; any worker's
+    `reap` puts jobs with an expired lease back on the queue. Cancellation
+    is a separate flag so it never races the owner's progress writes.
+    Finished jobs expire after `retention_seconds`.
+    """
+
+    def __init__(self, url: str = DEFAULT_REDIS_URL, key_prefix: str = DEFAULT_REDIS_PREFIX,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS, timeout: float = 2.0):
+        self.client = RespClient(url, timeout=timeout)
+        self.prefix = key_prefix
+        self.retention_seconds = retention_seconds
+
+    def _key(self, *parts: str) -> str:
+        return self.prefix + ":".join(parts)
+
+    def _load(self, job_id: str) -> Optional[dict]:
+        payload = self.client.command("GET", self._key("job", job_id))
+        return json.loads(payload) if payload is not None else None
+
+    def _save(self, job: dict) -> None:
+        args = ["SET", self._key("job", job["id"]), json.dumps(job, default=str)]
+        if job["status"] in FINISHED:
+            args += ["EX", int(self.retention_seconds)]
+        self.client.command(*args)
+
+    def submit(self, payload: dict, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> dict:
+        job = _new_job(payload, max_attempts)
+        self._save(job)
+        self.client.command("RPUSH", self._key("queue"), job["id"])
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self._load(job_id)
+        if job is not None and self.client.command("EXISTS", self._key("cancel", job_id)):
+            job["cancel_requested"] = True
+        return job
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[dict]:
+        while True:
+            job_id = self.client.command("LPOP", self._key("queue"))
+            if job_id is None:
+                return None
+
+            job_id = job_id.decode("utf-8")
+            now = time.time()
+            # Lease first, so a crash from here on is recovered by `reap`.
+            self.client.command("ZADD", self._key("leases"), now + lease_seconds, job_id)
+            job = self._load(job_id)
+            if job is None or job["status"] != QUEUED:
+                self.client.command("ZREM", self._key("leases"), job_id)
+                continue
+            if job["attempts"] >= job["max_attempts"]:
+                job.update(status=FAILED, error="attempts exhausted", finished_at=now)
+                self._save(job)
+                self.client.command("ZREM", self._key("leases"), job_id)
+                continue
+
+            job.update(status=RUNNING, worker=worker, started_at=now, attempts=job["attempts"] + 1)
+            self._save(job)
+            return job
+
+    def heartbeat(self, job_id: str, worker: str, lease_seconds: float, progress: dict) -> str:
+        job = self._load(job_id)
+        if job is None or job["status"] != RUNNING or job["worker"] != worker:
+            return LOST
+        self.client.command("ZADD", self._key("leases"), time.time() + lease_seconds, job_id)
+        job["progress"] = progress
+        self._save(job)
+        return CANCEL if self.client.command("EXISTS", self._key("cancel", job_id)) else KEEP_GOING
+
+    def finish(self, job_id: str, worker: str, status: str, result=None,
+               error: Optional[str] = None, progress: Optional[dict] = None) -> None:
+        job = self._load(job_id)
+        if job is None or job["status"] != RUNNING or job["worker"] != worker:
+            return
+        job.update(status=status, result=result, error=error, finished_at=time.time())
+        if progress is not None:
+            job["progress"] = progress
+        self._save(job)
+        self.client.command("ZREM", self._key("leases"), job_id)
+        self.client.command("DEL", self._key("cancel", job_id))
+
+    def requeue(self, job_id: str, worker: str, error: Optional[str] = None,
+                count_attempt: bool = True) -> None:
+        job = self._load(job_id)
+        if job is None or job["status"] != RUNNING or job["worker"] != worker:
+            return
+        job.update(status=QUEUED, worker=None, error=error)
+        if not count_attempt:
+            job["attempts"] -= 1
+        self._save(job)
+        self.client.command("ZREM", self._key("leases"), job_id)
+        self.client.command("RPUSH", self._key("queue"), job_id)
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        job = self._load(job_id)
+        if job is None:
+            return None
+
+        if job["status"] == QUEUED and self.client.command("LREM", self._key("queue"), 0, job_id):
+            job.update(status=CANCELLED, finished_at=time.time())
+            self._save(job)
+        elif job["status"] in (QUEUED, RUNNING):
+            # Claimed meanwhile: its worker sees the flag on the next heartbeat.
+            self.client.command("SET", self._key("cancel", job_id), 1,
+                                "EX", int(self.retention_seconds))
+            job["cancel_requested"] = True
+        return job
+
+    def reap(self) -> int:
+        """Requeue (or fail, on the last attempt) jobs whose worker stopped renewing."""
+        expired = self.client.command(
+            "ZRANGEBYSCORE", self._key("leases"), "-inf", time.time()
+        ) or []
+        lost = 0
+        for raw_id in expired:
+            job_id = raw_id.decode("utf-8")
+            # ZREM decides which reaper owns the job.
+            if not self.client.command("ZREM", self._key("leases"), job_id):
+                continue
+            job = self._load(job_id)
+            if job is None or job["status"] != RUNNING:
+                continue
+
+            if job["attempts"] >= job["max_attempts"]:
+                job.update(status=FAILED, error="worker lost", finished_at=time.time())
+                lost += 1
+                self._save(job)
+            else:
+                job.update(status=QUEUED, worker=None, error="worker lost; retrying")
+                self._save(job)
+                self.client.command("RPUSH", self._key("queue"), job_id)
+        return lost
+
+    def stats(self) -> dict:
+        return {
+            "broker": "redis",
+            "server": self.client.server,
+            "queued": self.client.command("LLEN", self._key("queue")),
+            "running": self.client.command("ZCARD", self._key("leases")),
+        }
+
+
+def build_job_broker(jobs_config: Optional[dict]):
+    """The broker for the `jobs` section of config.yaml."""
+    jobs_config = jobs_config or {}
+    broker = jobs_config.get("broker", "sqlite")
+    retention = float(jobs_config.get("retention_seconds", DEFAULT_RETENTION_SECONDS))
+
+    if broker == "sqlite":
+        return SQLiteJobBroker(jobs_config.get("sqlite_path", DEFAULT_SQLITE_PATH), retention)
+    if broker == "redis":
+        redis_config = jobs_config.get("redis") or {}
+        return RedisJobBroker(
+            url=get_settings().redis_url or redis_config.get("url", DEFAULT_REDIS_URL),
+            key_prefix=redis_config.get("key_prefix", DEFAULT_REDIS_PREFIX),
+            retention_seconds=retention,
+        )
+    raise ValueError(f"Unsupported job broker '{broker}'. Supported: sqlite, redis")
+
+
+# ---------------------------
+# Workers
+# ---------------------------
+JobHandler = Callable[[dict, Callable[[dict], None]], Awaitable[dict]]
+
+
+class JobWorkerPool:
+    """Async workers that pull jobs from a broker and run them.
+
+    Each worker claims one job at a time and runs `handler(job, report)`,
+    where `report(update)` merges into the job's progress. While the job
+    runs its lease and progress are renewed every `lease_seconds / 3`; a
+    cancel request or a lost lease stops it. A failing job is retried
+    until `max_attempts`. On shutdown, running jobs are handed back to the
+    queue for another worker.
+    """
+
+    def __init__(self, broker, handler: JobHandler, workers: int = DEFAULT_WORKERS,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.broker = broker
+        self.handler = handler
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        # Unique per pool so worker ids never collide across nodes or restarts.
+        self.node = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, str] = {}  # job id -> worker
+        self._counts = {"succeeded": 0, "failed": 0, "retried": 0, "cancelled": 0}
+
+    @classmethod
+    def from_config(cls, handler: JobHandler, jobs_config: Optional[dict]) -> Optional["JobWorkerPool"]:
+        """Build the broker and pool from the `jobs` section of config.yaml."""
+        jobs_config = jobs_config or {}
+        if not jobs_config.get("enabled", True):
+            return None
+
+        return cls(
+            build_job_broker(jobs_config),
+            handler,
+            workers=int(jobs_config.get("workers", DEFAULT_WORKERS)),
+            lease_seconds=float(jobs_config.get("lease_seconds", DEFAULT_LEASE_SECONDS)),
+            poll_seconds=float(jobs_config.get("poll_seconds", DEFAULT_POLL_SECONDS)),
+        )
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._work(f"{self.node}:{i}"), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._reap(), name="job-reaper"))
+        log.info("🧵 %d job workers started on %s", self.workers, self.node)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 2)
+            try:
+                await run_in_thread(self.broker.reap)
+            except Exception as e:
+                log.warning("⚠️ Job reaper failed: %s", e)
+
+    async def _work(self, worker: str) -> None:
+        while True:
+            try:
+                job = await run_in_thread(self.broker.claim, worker, self.lease_seconds)
+            except Exception as e:
+                log.warning("⚠️ Job claim failed: %s", e)
+                job = None
+
+            if job is None:
+                # Jitter keeps idle workers on many nodes from polling in lockstep.
+                await asyncio.sleep(self.poll_seconds * random.uniform(0.5, 1.5))
+                continue
+
+            await self._run(job, worker)
+
+    async def _run(self, job: dict, worker: str) -> None:
+        progress = dict(job.get("progress") or {})
+        progress["attempt"] = job["attempts"]
+        task = asyncio.create_task(self.handler(job, progress.update))
+        self._running[job["id"]] = worker
+        log.info("🧵 Job %s started on %s (attempt %d)", job["id"], worker, job["attempts"])
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.lease_seconds / 3)
+                if done:
+                    break
+                verdict = await run_in_thread(
+                    self.broker.heartbeat, job["id"], worker, self.lease_seconds, progress
+                )
+                if verdict != KEEP_GOING:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    if verdict == CANCEL:
+                        await run_in_thread(
+                            self.broker.finish, job["id"], worker, CANCELLED, None, None, progress
+                        )
+                        self._counts["cancelled"] += 1
+                        log.info("🛑 Job %s cancelled", job["id"])
+                    return
+
+            try:
+                result = task.result()
+            except Exception as e:
+                retry = job["attempts"] < job["max_attempts"]
+                if retry:
+                    await run_in_thread(self.broker.requeue, job["id"], worker, str(e))
+                    self._counts["retried"] += 1
+                else:
+                    await run_in_thread(
+                        self.broker.finish, job["id"], worker, FAILED, None, str(e), progress
+                    )
+                    self._counts["failed"] += 1
+                log.error("❌ Job %s failed (%s)%s", job["id"], e, "; retrying" if retry else "")
+                return
+
+            await run_in_thread(
+                self.broker.finish, job["id"], worker, SUCCEEDED, result, None, progress
+            )
+            self._counts["succeeded"] += 1
+
+        except asyncio.CancelledError:
+            # Shutting down: hand the job to another worker without using up an attempt.
+            task.cancel()
+            try:
+                self.broker.requeue(job["id"], worker, "worker shut down", count_attempt=False)
+            except Exception as e:
+                log.warning("⚠️ Could not hand back job %s: %s", job["id"], e)
+            raise
+
+        finally:
+            self._running.pop(job["id"], None)
+
+    def stats(self) -> dict:
+        return {
+            "node": self.node,
+            "workers": self.workers,
+            "running": dict(self._running),
+            **self._counts,
+            **self.broker.stats(),
+        }
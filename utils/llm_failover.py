@@ -0,0 +1,249 @@
+import asyncio
+import threading
+import time
+from contextlib import aclosing, closing
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from logger.logging import get_logger
+from utils.circuit_breaker import CLOSED, HALF_OPEN, CircuitBreaker
+
+
+log = get_logger("llm_failover")
+
+
+PRIORITY = "priority"
+FASTEST = "fastest"
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_FIRST_TOKEN_TIMEOUT = 15.0
+TTFT_ALPHA = 0.2
+
+
+class FailoverChatModel(BaseChatModel):
+    """Chat model that fails over between providers (Groq, OpenAI, ...).
+
+    Every configured provider is loaded up front. Each call tries providers
+    in order - the primary first (`priority` mode) or the one with the best
+    observed time-to-first-token (`fastest` mode) - and moves on to the next
+    on an error or timeout. Providers whose circuit breaker is open are
+    skipped until it lets a probe through.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    providers: List[str]
+    clients: List[Any]
+    breakers: List[Any]
+    mode: str = PRIORITY
+    timeout: float = DEFAULT_TIMEOUT
+    first_token_timeout: float = DEFAULT_FIRST_TOKEN_TIMEOUT
+    model_name: str = ""
+    # Per-provider call kwargs from bind_tools (tool formats differ by provider).
+    client_kwargs: Optional[List[Dict[str, Any]]] = None
+    ttft: Optional[Dict[str, float]] = None
+    lock: Any = None
+
+    def model_post_init(self, __context: Any) -> None:
+        if self.ttft is None:
+            self.ttft = {}
+        if self.lock is None:
+            self.lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "failover"
+
+    def bind_tools(self, tools, **kwargs):
+        """Bind tools on every provider with its own formatting."""
+        client_kwargs = [
+            getattr(client.bind_tools(tools, **kwargs), "kwargs", {}) for client in self.clients
+        ]
+        # Shares breakers and TTFT stats with the unbound model.
+        return self.model_copy(update={"client_kwargs": client_kwargs})
+
+    # ---------------------------
+    # Provider selection
+    # ---------------------------
+    def _score(self, index: int) -> float:
+        """Expected first-token latency; unmeasured providers are tried first."""
+        with self.lock:
+            ttft = self.ttft.get(self.providers[index])
+        if ttft is not None:
+            return ttft
+        return self.breakers[index].latency_ewma or 0.0
+
+    def _order(self) -> List[int]:
+        order = list(range(len(self.clients)))
+        if self.mode == FASTEST:
+            order.sort(key=self._score)
+        return order
+
+    def _candidates(self) -> Iterator[int]:
+        """Providers to try, in order; open circuits only as a last resort."""
+        skipped = []
+        for index in self._order():
+            if self.breakers[index].allow():
+                yield index
+            else:
+                skipped.append(index)
+        yield from skipped
+
+    def _kwargs(self, index: int, kwargs: dict) -> dict:
+        if self.client_kwargs is None:
+            return kwargs
+        return {**self.client_kwargs[index], **kwargs}
+
+    def _record_ttft(self, index: int, seconds: float) -> None:
+        provider = self.providers[index]
+        with self.lock:
+            previous = self.ttft.get(provider)
+            self.ttft[provider] = seconds if previous is None else previous + TTFT_ALPHA * (seconds - previous)
+
+    def _failed(self, index: int, started: float, error: BaseException) -> None:
+        self.breakers[index].record_failure(time.monotonic() - started)
+        reason = "timed out" if isinstance(error, (asyncio.TimeoutError, TimeoutError)) else error
+        log.warning("⚠️ LLM provider %s failed (%s)", self.providers[index], reason)
+
+    # ---------------------------
+    # Calls
+    # ---------------------------
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        error = None
+        for index in self._candidates():
+            started = time.monotonic()
+            try:
+                result = self.clients[index]._generate(
+                    messages, stop=stop, run_manager=run_manager, **self._kwargs(index, kwargs)
+                )
+            except Exception as e:
+                self._failed(index, started, e)
+                error = e
+                continue
+
+            self.breakers[index].record_success(time.monotonic() - started)
+            return result
+
+        raise error
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        error = None
+        for index in self._candidates():
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    self.clients[index]._agenerate(
+                        messages, stop=stop, run_manager=run_manager, **self._kwargs(index, kwargs)
+                    ),
+                    timeout=self.timeout,
+                )
+            except Exception as e:
+                self._failed(index, started, e)
+                error = e
+                continue
+
+            self.breakers[index].record_success(time.monotonic() - started)
+            return result
+
+        raise error
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        error = None
+        for index in self._candidates():
+            started = time.monotonic()
+            first = True
+            try:
+                with closing(self.clients[index]._stream(
+                    messages, stop=stop, run_manager=run_manager, **self._kwargs(index, kwargs)
+                )) as stream:
+                    for chunk in stream:
+                        if first:
+                            self._record_ttft(index, time.monotonic() - started)
+                            first = False
+                        yield chunk
+            except Exception as e:
+                self._failed(index, started, e)
+                # Once output has reached the caller we cannot switch providers.
+                if not first:
+                    raise
+                error = e
+                continue
+
+            self.breakers[index].record_success(time.monotonic() - started)
+            return
+
+        raise error
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        error = None
+        for index in self._candidates():
+            started = time.monotonic()
+            first = True
+            try:
+                # The stream is closed before failing over, so an abandoned
+                # one releases its HTTP response right away.
+                async with aclosing(self.clients[index]._astream(
+                    messages, stop=stop, run_manager=run_manager, **self._kwargs(index, kwargs)
+                )) as stream:
+                    # Fail over if the first token is too slow, not just on errors.
+                    chunk = await asyncio.wait_for(anext(stream), timeout=self.first_token_timeout)
+                    self._record_ttft(index, time.monotonic() - started)
+                    first = False
+                    yield chunk
+                    async for chunk in stream:
+                        yield chunk
+            except StopAsyncIteration:
+                pass
+            except Exception as e:
+                self._failed(index, started, e)
+                if not first:
+                    raise
+                error = e
+                continue
+
+            self.breakers[index].record_success(time.monotonic() - started)
+            return
+
+        raise error
+
+    # ---------------------------
+    # Health
+    # ---------------------------
+    def health(self) -> dict:
+        providers = {}
+        for index, provider in enumerate(self.providers):
+            stats = self.breakers[index].stats()
+            with self.lock:
+                ttft = self.ttft.get(provider)
+            status = {CLOSED: "up", HALF_OPEN: "degraded"}.get(stats["state"], "down")
+            providers[provider] = {
+                "status": status,
+                "primary": index == 0,
+                "model": getattr(self.clients[index], "model_name", None),
+                "ttft_ewma_ms": round(ttft * 1000, 1) if ttft is not None else None,
+                **stats,
+            }
+        return {"mode": self.mode, "providers": providers}
+
+
+def build_failover_model(clients: Dict[str, Any], failover_config: Optional[dict]) -> FailoverChatModel:
+    """Wrap provider clients (primary first) in a `FailoverChatModel`."""
+    failover_config = failover_config or {}
+    providers = list(clients)
+    return FailoverChatModel(
+        providers=providers,
+        clients=[clients[p] for p in providers],
+        breakers=[
+            CircuitBreaker.from_config(f"llm:{p}", failover_config.get("breaker"))
+            for p in providers
+        ],
+        mode=failover_config.get("mode", PRIORITY),
+        timeout=float(failover_config.get("timeout_seconds", DEFAULT_TIMEOUT)),
+        first_token_timeout=float(
+            failover_config.get("first_token_timeout_seconds", DEFAULT_FIRST_TOKEN_TIMEOUT)
+        ),
+        model_name=getattr(clients[providers[0]], "model_name", "") or "",
+    )
@@ -0,0 +1,360 @@
+import asyncio
+import itertools
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, Field, PrivateAttr
+
+from logger.logging import get_logger
+
+
+log = get_logger("llm_pool")
+
+
+DEFAULT_COOLDOWN = 5.0
+MAX_POOL_WAIT = 10.0
+# Same budget as the provider SDKs' own retries, which pool members turn off.
+MAX_RETRIES = 2
+RETRY_COOLDOWN = 1.0
+
+_DURATION = re.compile(r"(?P<value>\d+(?:\.\d+)?)(?P<unit>ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds from a rate-limit reset header ("7.66s", "2m59.56s", "120ms")."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    matches = list(_DURATION.finditer(value))
+    if not matches:
+        return None
+    return sum(float(m["value"]) * _UNIT_SECONDS[m["unit"]] for m in matches)
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+def is_transient(error: BaseException) -> bool:
+    """5xx, 408/409 and connection/timeout errors: the ones the SDKs retry."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409) or status >= 500
+    # The SDKs raise APIConnectionError/APITimeoutError from the httpx error.
+    return isinstance(error, httpx.TransportError) or isinstance(error.__cause__, httpx.TransportError)
+
+
+class KeyState:
+    """Live rate-limit headroom of one API key/endpoint, from response headers."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.rate_limited = 0
+        self.cooldown_until = 0.0
+        # kind -> {"limit", "remaining", "reset_at"} for "requests" / "tokens"
+        self.limits = {}
+
+    def observe(self, response: httpx.Response) -> None:
+        """httpx response hook: record `x-ratelimit-*` headers and 429s."""
+        headers = response.headers
+        now = time.monotonic()
+
+        with self._lock:
+            for kind in ("requests", "tokens"):
+                remaining = _int_header(headers, f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+                self.limits[kind] = {
+                    "limit": _int_header(headers, f"x-ratelimit-limit-{kind}"),
+                    "remaining": remaining,
+                    "reset_at": now + reset if reset is not None else None,
+                }
+
+            if response.status_code == 429:
+                self.rate_limited += 1
+                retry_after = parse_reset(headers.get("retry-after")) or DEFAULT_COOLDOWN
+                self.cooldown_until = max(self.cooldown_until, now + retry_after)
+
+    async def aobserve(self, response: httpx.Response) -> None:
+        self.observe(response)
+
+    def headroom(self, now: float) -> float:
+        """Fraction of the tightest limit still available (-1 while cooling down)."""
+        with self._lock:
+            if self.cooldown_until > now:
+                return -1.0
+
+            fractions = []
+            for kind, state in self.limits.items():
+                if not state["limit"] or (state["reset_at"] is not None and now >= state["reset_at"]):
+                    continue
+                remaining = state["remaining"] - (self.in_flight if kind == "requests" else 0)
+                fractions.append(max(0.0, remaining / state["limit"]))
+
+            return min(fractions) if fractions else 1.0
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.calls += 1
+
+    def finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def backoff(self, seconds: float = DEFAULT_COOLDOWN) -> None:
+        with self._lock:
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+    def as_dict(self, now: float) -> dict:
+        headroom = self.headroom(now)
+        with self._lock:
+            return {
+                "key": self.label,
+                "in_flight": self.in_flight,
+                "calls": self.calls,
+                "rate_limited": self.rate_limited,
+                "cooldown_seconds": round(max(0.0, self.cooldown_until - now), 1),
+                "headroom": round(headroom, 3),
+                "limits": {
+                    kind: {"limit": s["limit"], "remaining": s["remaining"]}
+                    for kind, s in self.limits.items()
+                },
+            }
+
+
+def rate_limit_hooks(state: KeyState) -> tuple:
+    """(sync, async) httpx event hooks feeding `state` from every response."""
+    return {"response": [state.observe]}, {"response": [state.aobserve]}
+
+
+class PooledChatModel(BaseChatModel):
+    """One chat model spread over several API keys or endpoints.
+
+    Each call goes to the member with the most rate-limit headroom (from the
+    `x-ratelimit-*` headers of its last response), ties broken by fewest
+    in-flight calls and then round-robin. A member that returns 429 cools
+    down for its Retry-After and the call moves on to the next member.
+    Members are built without SDK retries, so 5xx and connection errors are
+    retried here instead, on another member, up to `max_retries` times.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    clients: List[Any]
+    states: List[Any]
+    model_name: str = ""
+    max_wait: float = Field(default=MAX_POOL_WAIT)
+    max_retries: int = Field(default=MAX_RETRIES)
+    # Per-member httpx clients, closed by `close()` / `aclose()`.
+    http_clients: List[Any] = Field(default_factory=list)
+
+    _rotation: Any = PrivateAttr(default_factory=itertools.count)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"pooled-{self.clients[0]._llm_type}"
+
+    def bind_tools(self, tools, **kwargs):
+        # Provider-specific tool formatting, applied to whichever member runs.
+        return self.bind(**self.clients[0].bind_tools(tools, **kwargs).kwargs)
+
+    # ---------------------------
+    # Dispatch
+    # ---------------------------
+    def _pick(self, exclude: list) -> tuple:
+        """(index, seconds to wait) of the member to use next."""
+        now = time.monotonic()
+        offset = next(self._rotation)
+        order = [(offset + i) % len(self.clients) for i in range(len(self.clients))]
+        candidates = [i for i in order if i not in exclude] or order
+
+        best = max(
+            candidates,
+            key=lambda i: (self.states[i].headroom(now), -self.states[i].in_flight),
+        )
+        if self.states[best].headroom(now) >= 0:
+            return best, 0.0
+
+        # Everyone is cooling down: wait for the first member to recover.
+        soonest = min(candidates, key=lambda i: self.states[i].cooldown_until)
+        return soonest, max(0.0, self.states[soonest].cooldown_until - now)
+
+    def _next(self, tried: list, error: Optional[BaseException]) -> tuple:
+        index, wait = self._pick(tried)
+        if wait > self.max_wait:
+            raise error if error is not None else RuntimeError("All LLM keys are rate limited")
+        return index, wait
+
+    def _on_error(self, index: int, error: BaseException, tried: list) -> None:
+        """Re-raise unless another member is worth trying (429 or transient error)."""
+        state = self.states[index]
+        if is_rate_limited(error) and len(tried) < 2 * len(self.clients):
+            if state.cooldown_until <= time.monotonic():
+                state.backoff()
+            log.warning("⏳ LLM key %s rate limited; trying another", state.label)
+            return
+
+        if is_transient(error) and len(tried) <= self.max_retries:
+            state.backoff(RETRY_COOLDOWN)
+            log.warning("🔁 LLM key %s failed (%s); retrying on another", state.label, error)
+            return
+
+        raise error
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tried, error = [], None
+        while True:
+            index, wait = self._next(tried, error)
+            if wait:
+                time.sleep(wait)
+
+            tried.append(index)
+            state = self.states[index]
+            state.started()
+            try:
+                return self.clients[index]._generate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                )
+            except Exception as e:
+                self._on_error(index, e, tried)
+                error = e
+            finally:
+                state.finished()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tried, error = [], None
+        while True:
+            index, wait = self._next(tried, error)
+            if wait:
+                await asyncio.sleep(wait)
+
+            tried.append(index)
+            state = self.states[index]
+            state.started()
+            try:
+                return await self.clients[index]._agenerate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                )
+            except Exception as e:
+                self._on_error(index, e, tried)
+                error = e
+            finally:
+                state.finished()
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        tried, error = [], None
+        while True:
+            index, wait = self._next(tried, error)
+            if wait:
+                time.sleep(wait)
+
+            tried.append(index)
+            state = self.states[index]
+            state.started()
+            started_streaming = False
+            try:
+                for chunk in self.clients[index]._stream(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                ):
+                    started_streaming = True
+                    yield chunk
+                return
+            except Exception as e:
+                # Only retry before any output reached the caller.
+                if started_streaming:
+                    raise
+                self._on_error(index, e, tried)
+                error = e
+            finally:
+                state.finished()
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        tried, error = [], None
+        while True:
+            index, wait = self._next(tried, error)
+            if wait:
+                await asyncio.sleep(wait)
+
+            tried.append(index)
+            state = self.states[index]
+            state.started()
+            started_streaming = False
+            try:
+                async for chunk in self.clients[index]._astream(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                ):
+                    started_streaming = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started_streaming:
+                    raise
+                self._on_error(index, e, tried)
+                error = e
+            finally:
+                state.finished()
+
+    def close(self) -> None:
+        for client in self.http_clients:
+            if isinstance(client, httpx.Client) and not client.is_closed:
+                client.close()
+
+    async def aclose(self) -> None:
+        """Close the members' httpx clients (used on application shutdown)."""
+        for client in self.http_clients:
+            if isinstance(client, httpx.AsyncClient) and not client.is_closed:
+                await client.aclose()
+        self.close()
+
+    def pool_stats(self) -> dict:
+        now = time.monotonic()
+        members = [state.as_dict(now) for state in self.states]
+        return {
+            "size": len(members),
+            "in_flight": sum(m["in_flight"] for m in members),
+            "available": sum(1 for m in members if m["headroom"] > 0),
+            "members": members,
+        }
+
+
+_pools: List[PooledChatModel] = []
+_pools_lock = threading.Lock()
+
+
+def register_pool(pool: PooledChatModel) -> PooledChatModel:
+    """Track `pool` so `aclose_llm_pools()` closes its clients."""
+    with _pools_lock:
+        _pools.append(pool)
+    return pool
+
+
+async def aclose_llm_pools() -> None:
+    """Close every registered pool's httpx clients (used on application shutdown)."""
+    with _pools_lock:
+        pools = list(_pools)
+        _pools.clear()
+    for pool in pools:
+        await pool.aclose()
@@ -0,0 +1,271 @@
+"""Minimal in-process Redis-protocol server for local runs and testing.
+
+Speaks enough RESP2 for `RedisCacheStore` and `RedisJobBroker`: PING,
+AUTH, SELECT, GET, SET (EX/PX/NX), DEL, EXISTS, PTTL, INCR, EXPIRE, SCAN,
+DBSIZE, FLUSHDB, lists (RPUSH, LPOP, LLEN, LREM) and sorted sets (ZADD,
+ZREM, ZRANGEBYSCORE, ZCARD). Keys expire lazily on access, like Redis.
+
+    python -m utils.local_redis --port 6380
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+from typing import Optional
+
+
+class _Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}  # key -> (value, expires_at or None)
+
+    def live(self, key: bytes):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return item
+
+    def container(self, key: bytes, kind: type, create: bool = False):
+        """The list/dict stored at `key` (created if asked), or None."""
+        item = self.live(key)
+        if item is None:
+            if not create:
+                return None
+            self.data[key] = (kind(), None)
+            return self.data[key][0]
+        if not isinstance(item[0], kind):
+            raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return item[0]
+
+    def drop_if_empty(self, key: bytes) -> None:
+        item = self.data.get(key)
+        if item is not None and not item[0]:
+            del self.data[key]
+
+
+def _score(raw: bytes) -> float:
+    return {b"-inf": float("-inf"), b"+inf": float("inf"), b"inf": float("inf")}.get(raw) or float(raw)
+
+
+def _encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-ERR %s\r\n" % str(reply).encode("utf-8")
+    if isinstance(reply, bool):
+        return b":%d\r\n" % int(reply)
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode("utf-8")
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _read_command(self) -> Optional[list]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # inline command (e.g. from telnet)
+
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            if not args:
+                continue
+            try:
+                reply = self.server.execute(args[0].upper().decode("utf-8"), args[1:])
+            except Exception as e:
+                reply = e
+            self.wfile.write(_encode(reply))
+            self.wfile.flush()
+
+
+class LocalRedisServer(socketserver.ThreadingTCPServer):
+    """Threaded RESP server over a dict; `start()` runs it in the background."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.store = _Store()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "LocalRedisServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="local-redis", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    # ---------------------------
+    # Commands
+    # ---------------------------
+    def execute(self, command: str, args: list):
+        store = self.store
+        now = time.monotonic()
+
+        with store.lock:
+            if command == "PING":
+                return args[0] if args else "PONG"
+            if command in ("AUTH", "SELECT"):
+                return "OK"
+
+            if command == "GET":
+                item = store.live(args[0])
+                return item[0] if item else None
+
+            if command == "SET":
+                key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+                if b"NX" in options and store.live(key) is not None:
+                    return None
+                expires_at = None
+                for unit, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+                    if unit in options:
+                        expires_at = now + int(args[2 + options.index(unit) + 1]) * scale
+                store.data[key] = (value, expires_at)
+                return "OK"
+
+            if command == "DEL":
+                return sum(1 for key in args if store.live(key) and store.data.pop(key))
+
+            if command == "EXISTS":
+                return sum(1 for key in args if store.live(key))
+
+            if command == "PTTL":
+                item = store.live(args[0])
+                if item is None:
+                    return -2
+                return -1 if item[1] is None else int((item[1] - now) * 1000)
+
+            if command == "EXPIRE":
+                item = store.live(args[0])
+                if item is None:
+                    return 0
+                store.data[args[0]] = (item[0], now + int(args[1]))
+                return 1
+
+            if command == "INCR":
+                item = store.live(args[0])
+                value = int(item[0]) + 1 if item else 1
+                store.data[args[0]] = (str(value).encode("utf-8"), item[1] if item else None)
+                return value
+
+            if command == "SCAN":
+                options = [a.upper() for a in args[1:]]
+                pattern = args[1 + options.index(b"MATCH") + 1].decode("utf-8") if b"MATCH" in options else "*"
+                keys = [
+                    key for key in list(store.data)
+                    if store.live(key) and fnmatch.fnmatchcase(key.decode("utf-8"), pattern)
+                ]
+                return [b"0", keys]
+
+            if command == "RPUSH":
+                items = store.container(args[0], list, create=True)
+                items.extend(args[1:])
+                return len(items)
+
+            if command == "LPOP":
+                items = store.container(args[0], list)
+                if not items:
+                    return None
+                value = items.pop(0)
+                store.drop_if_empty(args[0])
+                return value
+
+            if command == "LLEN":
+                return len(store.container(args[0], list) or [])
+
+            if command == "LREM":
+                items = store.container(args[0], list)
+                if not items:
+                    return 0
+                count, value = int(args[1]), args[2]
+                # Only count == 0 (remove all) and count > 0 (from the head) are needed.
+                kept, removed = [], 0
+                for item in items:
+                    if item == value and (count == 0 or removed < count):
+                        removed += 1
+                    else:
+                        kept.append(item)
+                items[:] = kept
+                store.drop_if_empty(args[0])
+                return removed
+
+            if command == "ZADD":
+                members = store.container(args[0], dict, create=True)
+                added = 0
+                for score, member in zip(args[1::2], args[2::2]):
+                    added += member not in members
+                    members[member] = float(score)
+                return added
+
+            if command == "ZREM":
+                members = store.container(args[0], dict)
+                if not members:
+                    return 0
+                removed = sum(1 for member in args[1:] if members.pop(member, None) is not None)
+                store.drop_if_empty(args[0])
+                return removed
+
+            if command == "ZRANGEBYSCORE":
+                members = store.container(args[0], dict) or {}
+                low, high = _score(args[1]), _score(args[2])
+                return [
+                    member for member, score in sorted(members.items(), key=lambda m: (m[1], m[0]))
+                    if low <= score <= high
+                ]
+
+            if command == "ZCARD":
+                return len(store.container(args[0], dict) or {})
+
+            if command == "DBSIZE":
+                return sum(1 for key in list(store.data) if store.live(key))
+
+            if command == "FLUSHDB":
+                store.data.clear()
+                return "OK"
+
+        raise ValueError(f"unknown command '{command}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Redis-protocol stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    server = LocalRedisServer(args.host, args.port)
+    print(f"🧪 Local Redis stand-in on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,21 @@
 import os
-from dotenv import load_dotenv
+import httpx
 from typing import Literal, Optional, Any
 from pydantic import BaseModel, Field
-from utils.config_loader import load_config
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
+from logger.logging import get_logger
+from utils.settings import get_settings
+from utils.startup import lazy_import
+from utils.llm_failover import build_failover_model
+from utils.llm_pool import KeyState, PooledChatModel, rate_limit_hooks, register_pool
+
+
+log = get_logger("model_loader")
 
 
 class ConfigLoader:
     def __init__(self):
-        load_dotenv()
-        print("Loaded config.....")
-        self.config = load_config()
+        log.info("Loaded config.....")
+        self.config = get_settings().config
 
         if "llm" not in self.config:
             raise ValueError("Missing 'llm' section in config.yaml")
@@ -19,67 +23,182 @@ class ConfigLoader:
     def __getitem__(self, key):
         return self.config[key]
 
+    def get(self, key, default=None):
+        return self.config.get(key, default)
+
 
 class ModelLoader(BaseModel):
-    model_provider: Literal["groq", "openai"] = "groq"
+    model_provider: Literal["groq", "openai", "fake"] = "groq"
     config: Optional[ConfigLoader] = Field(default=None, exclude=True)
 
     def model_post_init(self, __context: Any) -> None:
-        load_dotenv()
         self.config = ConfigLoader()
 
     class Config:
         arbitrary_types_allowed = True
 
-    def load_llm(self):
-        """Load and return the LLM model."""
-        print("LLM loading...")
-        print(f"Loading model from provider: {self.model_provider}")
+    def role_config(self, role: Optional[str], provider: Optional[str] = None) -> dict:
+        """Per-role overrides from `llm.roles.<provider>.<role>` in config.yaml."""
+        if role is None:
+            return {}
+        roles = self.config["llm"].get("roles", {}).get(provider or self.model_provider, {})
+        return roles.get(role) or {}
+
+    def role_signature(self, role: str) -> tuple:
+        """Hashable summary of a role's overrides across all providers."""
+        roles = self.config["llm"].get("roles", {})
+        return tuple(
+            (provider, tuple(sorted((roles[provider].get(role) or {}).items())))
+            for provider in sorted(roles)
+        )
+
+    def failover_providers(self) -> list:
+        """Providers to keep loaded, primary (`model_provider`) first."""
+        failover_config = self.config["llm"].get("failover") or {}
+        if not failover_config.get("enabled", False):
+            return [self.model_provider]
+
+        others = failover_config.get("providers", [])
+        return [self.model_provider, *(p for p in others if p != self.model_provider)]
+
+    def _build_chat_model(self, chat_cls, default_key_env: str, provider_config: dict, **kwargs):
+        """Build one client, or a key pool when `pool` lists several keys/endpoints."""
+        members = []
+        for member in provider_config.get("pool") or [{"api_key_env": default_key_env}]:
+            api_key = os.getenv(member.get("api_key_env", default_key_env))
+            if api_key:
+                members.append((member, api_key))
+
+        if not members:
+            raise EnvironmentError(f"{default_key_env} is not set")
+
+        if len(members) == 1:
+            member, api_key = members[0]
+            if member.get("base_url"):
+                kwargs["base_url"] = member["base_url"]
+            return chat_cls(api_key=api_key, **kwargs)
+
+        clients, states, http_clients = [], [], []
+        for member, api_key in members:
+            label = member.get("api_key_env", default_key_env)
+            if member.get("base_url"):
+                label = f"{label}@{member['base_url']}"
+
+            state = KeyState(label)
+            sync_hooks, async_hooks = rate_limit_hooks(state)
+            extra = {"base_url": member["base_url"]} if member.get("base_url") else {}
+
+            # 429s, 5xx and connection errors are retried by the pool on
+            # another key, not by the SDK on the same key.
+            http_client = httpx.Client(event_hooks=sync_hooks)
+            http_async_client = httpx.AsyncClient(event_hooks=async_hooks)
+            clients.append(chat_cls(
+                api_key=api_key,
+                max_retries=0,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **extra,
+                **kwargs,
+            ))
+            states.append(state)
+            http_clients += [http_client, http_async_client]
+
+        log.info("🔑 LLM key pool with %d members", len(clients))
+        return register_pool(PooledChatModel(
+            clients=clients,
+            states=states,
+            model_name=kwargs["model"],
+            http_clients=http_clients,
+        ))
+
+    def load_llm(self, role: Optional[str] = None):
+        """Load and return the LLM model (optionally the one configured for `role`).
+
+        With `llm.failover` enabled, every listed provider with credentials
+        is loaded and wrapped in a `FailoverChatModel`.
+        """
+        providers = self.failover_providers()
+        if len(providers) == 1:
+            return self._load_provider_llm(self.model_provider, role)
+
+        clients = {}
+        for provider in providers:
+            try:
+                clients[provider] = self._load_provider_llm(provider, role)
+            except EnvironmentError as e:
+                log.warning("⚠️ Skipping LLM provider %s for failover: %s", provider, e)
+
+        if not clients:
+            raise EnvironmentError(f"No LLM provider credentials set (tried: {', '.join(providers)})")
+        if len(clients) == 1:
+            return next(iter(clients.values()))
+
+        log.info("🔀 LLM failover across: %s", ", ".join(clients))
+        return build_failover_model(clients, self.config["llm"].get("failover"))
+
+    def _load_provider_llm(self, provider: str, role: Optional[str] = None):
+        """Load one provider's model."""
+        log.info("LLM loading...")
+        log.info("Loading model from provider: %s%s", provider, f" (role: {role})" if role else "")
 
         llm_config = self.config["llm"]
-
-        if self.model_provider == "groq":
-            print("Loading LLM from Groq..............")
-
-            groq_api_key = os.getenv("GROQ_API_KEY")
-            if not groq_api_key:
-                raise EnvironmentError("GROQ_API_KEY is not set")
+        role_config = self.role_config(role, provider)
+        timeout = (llm_config.get("failover") or {}).get("timeout_seconds")
+        temperature = float(role_config.get("temperature", 0.2))
+        extra = {}
+        if role_config.get("max_tokens"):
+            extra["max_tokens"] = int(role_config["max_tokens"])
+        if timeout:
+            extra["timeout"] = float(timeout)
+
+        if provider == "groq":
+            log.info("Loading LLM from Groq..............")
 
             if "groq" not in llm_config:
                 raise ValueError("Missing 'groq' config in config.yaml")
 
-            model_name = llm_config["groq"].get("model_name")
+            model_name = role_config.get("model_name") or llm_config["groq"].get("model_name")
             if not model_name:
                 raise ValueError("Missing groq.model_name in config.yaml")
 
-            return ChatGroq(
+            # Provider SDKs are only imported when selected.
+            chat_groq = lazy_import("langchain_groq").ChatGroq
+            return self._build_chat_model(
+                chat_groq, "GROQ_API_KEY", llm_config["groq"],
                 model=model_name,
-                api_key=groq_api_key,
-                temperature=0.2,
+                temperature=temperature,
+                **extra,
             )
 
-        elif self.model_provider == "openai":
-            print("Loading LLM from OpenAI..............")
-
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            if not openai_api_key:
-                raise EnvironmentError("OPENAI_API_KEY is not set")
+        elif provider == "openai":
+            log.info("Loading LLM from OpenAI..............")
 
             if "openai" not in llm_config:
                 raise ValueError("Missing 'openai' config in config.yaml")
 
-            model_name = llm_config["openai"].get("model_name")
+            model_name = role_config.get("model_name") or llm_config["openai"].get("model_name")
             if not model_name:
                 raise ValueError("Missing openai.model_name in config.yaml")
 
-            return ChatOpenAI(
+            chat_openai = lazy_import("langchain_openai").ChatOpenAI
+            return self._build_chat_model(
+                chat_openai, "OPENAI_API_KEY", llm_config["openai"],
                 model=model_name,
-                api_key=openai_api_key,
-                temperature=0.2,
+                temperature=temperature,
+                **extra,
+            )
+
+        elif provider == "fake":
+            log.info("Loading scripted fake LLM (offline)..............")
+
+            # Deterministic stand-in used by the benchmark suite; no API key.
+            scripted_chat_model = lazy_import("benchmarks.fake_llm").ScriptedChatModel
+            return scripted_chat_model.from_config(
+                {**(llm_config.get("fake") or {}), **role_config}
             )
 
         else:
             raise ValueError(
-                f"Unsupported model_provider '{self.model_provider}'. "
-                f"Supported: groq, openai"
+                f"Unsupported model_provider '{provider}'. "
+                f"Supported: groq, openai, fake"
             )
@@ -1,112 +1,262 @@
 import os
-from langchain_tavily import TavilySearch
-from langchain_google_community import GooglePlacesTool, GooglePlacesAPIWrapper
+import time
+from typing import Optional
+from utils.cache import TieredCache, normalize_key
+from utils.circuit_breaker import CircuitBreaker
+from utils.place_records import PlaceResults, parse_google_places, parse_tavily
+from utils.settings import get_settings
+from utils.shared_cache import build_tiered_cache
+from utils.startup import lazy_import
+from utils.telemetry import upstream_call
+from utils.thread_pool import run_in_thread
 
 
-MAX_CHARS = 1500  # prevent token bloat
+PLACE_QUERIES = {
+    "attractions": "top attractive places in and around {place}",
+    "restaurants": "top 10 restaurants and eateries in and around {place}",
+    "activities": "popular activities in and around {place}",
+    "transportation": "modes of transportation available in {place}",
+}
+
+
+def build_place_query(category: str, place: str) -> str:
+    """Build the provider search query for a place category."""
+    if category not in PLACE_QUERIES:
+        raise ValueError(
+            f"Unsupported place category '{category}'. "
+            f"Supported: {', '.join(PLACE_QUERIES)}"
+        )
+
+    return PLACE_QUERIES[category].format(place=place)
+
+
+DAY = 24 * 60 * 60
+
+# Places change slowly; restaurants churn fastest.
+DEFAULT_PLACE_TTLS = {
+    "attractions": 7 * DAY,
+    "restaurants": 1 * DAY,
+    "activities": 3 * DAY,
+    "transportation": 7 * DAY,
+}
+DEFAULT_PLACE_STALE_TTL = 1 * DAY
+
+
+def place_cache_key(provider: str, category: str, place: str) -> str:
+    # v2: structured `PlaceResults` rather than preformatted text.
+    return f"place:v2:{provider}:{category}:{normalize_key(place)}"
+
+
+class PlaceSearchCache:
+    """Per-category TTL cache for place search results.
+
+    Backed by a per-worker LRU and the configured shared tier, with
+    stale-while-revalidate so a hot destination never waits on the upstream
+    once it has been seen.
+    """
+
+    def __init__(self, cache: TieredCache, ttls: Optional[dict] = None,
+                 stale_ttl: float = DEFAULT_PLACE_STALE_TTL):
+        self.cache = cache
+        self.ttls = {**DEFAULT_PLACE_TTLS, **(ttls or {})}
+        self.stale_ttl = stale_ttl
+
+    @classmethod
+    def from_config(cls, cache_config: Optional[dict]) -> Optional["PlaceSearchCache"]:
+        """Build the cache from the `cache.places` section of config.yaml."""
+        cache_config = cache_config or {}
+        if not cache_config.get("enabled", True):
+            return None
+
+        return cls(
+            build_tiered_cache(cache_config, "place_search", default_max_entries=2048),
+            ttls=cache_config.get("ttl_seconds"),
+            stale_ttl=float(cache_config.get("stale_seconds", DEFAULT_PLACE_STALE_TTL)),
+        )
+
+    def get_or_search(self, provider: str, category: str, place: str, search) -> dict:
+        return self.cache.get_or_compute(
+            place_cache_key(provider, category, place),
+            search,
+            ttl=self.ttls[category],
+            stale_ttl=self.stale_ttl,
+        )
+
+    async def aget_or_search(self, provider: str, category: str, place: str, search) -> dict:
+        return await self.cache.aget_or_compute(
+            place_cache_key(provider, category, place),
+            search,
+            ttl=self.ttls[category],
+            stale_ttl=self.stale_ttl,
+        )
+
+    def stats(self) -> dict:
+        return self.cache.stats_dict()
+
+
+def _record(breaker: Optional[CircuitBreaker], started: float, failed: bool) -> None:
+    """Report one upstream call's latency and outcome to the provider's breaker."""
+    if breaker is None:
+        return
+    latency = time.monotonic() - started
+    if failed:
+        breaker.record_failure(latency)
+    else:
+        breaker.record_success(latency)
 
 
 class GooglePlaceSearchTool:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[PlaceSearchCache] = None,
+                 breaker: Optional[CircuitBreaker] = None):
         if not api_key:
             raise EnvironmentError("GPLACES_API_KEY is not set")
 
-        self.places_wrapper = GooglePlacesAPIWrapper(gplaces_api_key=api_key)
-        self.places_tool = GooglePlacesTool(api_wrapper=self.places_wrapper)
-
-    def _safe_run(self, query: str) -> str:
-        """Safely run a Google Places query."""
-        try:
-            result = self.places_tool.run(query)
+        google_community = lazy_import("langchain_google_community")
+        self.places_wrapper = google_community.GooglePlacesAPIWrapper(gplaces_api_key=api_key)
+        self.places_wrapper.google_map_client.base_url = get_settings().upstream_url("google_places")
+        self.cache = cache
+        self.breaker = breaker
 
-            if not result:
-                raise RuntimeError("Empty response from Google Places")
+    def _safe_run(self, query: str) -> dict:
+        """Safely run a Google Places text search.
 
-            return self._normalize_output(result)
+        One text-search call returns name, rating, price level, address and
+        location for every match, so the per-place detail lookups the
+        LangChain tool makes are skipped. No matches is a valid answer (the
+        caller falls back to Tavily), not a provider failure.
+        """
+        started = time.monotonic()
+        try:
+            with upstream_call("google_places", "text_search"):
+                response = self.places_wrapper.google_map_client.places(query)
+            results = parse_google_places(response)
+            _record(self.breaker, started, failed=False)
+            return results.model_dump(exclude_none=True)
 
         except Exception as e:
+            _record(self.breaker, started, failed=True)
             raise RuntimeError(f"Google Places API failed: {e}") from e
 
-    @staticmethod
-    def _normalize_output(result) -> str:
-        """Ensure output is a clean, truncated string."""
-        text = str(result)
+    async def _asafe_run(self, query: str) -> dict:
+        """Run a Google Places query on the shared thread pool.
+
+        The Places SDK is sync-only, so it is kept off the event loop.
+        """
+        return await run_in_thread(self._safe_run, query)
 
-        if len(text) > MAX_CHARS:
-            text = text[:MAX_CHARS] + "..."
+    def search(self, category: str, place: str) -> PlaceResults:
+        """Search a place category (attractions, restaurants, ...)."""
+        query = build_place_query(category, place)
+        if self.cache is None:
+            return PlaceResults.model_validate(self._safe_run(query))
 
-        return text
+        return PlaceResults.model_validate(self.cache.get_or_search(
+            "google", category, place, lambda: self._safe_run(query)
+        ))
 
-    def google_search_attractions(self, place: str) -> str:
+    async def asearch(self, category: str, place: str) -> PlaceResults:
+        """Async counterpart of `search`."""
+        query = build_place_query(category, place)
+        if self.cache is None:
+            return PlaceResults.model_validate(await self._asafe_run(query))
+
+        return PlaceResults.model_validate(await self.cache.aget_or_search(
+            "google", category, place, lambda: self._asafe_run(query)
+        ))
+
+    def google_search_attractions(self, place: str) -> PlaceResults:
         """Search attractions in the specified place."""
-        return self._safe_run(f"top attractive places in and around {place}")
+        return self.search("attractions", place)
 
-    def google_search_restaurants(self, place: str) -> str:
+    def google_search_restaurants(self, place: str) -> PlaceResults:
         """Search restaurants in the specified place."""
-        return self._safe_run(
-            f"top 10 restaurants and eateries in and around {place}"
-        )
+        return self.search("restaurants", place)
 
-    def google_search_activity(self, place: str) -> str:
+    def google_search_activity(self, place: str) -> PlaceResults:
         """Search popular activities in the specified place."""
-        return self._safe_run(f"popular activities in and around {place}")
+        return self.search("activities", place)
 
-    def google_search_transportation(self, place: str) -> str:
+    def google_search_transportation(self, place: str) -> PlaceResults:
         """Search transportation options in the specified place."""
-        return self._safe_run(
-            f"modes of transportation available in {place}"
-        )
+        return self.search("transportation", place)
 
 
 class TavilyPlaceSearchTool:
-    def __init__(self):
-        self.tavily_tool = TavilySearch(
+    def __init__(self, cache: Optional[PlaceSearchCache] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.tavily_tool = lazy_import("langchain_tavily").TavilySearch(
             topic="general",
             include_answer="advanced",
+            api_base_url=get_settings().upstream_url("tavily"),
         )
+        self.cache = cache
+        self.breaker = breaker
 
-    def _safe_run(self, query: str) -> str:
+    @staticmethod
+    def _parse(result) -> dict:
+        """The answer and per-source records of a Tavily response (possibly empty)."""
+        return parse_tavily(result).model_dump(exclude_none=True)
+
+    def _safe_run(self, query: str) -> dict:
         """Safely run a Tavily query."""
+        started = time.monotonic()
         try:
-            result = self.tavily_tool.invoke({"query": query})
-
-            if isinstance(result, dict) and result.get("answer"):
-                text = result["answer"]
-            else:
-                text = str(result)
+            with upstream_call("tavily", "search"):
+                response = self.tavily_tool.invoke({"query": query})
+            result = self._parse(response)
+            _record(self.breaker, started, failed=False)
+            return result
 
-            if not text:
-                raise RuntimeError("Empty response from Tavily")
+        except Exception as e:
+            _record(self.breaker, started, failed=True)
+            raise RuntimeError(f"Tavily search failed: {e}") from e
 
-            return self._normalize_output(text)
+    async def _asafe_run(self, query: str) -> dict:
+        """Safely run a Tavily query using the SDK's native async client."""
+        started = time.monotonic()
+        try:
+            with upstream_call("tavily", "search"):
+                response = await self.tavily_tool.ainvoke({"query": query})
+            result = self._parse(response)
+            _record(self.breaker, started, failed=False)
+            return result
 
         except Exception as e:
+            _record(self.breaker, started, failed=True)
             raise RuntimeError(f"Tavily search failed: {e}") from e
 
-    @staticmethod
-    def _normalize_output(text: str) -> str:
-        """Ensure output is a clean, truncated string."""
-        if len(text) > MAX_CHARS:
-            text = text[:MAX_CHARS] + "..."
+    def search(self, category: str, place: str) -> PlaceResults:
+        """Search a place category (attractions, restaurants, ...)."""
+        query = build_place_query(category, place)
+        if self.cache is None:
+            return PlaceResults.model_validate(self._safe_run(query))
+
+        return PlaceResults.model_validate(self.cache.get_or_search(
+            "tavily", category, place, lambda: self._safe_run(query)
+        ))
+
+    async def asearch(self, category: str, place: str) -> PlaceResults:
+        """Async counterpart of `search`."""
+        query = build_place_query(category, place)
+        if self.cache is None:
+            return PlaceResults.model_validate(await self._asafe_run(query))
 
-        return text
+        return PlaceResults.model_validate(await self.cache.aget_or_search(
+            "tavily", category, place, lambda: self._asafe_run(query)
+        ))
 
-    def tavily_search_attractions(self, place: str) -> str:
+    def tavily_search_attractions(self, place: str) -> PlaceResults:
         """Search attractions using Tavily."""
-        return self._safe_run(f"top attractive places in and around {place}")
+        return self.search("attractions", place)
 
-    def tavily_search_restaurants(self, place: str) -> str:
+    def tavily_search_restaurants(self, place: str) -> PlaceResults:
         """Search restaurants using Tavily."""
-        return self._safe_run(
-            f"top 10 restaurants and eateries in and around {place}"
-        )
+        return self.search("restaurants", place)
 
-    def tavily_search_activity(self, place: str) -> str:
+    def tavily_search_activity(self, place: str) -> PlaceResults:
         """Search activities using Tavily."""
-        return self._safe_run(f"popular activities in and around {place}")
+        return self.search("activities", place)
 
-    def tavily_search_transportation(self, place: str) -> str:
+    def tavily_search_transportation(self, place: str) -> PlaceResults:
         """Search transportation using Tavily."""
-        return self._safe_run(
-            f"modes of transportation available in {place}"
-        )
+        return self.search("transportation", place)
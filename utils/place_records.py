@@ -0,0 +1,173 @@
+import math
+import re
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from utils.tokens import count_text_tokens
+
+
+DEFAULT_MAX_TOKENS = 400
+DEFAULT_MAX_PLACES = 10
+DESCRIPTION_CHARS = 140
+SUMMARY_SHARE = 0.5  # at most this much of a budget goes to a provider summary
+
+# Google types that say nothing about a place.
+_GENERIC_TYPES = {"point_of_interest", "establishment", "premise", "political", "locality"}
+_TITLE_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]+$")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+# Field order of one formatted line; shown once in the tool output header.
+LINE_FORMAT = "name | rating (reviews) | price | area | lat,lng | about"
+
+
+class PlaceRecord(BaseModel):
+    name: str
+    rating: Optional[float] = None
+    reviews: Optional[int] = None
+    price_level: Optional[int] = None  # 0 (free) .. 4 (very expensive)
+    address: Optional[str] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    description: Optional[str] = None
+    url: Optional[str] = None
+
+
+class PlaceResults(BaseModel):
+    """One provider's answer for a place search, as cached."""
+
+    source: str
+    summary: Optional[str] = None
+    places: List[PlaceRecord] = []
+
+
+# ---------------------------
+# Parsing
+# ---------------------------
+def _clip(text: str, limit: int) -> str:
+    """First sentence(s) of `text` within `limit` characters."""
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    cut = max((m.start() for m in _SENTENCE_END.finditer(head)), default=-1)
+    if cut > limit // 3:
+        return head[:cut]
+    return head.rsplit(" ", 1)[0] + "…"
+
+
+def _short_address(address: Optional[str]) -> Optional[str]:
+    """Drop postcode and country: 'Fort Rd, Candolim, Goa 403515, India' -> 'Fort Rd, Candolim'."""
+    if not address:
+        return None
+    parts = [p.strip() for p in address.split(",") if p.strip()]
+    parts = [p for p in parts if not re.fullmatch(r"[\d\s-]+", p)]
+    return ", ".join(parts[:2]) or None
+
+
+def parse_google_places(response: dict) -> PlaceResults:
+    """Records from a Places text-search response (`googlemaps.Client.places`)."""
+    places = []
+    for result in (response or {}).get("results", []):
+        if not result.get("name") or result.get("business_status") == "CLOSED_PERMANENTLY":
+            continue
+
+        location = (result.get("geometry") or {}).get("location") or {}
+        types = [t.replace("_", " ") for t in result.get("types", []) if t not in _GENERIC_TYPES]
+        places.append(PlaceRecord(
+            name=result["name"],
+            rating=result.get("rating"),
+            reviews=result.get("user_ratings_total"),
+            price_level=result.get("price_level"),
+            address=_short_address(result.get("formatted_address") or result.get("vicinity")),
+            lat=location.get("lat"),
+            lng=location.get("lng"),
+            description=", ".join(types[:2]) or None,
+        ))
+    return PlaceResults(source="google", places=places)
+
+
+def parse_tavily(response) -> PlaceResults:
+    """Records from a Tavily search response: the answer plus one record per source."""
+    if not isinstance(response, dict):
+        return PlaceResults(source="tavily", summary=_clip(str(response), 1000) if response else None)
+
+    places = []
+    for result in response.get("results") or []:
+        title = _TITLE_SUFFIX.sub("", (result.get("title") or "").strip())
+        content = result.get("content") or ""
+        if not title and not content:
+            continue
+        places.append(PlaceRecord(
+            name=title or result.get("url", ""),
+            description=_clip(content, DESCRIPTION_CHARS) if content else None,
+            url=result.get("url"),
+        ))
+
+    answer = response.get("answer")
+    return PlaceResults(source="tavily", summary=answer.strip() if answer else None, places=places)
+
+
+# ---------------------------
+# Ranking and formatting
+# ---------------------------
+def _score(place: PlaceRecord) -> float:
+    """Rating weighted by how many reviews back it (unrated places sort last)."""
+    if place.rating is None:
+        return -1.0
+    return place.rating * math.log10((place.reviews or 0) + 10)
+
+
+def rank_places(places: List[PlaceRecord]) -> List[PlaceRecord]:
+    """Best first, duplicates (by name) dropped; unrated places keep provider order."""
+    seen, unique = set(), []
+    for place in places:
+        key = " ".join(place.name.lower().split())
+        if key not in seen:
+            seen.add(key)
+            unique.append(place)
+    return sorted(unique, key=_score, reverse=True)  # stable for equal scores
+
+
+def _count(n: int) -> str:
+    return f"{n / 1000:.0f}k" if n >= 10_000 else f"{n / 1000:.1f}k" if n >= 1000 else str(n)
+
+
+def format_place(place: PlaceRecord) -> str:
+    """One dense line; empty fields are left out entirely."""
+    fields = [place.name]
+    if place.rating is not None:
+        fields.append(f"{place.rating:g}★" + (f" ({_count(place.reviews)})" if place.reviews else ""))
+    if place.price_level is not None:
+        fields.append("free" if place.price_level == 0 else "$" * place.price_level)
+    if place.address:
+        fields.append(place.address)
+    if place.lat is not None and place.lng is not None:
+        fields.append(f"{place.lat:.3f},{place.lng:.3f}")
+    if place.description:
+        fields.append(place.description)
+    return " | ".join(fields)
+
+
+def format_places(results: PlaceResults, max_tokens: int = DEFAULT_MAX_TOKENS,
+                  max_places: int = DEFAULT_MAX_PLACES) -> str:
+    """The best places, one line each, within `max_tokens`."""
+    lines = []
+    budget = max_tokens
+
+    if results.summary:
+        summary = _clip(results.summary, int(max_tokens * SUMMARY_SHARE) * 4)
+        lines.append(summary)
+        budget -= count_text_tokens(summary)
+
+    places = rank_places(results.places)[:max_places]
+    for i, place in enumerate(places):
+        line = f"{i + 1}. {format_place(place)}"
+        tokens = count_text_tokens(line) + 1
+        if tokens > budget:
+            lines.append(f"(+{len(places) - i} more omitted)")
+            break
+        lines.append(line)
+        budget -= tokens
+
+    return "\n".join(lines)
@@ -0,0 +1,332 @@
+import contextvars
+import html
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from concurrent.futures import thread as _futures_thread
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.config_loader import PROJECT_ROOT
+
+
+DEFAULT_DIRECTORY = ".cache/profiles"
+DEFAULT_MAX_PROFILES = 50
+DEFAULT_INTERVAL_MS = 5.0
+DEFAULT_MAX_CONCURRENT = 1
+MAX_STACK_DEPTH = 128
+
+# Phases recorded outside the graph-node / LLM / tool hooks.
+JSON_PARSING = "json_parsing"
+MESSAGE_NORMALIZATION = "message_normalization"
+
+PROFILE_ID = re.compile(r"^\d{13}-[0-9a-f]{8}$")
+
+_active: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+
+# ---------------------------
+# Phase accounting
+# ---------------------------
+def current_profile() -> Optional["RequestProfile"]:
+    return _active.get()
+
+
+def record_phase(name: str, seconds: float, profile: Optional["RequestProfile"] = None) -> None:
+    """Add `seconds` to a phase of the request being profiled (no-op otherwise)."""
+    profile = profile or _active.get()
+    if profile is not None:
+        profile.add_phase(name, seconds)
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block as one phase of the request being profiled (no-op otherwise)."""
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+
+    profile.watch_thread()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_phase(name, time.perf_counter() - started)
+
+
+# ---------------------------
+# Sampling
+# ---------------------------
+_frame_names: Dict[object, str] = {}
+# A pool thread parked here is waiting for work, not working for us.
+_IDLE_WORKER = _futures_thread._worker.__code__
+_site_packages = f"{os.sep}site-packages{os.sep}"
+
+
+def _frame_name(code) -> str:
+    name = _frame_names.get(code)
+    if name is None:
+        path = code.co_filename
+        if path.startswith(str(PROJECT_ROOT)):
+            path = os.path.relpath(path, PROJECT_ROOT)
+        elif _site_packages in path:
+            path = path.split(_site_packages, 1)[1]
+        else:
+            path = os.path.basename(path)
+        name = f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+        _frame_names[code] = name
+    return name
+
+
+def _fold(frame, thread_name: str) -> str:
+    """One `root;...;leaf` line of a collapsed stack."""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class RequestProfile:
+    """Sampling profile and per-phase timings of one request.
+
+    A sampler thread records the stack of every watched thread each
+    `interval` seconds: the event loop thread the request started on,
+    plus worker threads that enter a phase on its behalf. The loop is
+    shared, so samples taken while it runs other requests land here too;
+    the phase timings only count this request.
+    """
+
+    def __init__(self, label: str, interval: float = DEFAULT_INTERVAL_MS / 1000):
+        self.id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.interval = interval
+        self.started_at = time.time()
+        self.wall_seconds = None
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+        self._lock = threading.Lock()
+        self._phases: Dict[str, List[float]] = {}
+        self._threads = {threading.get_ident(): threading.current_thread().name}
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample, name=f"profiler-{self.id}", daemon=True
+        )
+        self._token = None
+        self._started = None
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        with self._lock:
+            totals = self._phases.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+    def watch_thread(self) -> None:
+        ident = threading.get_ident()
+        if ident not in self._threads:
+            with self._lock:
+                self._threads[ident] = threading.current_thread().name
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, name in threads:
+                frame = frames.get(ident)
+                if frame is not None and ident != me and frame.f_code is not _IDLE_WORKER:
+                    self.stacks[_fold(frame, name)] += 1
+            self.samples += 1
+
+    def __enter__(self) -> "RequestProfile":
+        self._token = _active.set(self)
+        self._started = time.perf_counter()
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.wall_seconds = time.perf_counter() - self._started
+        self._stop.set()
+        self._sampler.join()
+        _active.reset(self._token)
+
+    def phases(self) -> dict:
+        with self._lock:
+            phases = {name: list(totals) for name, totals in self._phases.items()}
+        return {
+            name: {"ms": round(seconds * 1000, 1), "calls": calls}
+            for name, (seconds, calls) in sorted(phases.items(), key=lambda p: -p[1][0])
+        }
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "wall_ms": round((self.wall_seconds or 0) * 1000, 1),
+            "samples": self.samples,
+            "interval_ms": round(self.interval * 1000, 2),
+            "phases": self.phases(),
+        }
+
+    def as_dict(self) -> dict:
+        return {**self.summary(), "stacks": dict(self.stacks.most_common())}
+
+
+# ---------------------------
+# Flame graph
+# ---------------------------
+FRAME_HEIGHT = 16
+SVG_WIDTH = 1200
+CHAR_WIDTH = 6.5
+
+
+def _color(name: str) -> str:
+    h = zlib.crc32(name.encode("utf-8"))
+    return f"rgb({205 + h % 50},{(h >> 8) % 180 + 50},{(h >> 16) % 55})"
+
+
+def render_flamegraph(stacks: Dict[str, int], title: str = "") -> str:
+    """An SVG flame graph (root at the bottom) of collapsed stacks."""
+    root = {"value": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["value"] += count
+        node = root
+        for name in stack.split(";"):
+            node = node["children"].setdefault(name, {"value": 0, "children": {}})
+            node["value"] += count
+
+    def depth(node) -> int:
+        return 1 + max((depth(child) for child in node["children"].values()), default=0)
+
+    total = root["value"] or 1
+    rows = depth(root) - 1
+    height = (rows + 2) * FRAME_HEIGHT
+    scale = SVG_WIDTH / total
+    rects = []
+
+    def draw(node, x: float, level: int) -> None:
+        for name, child in sorted(node["children"].items()):
+            width = child["value"] * scale
+            if width >= 0.5:
+                y = height - (level + 1) * FRAME_HEIGHT
+                fits = int((width - 4) / CHAR_WIDTH)
+                label = name if len(name) <= fits else name[:fits - 2] + ".."
+                share = 100 * child["value"] / total
+                rects.append(
+                    f'<g><title>{html.escape(name)} ({child["value"]} samples, {share:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FRAME_HEIGHT - 1}" '
+                    f'fill="{_color(name)}"/>'
+                    + (f'<text x="{x + 2:.1f}" y="{y + FRAME_HEIGHT - 4}">{html.escape(label)}</text>'
+                       if width > 3 * CHAR_WIDTH else "")
+                    + "</g>"
+                )
+                draw(child, x, level + 1)
+            x += width
+
+    draw(root, 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="4" y="12">{html.escape(title)} ({total} samples)</text>'
+        + "".join(rects) + "</svg>"
+    )
+
+
+# ---------------------------
+# Storage
+# ---------------------------
+class ProfileStore:
+    """The last `max_profiles` profiles, one JSON file each; older ones are dropped."""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_profiles: int = DEFAULT_MAX_PROFILES):
+        self.directory = Path(directory)
+        if not self.directory.is_absolute():
+            self.directory = PROJECT_ROOT / self.directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str) -> Path:
+        if not PROFILE_ID.match(profile_id):
+            raise KeyError(profile_id)
+        return self.directory / f"{profile_id}.json"
+
+    def _ids(self) -> List[str]:
+        # Ids start with a millisecond timestamp, so name order is age order.
+        return sorted(p.stem for p in self.directory.glob("*.json") if PROFILE_ID.match(p.stem))
+
+    def save(self, profile: dict) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(profile["id"])
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(profile, ensure_ascii=False))
+            os.replace(tmp, path)
+
+            ids = self._ids()
+            for stale in ids[:max(0, len(ids) - self.max_profiles)]:
+                self._path(stale).unlink(missing_ok=True)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        try:
+            return json.loads(self._path(profile_id).read_text())
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def list(self) -> List[dict]:
+        """Newest first, without the stacks."""
+        summaries = []
+        for profile_id in reversed(self._ids()):
+            profile = self.get(profile_id)
+            if profile is not None:
+                profile.pop("stacks", None)
+                summaries.append(profile)
+        return summaries
+
+
+class Profiler:
+    """Opt-in request profiling (`profiling` in config.yaml)."""
+
+    def __init__(self, store: ProfileStore, interval: float = DEFAULT_INTERVAL_MS / 1000,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT):
+        self.store = store
+        self.interval = interval
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    @classmethod
+    def from_config(cls, profiling_config: Optional[dict]) -> Optional["Profiler"]:
+        profiling_config = profiling_config or {}
+        if not profiling_config.get("enabled", True):
+            return None
+
+        return cls(
+            ProfileStore(
+                profiling_config.get("directory", DEFAULT_DIRECTORY),
+                int(profiling_config.get("max_profiles", DEFAULT_MAX_PROFILES)),
+            ),
+            interval=float(profiling_config.get("sample_interval_ms", DEFAULT_INTERVAL_MS)) / 1000,
+            max_concurrent=int(profiling_config.get("max_concurrent", DEFAULT_MAX_CONCURRENT)),
+        )
+
+    def try_acquire(self) -> bool:
+        """Claim a profiling slot; each one runs a sampler thread."""
+        return self._slots.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def profile(self, label: str) -> RequestProfile:
+        return RequestProfile(label, self.interval)
@@ -1,6 +1,11 @@
 import os
 import datetime
 
+from logger.logging import get_logger
+
+
+log = get_logger("documents")
+
 
 def save_document(response_text: str, directory: str = "./output") -> str:
     """Export travel plan to a Markdown file with proper formatting."""
@@ -33,7 +38,7 @@ def save_document(response_text: str, directory: str = "./output") -> str:
         with open(filename, "w", encoding="utf-8") as f:
             f.write(markdown_content)
 
-        print(f"Markdown file saved as: {filename}")
+        log.info("Markdown file saved as: %s", filename)
         return filename
 
     except Exception as e:
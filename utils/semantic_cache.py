@@ -0,0 +1,391 @@
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from typing import Callable, Hashable, List, Optional
+
+import numpy as np
+from utils.cache import CacheEntry, CacheStats
+from utils.shared_cache import build_cache_store, local_ttl
+from utils.thread_pool import run_in_thread
+
+
+DEFAULT_DIMENSIONS = 512
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL = 6 * 60 * 60
+DEFAULT_PLANS_PER_SIGNATURE = 4
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = {
+    "a", "an", "the", "to", "in", "for", "of", "on", "and", "with", "me", "my",
+    "please", "plan", "trip", "create", "make", "give", "i", "want", "travel",
+    "itinerary", "visit", "around", "at",
+}
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of words and trigrams.
+
+    Robust to word order, plurals and casing ("goa trip 5 days" vs "5 day
+    trip to Goa"), and cheap enough to run inline on the request path.
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _features(self, text: str):
+        for word in _WORD.findall(text.lower()):
+            if word in _STOP_WORDS:
+                continue
+            if len(word) > 3 and word.endswith("s"):
+                word = word[:-1]
+
+            yield f"w:{word}", 1.0
+            padded = f"^{word}$"
+            for i in range(len(padded) - 2):
+                yield f"c:{padded[i:i + 3]}", 0.3
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                vectors[row, h % self.dimensions] += sign * weight
+
+        return vectors
+
+
+class SentenceTransformerEmbedder:
+    """Local CPU embedding model via the optional `sentence-transformers` package."""
+
+    def __init__(self, model_name: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "sentence-transformers is required for embedding model "
+                f"'{model_name}'. Install it or use embedding_model: hashing"
+            ) from e
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts), dtype=np.float32)
+
+
+def load_embedder(model_name: str, dimensions: int = DEFAULT_DIMENSIONS):
+    if model_name in ("", "hashing"):
+        return HashingEmbedder(dimensions)
+    return SentenceTransformerEmbedder(model_name)
+
+
+class VectorIndex:
+    """Fixed-capacity cosine-similarity index over a contiguous float32 matrix.
+
+    Rows are L2-normalized so a single matrix-vector product scores every
+    entry. Expired rows are reclaimed first; otherwise the least recently
+    used row is evicted.
+    """
+
+    def __init__(self, dimensions: int, capacity: int, stats: Optional[CacheStats] = None):
+        self.dimensions = dimensions
+        self.capacity = capacity
+        self.stats = stats or CacheStats()
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.occupied = np.zeros(capacity, dtype=bool)
+        self.payloads: List[Optional[dict]] = [None] * capacity
+
+    @staticmethod
+    def normalize(vector: np.ndarray) -> np.ndarray:
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _free_slot(self, now: float) -> int:
+        free = np.flatnonzero(~self.occupied)
+        if free.size:
+            return int(free[0])
+
+        expired = np.flatnonzero(self.expires_at <= now)
+        if expired.size:
+            self.stats.incr("expirations")
+            return int(expired[0])
+
+        self.stats.incr("evictions")
+        return int(np.argmin(self.last_used))
+
+    def add(self, vector: np.ndarray, payload: dict, ttl: float) -> int:
+        now = time.time()
+        slot = self._free_slot(now)
+
+        self.vectors[slot] = self.normalize(vector)
+        self.expires_at[slot] = now + ttl
+        self.last_used[slot] = now
+        self.occupied[slot] = True
+        self.payloads[slot] = payload
+        return slot
+
+    def remove(self, slot: int) -> None:
+        self.occupied[slot] = False
+        self.vectors[slot] = 0.0
+        self.payloads[slot] = None
+
+    def search(self, vector: np.ndarray, threshold: float, limit: int = 5) -> List[tuple]:
+        """Return up to `limit` live (slot, similarity) pairs above `threshold`."""
+        now = time.time()
+        scores = self.vectors @ self.normalize(vector)
+        live = self.occupied & (self.expires_at > now)
+        scores = np.where(live, scores, -1.0)
+
+        candidates = np.flatnonzero(scores >= threshold)
+        if not candidates.size:
+            return []
+
+        best = candidates[np.argsort(-scores[candidates])[:limit]]
+        return [(int(slot), float(scores[slot])) for slot in best]
+
+    def touch(self, slot: int) -> None:
+        self.last_used[slot] = time.time()
+
+    def clear(self) -> None:
+        self.occupied[:] = False
+        self.vectors[:] = 0.0
+        self.payloads = [None] * self.capacity
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.occupied & (self.expires_at > time.time())))
+
+
+def _encode_vector(vector: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def _decode_vector(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+class SemanticPlanCache:
+    """Cache of final trip plans looked up by query similarity.
+
+    A query hits when its embedding is within `threshold` cosine similarity
+    of a cached query *and* both have the same structural signature
+    (e.g. destination and duration), so "5 days in Goa" never serves a
+    cached "7 days in Goa" plan.
+
+    With a shared store, plans are also kept there in one bucket per
+    signature (query, embedding, answer). A miss in this worker's index
+    checks the bucket and copies a hit in for at most `local_ttl`
+    seconds; every plan expires `ttl` after it was created in both tiers.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+        signature: Optional[Callable[[str], Hashable]] = None,
+        shared_store=None,
+        local_ttl: Optional[float] = None,
+        plans_per_signature: int = DEFAULT_PLANS_PER_SIGNATURE,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.signature = signature or (lambda query: None)
+        self.shared_store = shared_store
+        self.local_ttl = local_ttl
+        self.plans_per_signature = plans_per_signature
+        self.stats = CacheStats()
+        self.index = VectorIndex(embedder.dimensions, max_entries, stats=self.stats)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cache_config: Optional[dict],
+                    signature: Optional[Callable[[str], Hashable]] = None) -> Optional["SemanticPlanCache"]:
+        """Build the cache from the `cache.plans` section of config.yaml."""
+        cache_config = cache_config or {}
+        if not cache_config.get("enabled", True):
+            return None
+
+        embedder = load_embedder(
+            cache_config.get("embedding_model", "hashing"),
+            int(cache_config.get("dimensions", DEFAULT_DIMENSIONS)),
+        )
+        shared_store = build_cache_store(cache_config, "plans")
+        return cls(
+            embedder,
+            threshold=float(cache_config.get("similarity_threshold", DEFAULT_THRESHOLD)),
+            max_entries=int(cache_config.get("max_entries", DEFAULT_MAX_ENTRIES)),
+            ttl=float(cache_config.get("ttl_seconds", DEFAULT_TTL)),
+            signature=signature,
+            shared_store=shared_store,
+            local_ttl=local_ttl(cache_config) if shared_store is not None else None,
+            plans_per_signature=int(
+                cache_config.get("plans_per_signature", DEFAULT_PLANS_PER_SIGNATURE)
+            ),
+        )
+
+    def _embed(self, query: str) -> np.ndarray:
+        return self.embedder.embed([query])[0]
+
+    # ---------------------------
+    # Shared tier
+    # ---------------------------
+    @staticmethod
+    def _bucket_key(signature: Hashable) -> str:
+        digest = hashlib.sha1(json.dumps(signature, default=str).encode("utf-8")).hexdigest()
+        return f"plans:{digest[:20]}"
+
+    def _bucket(self, signature: Hashable) -> list:
+        entry = self.shared_store.get(self._bucket_key(signature))
+        if entry is None:
+            return []
+        now = time.time()
+        return [plan for plan in entry.value if plan["created_at"] + self.ttl > now]
+
+    def _write_bucket(self, signature: Hashable, plans: list) -> None:
+        key = self._bucket_key(signature)
+        if not plans:
+            self.shared_store.delete(key)
+            return
+        # The bucket lives until its newest plan expires.
+        newest = max(plan["created_at"] for plan in plans)
+        self.shared_store.set(key, CacheEntry(plans, newest, self.ttl, 0.0))
+
+    def _lookup_shared(self, vector: np.ndarray, signature: Hashable) -> Optional[dict]:
+        query_vector = VectorIndex.normalize(vector)
+        best, best_score = None, self.threshold
+        for plan in self._bucket(signature):
+            score = float(VectorIndex.normalize(_decode_vector(plan["vector"])) @ query_vector)
+            if score >= best_score:
+                best, best_score = plan, score
+
+        if best is None:
+            return None
+
+        payload = {
+            "query": best["query"],
+            "answer": best["answer"],
+            "signature": signature,
+            "created_at": best["created_at"],
+        }
+        remaining = best["created_at"] + self.ttl - time.time()
+        with self._lock:
+            self.index.add(vector, payload, min(remaining, self.local_ttl or remaining))
+        return {**payload, "similarity": round(best_score, 4)}
+
+    def _store_shared(self, query: str, vector: np.ndarray, answer: str,
+                      signature: Hashable, created_at: float) -> None:
+        plans = [plan for plan in self._bucket(signature) if plan["query"] != query]
+        plans.append({
+            "query": query,
+            "answer": answer,
+            "vector": _encode_vector(vector),
+            "created_at": created_at,
+        })
+        # Concurrent writers may drop each other's plan; it is recomputed on the next miss.
+        self._write_bucket(signature, plans[-self.plans_per_signature:])
+
+    # ---------------------------
+    # Lookup / store
+    # ---------------------------
+    def _lookup(self, query: str, vector: np.ndarray) -> Optional[dict]:
+        signature = self.signature(query)
+
+        with self._lock:
+            for slot, score in self.index.search(vector, self.threshold):
+                payload = self.index.payloads[slot]
+                if payload["signature"] != signature:
+                    continue
+
+                self.index.touch(slot)
+                self.stats.incr("hits")
+                return {**payload, "similarity": round(score, 4)}
+
+        if self.shared_store is not None:
+            shared = self._lookup_shared(vector, signature)
+            if shared is not None:
+                self.stats.incr("hits")
+                return shared
+
+        self.stats.incr("misses")
+        return None
+
+    def _store(self, query: str, vector: np.ndarray, answer: str) -> None:
+        payload = {
+            "query": query,
+            "answer": answer,
+            "signature": self.signature(query),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self.index.add(vector, payload, min(self.ttl, self.local_ttl or self.ttl))
+        if self.shared_store is not None:
+            self._store_shared(query, vector, answer, payload["signature"], payload["created_at"])
+        self.stats.incr("writes")
+
+    def lookup(self, query: str) -> Optional[dict]:
+        """Return the cached entry (query, answer, similarity, ...) or None."""
+        return self._lookup(query, self._embed(query))
+
+    def store(self, query: str, answer: str) -> None:
+        self._store(query, self._embed(query), answer)
+
+    async def alookup(self, query: str) -> Optional[dict]:
+        # Embedding (and a shared-tier read) stay off the event loop.
+        return await run_in_thread(self.lookup, query)
+
+    async def astore(self, query: str, answer: str) -> None:
+        await run_in_thread(self.store, query, answer)
+
+    def invalidate(self, query: Optional[str] = None) -> int:
+        """Drop entries similar to `query`, or everything; returns the count removed.
+
+        Other workers drop their copies within `local_ttl`.
+        """
+        if query is None:
+            with self._lock:
+                removed = len(self.index)
+                self.index.clear()
+            if self.shared_store is not None:
+                self.shared_store.clear()
+            return removed
+
+        vector = self._embed(query)
+        with self._lock:
+            matches = self.index.search(vector, self.threshold, limit=self.index.capacity)
+            for slot, _ in matches:
+                self.index.remove(slot)
+        removed = len(matches)
+
+        if self.shared_store is not None:
+            signature = self.signature(query)
+            query_vector = VectorIndex.normalize(vector)
+            plans = self._bucket(signature)
+            kept = [
+                plan for plan in plans
+                if float(VectorIndex.normalize(_decode_vector(plan["vector"])) @ query_vector) < self.threshold
+            ]
+            if len(kept) != len(plans):
+                self._write_bucket(signature, kept)
+            removed = max(removed, len(plans) - len(kept))
+        return removed
+
+    def stats_dict(self) -> dict:
+        return {
+            **self.stats.as_dict(),
+            "entries": len(self.index),
+            "capacity": self.index.capacity,
+            "similarity_threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            **({"shared": self.shared_store.stats()} if hasattr(self.shared_store, "stats") else {}),
+        }
@@ -0,0 +1,388 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+from utils.settings import get_settings
+from utils.shared_cache import DEFAULT_REDIS_URL, RespClient
+from utils.thread_pool import run_in_thread
+
+
+DEFAULT_SQLITE_PATH = ".cache/sessions.sqlite3"
+DEFAULT_REDIS_PREFIX = "trip:session:"
+DEFAULT_TTL_SECONDS = 2 * 60 * 60
+DEFAULT_MAX_SESSIONS = 10_000
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+
+# (checkpoint id, snapshot, pending writes or None)
+StoredSession = Tuple[str, bytes, Optional[bytes]]
+
+
+# ---------------------------
+# Stores
+# ---------------------------
+class SQLiteSessionStore:
+    """Latest snapshot per session in a SQLite file.
+
+    Sessions idle for `ttl_seconds` are evicted by `sweep`, as are the
+    least recently used ones beyond `max_sessions`.
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "thread_id TEXT NOT NULL, ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+            "snapshot BLOB NOT NULL, writes BLOB, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (thread_id, ns))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)")
+
+    def load(self, thread_id: str, ns: str) -> Optional[StoredSession]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT checkpoint_id, snapshot, writes, updated_at FROM sessions "
+                "WHERE thread_id = ? AND ns = ?",
+                (thread_id, ns),
+            ).fetchone()
+        if row is None or row[3] < time.time() - self.ttl_seconds:
+            return None
+        return row[0], row[1], row[2]
+
+    def save(self, thread_id: str, ns: str, checkpoint_id: str, snapshot: bytes) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions "
+                "(thread_id, ns, checkpoint_id, snapshot, writes, updated_at) "
+                "VALUES (?, ?, ?, ?, NULL, ?)",
+                (thread_id, ns, checkpoint_id, snapshot, time.time()),
+            )
+
+    def save_writes(self, thread_id: str, ns: str, checkpoint_id: str, writes: bytes) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET writes = ?, updated_at = ? "
+                "WHERE thread_id = ? AND ns = ? AND checkpoint_id = ?",
+                (writes, time.time(), thread_id, ns, checkpoint_id),
+            )
+
+    def delete(self, thread_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM sessions WHERE thread_id = ?", (thread_id,)
+            ).rowcount > 0
+
+    def sweep(self) -> int:
+        """Evict idle sessions and the least recently used beyond `max_sessions`."""
+        with self._lock:
+            evicted = self._conn.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            evicted += self._conn.execute(
+                "DELETE FROM sessions WHERE rowid IN (SELECT rowid FROM sessions "
+                "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            ).rowcount
+            self.evictions += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(snapshot) + COALESCE(LENGTH(writes), 0)), 0) "
+                "FROM sessions"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": count,
+            "bytes": size,
+            "evictions": self.evictions,
+            "ttl_seconds": self.ttl_seconds,
+            "max_sessions": self.max_sessions,
+        }
+
+
+class RedisSessionStore:
+    """Latest snapshot per session on a Redis-protocol server, shared by all nodes.
+
+    Each save renews the key's TTL, so Redis itself evicts idle sessions.
+    """
+
+    def __init__(self, url: str = DEFAULT_REDIS_URL, key_prefix: str = DEFAULT_REDIS_PREFIX,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, timeout: float = 2.0):
+        self.client = RespClient(url, timeout=timeout)
+        self.prefix = key_prefix
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, thread_id: str, ns: str, part: str) -> str:
+        return f"{self.prefix}{thread_id}:{ns}:{part}"
+
+    @staticmethod
+    def _split(value: Optional[bytes]) -> Tuple[Optional[str], Optional[bytes]]:
+        if value is None:
+            return None, None
+        checkpoint_id, _, data = value.partition(b"\n")
+        return checkpoint_id.decode("utf-8"), data
+
+    def load(self, thread_id: str, ns: str) -> Optional[StoredSession]:
+        checkpoint_id, snapshot = self._split(
+            self.client.command("GET", self._key(thread_id, ns, "snapshot"))
+        )
+        if checkpoint_id is None:
+            return None
+        writes_id, writes = self._split(
+            self.client.command("GET", self._key(thread_id, ns, "writes"))
+        )
+        return checkpoint_id, snapshot, writes if writes_id == checkpoint_id else None
+
+    def save(self, thread_id: str, ns: str, checkpoint_id: str, snapshot: bytes) -> None:
+        self.client.command(
+            "SET", self._key(thread_id, ns, "snapshot"),
+            checkpoint_id.encode("utf-8") + b"\n" + snapshot, "EX", int(self.ttl_seconds),
+        )
+        self.client.command("DEL", self._key(thread_id, ns, "writes"))
+
+    def save_writes(self, thread_id: str, ns: str, checkpoint_id: str, writes: bytes) -> None:
+        self.client.command(
+            "SET", self._key(thread_id, ns, "writes"),
+            checkpoint_id.encode("utf-8") + b"\n" + writes, "EX", int(self.ttl_seconds),
+        )
+
+    def delete(self, thread_id: str) -> bool:
+        deleted, cursor = 0, b"0"
+        while True:
+            cursor, keys = self.client.command(
+                "SCAN", cursor, "MATCH", f"{self.prefix}{thread_id}:*", "COUNT", 1000
+            )
+            if keys:
+                deleted += self.client.command("DEL", *keys)
+            if cursor in (b"0", 0):
+                return deleted > 0
+
+    def sweep(self) -> int:
+        return 0  # keys expire on their own
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "server": self.client.server, "ttl_seconds": self.ttl_seconds}
+
+
+# ---------------------------
+# Checkpointer
+# ---------------------------
+class SessionCheckpointer(BaseCheckpointSaver):
+    """LangGraph checkpointer that keeps only the latest snapshot of each session.
+
+    The built-in savers keep every super-step's checkpoint forever; a
+    session only ever resumes from its last one, so each `put` replaces it
+    and drops the previous step's pending writes. Snapshots are msgpack
+    (LangGraph's serializer), zlib-compressed above `compress_min_bytes`.
+    Storage is pluggable: anything with the `SQLiteSessionStore` methods.
+    """
+
+    def __init__(self, store, compress_min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES):
+        super().__init__()
+        self.store = store
+        self.compress_min_bytes = compress_min_bytes
+        self._lock = threading.Lock()
+        self._counts = {"loads": 0, "saves": 0, "bytes_saved": 0, "bytes_raw": 0}
+
+    # ---------------------------
+    # Encoding
+    # ---------------------------
+    def _encode(self, value: Any) -> bytes:
+        type_, data = self.serde.dumps_typed(value)
+        raw = len(data)
+        compressed = raw >= self.compress_min_bytes
+        if compressed:
+            data = zlib.compress(data, 6)
+
+        with self._lock:
+            self._counts["saves"] += 1
+            self._counts["bytes_raw"] += raw
+            self._counts["bytes_saved"] += len(data)
+        return (b"z" if compressed else b"-") + type_.encode("utf-8") + b"\0" + data
+
+    def _decode(self, blob: bytes) -> Any:
+        type_, _, data = blob[1:].partition(b"\0")
+        if blob[:1] == b"z":
+            data = zlib.decompress(data)
+        return self.serde.loads_typed((type_.decode("utf-8"), data))
+
+    # ---------------------------
+    # Sync API
+    # ---------------------------
+    @staticmethod
+    def _ids(config: RunnableConfig) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, ns = self._ids(config)
+        stored = self.store.load(thread_id, ns)
+        if stored is None:
+            return None
+
+        checkpoint_id, snapshot, writes = stored
+        requested = get_checkpoint_id(config)
+        if requested and requested != checkpoint_id:
+            return None  # older checkpoints are not kept
+
+        with self._lock:
+            self._counts["loads"] += 1
+        record = self._decode(snapshot)
+        pending = sorted(self._decode(writes) if writes else [], key=lambda w: w[3])
+
+        def _config(cid: str) -> RunnableConfig:
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": cid}}
+
+        return CheckpointTuple(
+            config=_config(checkpoint_id),
+            checkpoint=record["checkpoint"],
+            metadata=record["metadata"],
+            parent_config=_config(record["parent"]) if record["parent"] else None,
+            pending_writes=[(task_id, channel, value) for task_id, channel, value, _ in pending],
+        )
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        if config is None:
+            return
+        found = self.get_tuple(config)
+        if found is None or limit == 0:
+            return
+        if before is not None and get_checkpoint_id(before) <= found.config["configurable"]["checkpoint_id"]:
+            return
+        if filter and any(found.metadata.get(k) != v for k, v in filter.items()):
+            return
+        yield found
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id, ns = self._ids(config)
+        record = {
+            "checkpoint": checkpoint,
+            "metadata": get_checkpoint_metadata(config, metadata),
+            "parent": config["configurable"].get("checkpoint_id"),
+        }
+        self.store.save(thread_id, ns, checkpoint["id"], self._encode(record))
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]],
+                   task_id: str, task_path: str = "") -> None:
+        thread_id, ns = self._ids(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        stored = self.store.load(thread_id, ns)
+        if stored is None or stored[0] != checkpoint_id:
+            return
+
+        pending = self._decode(stored[2]) if stored[2] else []
+        seen = {(w[0], w[3][2]) for w in pending}
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            # Special writes (errors, interrupts) are overwritten; regular ones kept once.
+            if idx >= 0 and (task_id, idx) in seen:
+                continue
+            pending = [w for w in pending if (w[0], w[3][2]) != (task_id, idx)]
+            pending.append((task_id, channel, value, writes_sort_key(task_path, task_id, idx)))
+
+        self.store.save_writes(thread_id, ns, checkpoint_id, self._encode(pending))
+
+    def delete_thread(self, thread_id: str) -> bool:
+        """Forget a session; returns whether it existed."""
+        return self.store.delete(thread_id)
+
+    # ---------------------------
+    # Async API (the stores block; keep them off the event loop)
+    # ---------------------------
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await run_in_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for item in await run_in_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        ):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await run_in_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]],
+                          task_id: str, task_path: str = "") -> None:
+        await run_in_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await run_in_thread(self.delete_thread, thread_id)
+
+    # ---------------------------
+    # Housekeeping
+    # ---------------------------
+    def sweep(self) -> int:
+        return self.store.sweep()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        raw, saved = counts.pop("bytes_raw"), counts.pop("bytes_saved")
+        counts["compression_ratio"] = round(saved / raw, 3) if raw else None
+        return {**counts, **self.store.stats()}
+
+
+def build_checkpointer(sessions_config: Optional[dict]) -> Optional[SessionCheckpointer]:
+    """The session checkpointer for the `sessions` section of config.yaml, or None."""
+    sessions_config = sessions_config or {}
+    if not sessions_config.get("enabled", True):
+        return None
+
+    backend = sessions_config.get("backend", "sqlite")
+    ttl = float(sessions_config.get("ttl_seconds", DEFAULT_TTL_SECONDS))
+    if backend == "sqlite":
+        store = SQLiteSessionStore(
+            sessions_config.get("sqlite_path", DEFAULT_SQLITE_PATH),
+            ttl_seconds=ttl,
+            max_sessions=int(sessions_config.get("max_sessions", DEFAULT_MAX_SESSIONS)),
+        )
+    elif backend == "redis":
+        redis_config = sessions_config.get("redis") or {}
+        store = RedisSessionStore(
+            url=get_settings().redis_url or redis_config.get("url", DEFAULT_REDIS_URL),
+            key_prefix=redis_config.get("key_prefix", DEFAULT_REDIS_PREFIX),
+            ttl_seconds=ttl,
+        )
+    else:
+        raise ValueError(f"Unsupported session backend '{backend}'. Supported: sqlite, redis")
+
+    return SessionCheckpointer(
+        store,
+        compress_min_bytes=int(sessions_config.get("compress_min_bytes", DEFAULT_COMPRESS_MIN_BYTES)),
+    )
@@ -0,0 +1,64 @@
+import os
+from functools import lru_cache
+from typing import Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from utils.config_loader import load_config, resolve_config_path
+
+
+# Third-party API base URLs; `upstreams` in config.yaml overrides them
+# (the benchmark suite points them at local stub servers).
+UPSTREAM_URLS = {
+    "openweather": "https://api.openweathermap.org/data/2.5",
+    "exchangerate": "https://v6.exchangerate-api.com/v6",
+    "alphavantage": "https://www.alphavantage.co",
+    "google_places": "https://maps.googleapis.com",
+    "tavily": "https://api.tavily.com",
+}
+
+class Settings(BaseModel):
+    """Process-wide settings: environment (.env included) plus config.yaml."""
+
+    model_provider: str = "groq"
+    config_path: str
+    config: dict
+
+    groq_api_key: Optional[str] = None
+    openai_api_key: Optional[str] = None
+    openweathermap_api_key: Optional[str] = None
+    exchange_rate_api_key: Optional[str] = None
+    gplaces_api_key: Optional[str] = None
+    tavily_api_key: Optional[str] = None
+    alphavantage_api_key: Optional[str] = None
+    admin_api_key: Optional[str] = None
+    redis_url: Optional[str] = None
+
+    def section(self, name: str) -> dict:
+        """A top-level config.yaml section ({} when absent)."""
+        return self.config.get(name) or {}
+
+    def upstream_url(self, name: str) -> str:
+        """Base URL (no trailing slash) of one of the `UPSTREAM_URLS` APIs."""
+        return (self.section("upstreams").get(name) or UPSTREAM_URLS[name]).rstrip("/")
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Load .env and config.yaml once and return the cached settings."""
+    load_dotenv()
+    return Settings(
+        model_provider=os.getenv("MODEL_PROVIDER", "groq"),
+        config_path=str(resolve_config_path()),
+        config=load_config(),
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        openweathermap_api_key=os.getenv("OPENWEATHERMAP_API_KEY"),
+        exchange_rate_api_key=os.getenv("EXCHANGE_RATE_API_KEY"),
+        gplaces_api_key=os.getenv("GPLACES_API_KEY"),
+        tavily_api_key=os.getenv("TAVILY_API_KEY"),
+        alphavantage_api_key=os.getenv("ALPHAVANTAGE_API_KEY"),
+        admin_api_key=os.getenv("ADMIN_API_KEY"),
+        redis_url=os.getenv("REDIS_URL"),
+    )
@@ -0,0 +1,524 @@
+import hashlib
+import json
+import mmap
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+from urllib.parse import unquote, urlsplit
+
+from logger.logging import get_logger
+from utils.cache import CacheEntry, SQLiteCacheStore, TieredCache
+from utils.circuit_breaker import CircuitBreaker
+from utils.profiler import JSON_PARSING, phase
+from utils.settings import get_settings
+from utils.telemetry import watch_cache
+
+
+log = get_logger("shared_cache")
+
+try:
+    import fcntl
+except ImportError:  # Windows: the mmap store is then safe for one process only.
+    fcntl = None
+
+
+SQLITE = "sqlite"
+MMAP = "mmap"
+REDIS = "redis"
+NONE = "none"
+
+DEFAULT_LOCAL_TTL = 30.0
+DEFAULT_MMAP_DIRECTORY = "/dev/shm/trip_planner" if os.path.isdir("/dev/shm") else ".cache/shm"
+DEFAULT_MMAP_SLOTS = 4096
+DEFAULT_MMAP_SLOT_BYTES = 16384
+DEFAULT_MMAP_PROBE = 8
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+DEFAULT_REDIS_PREFIX = "trip:"
+DEFAULT_REDIS_TIMEOUT = 0.5
+DEFAULT_REDIS_POOL_SIZE = 16
+
+
+def _expires_at(entry: CacheEntry) -> float:
+    """Wall-clock time after which the entry is neither fresh nor stale."""
+    return entry.stored_at + entry.ttl + entry.stale_ttl
+
+
+def _encode(entry: CacheEntry) -> bytes:
+    return json.dumps(
+        [entry.value, entry.stored_at, entry.ttl, entry.stale_ttl],
+        ensure_ascii=False, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _decode(payload: bytes) -> CacheEntry:
+    with phase(JSON_PARSING):
+        value, stored_at, ttl, stale_ttl = json.loads(payload)
+    return CacheEntry(value, stored_at, ttl, stale_ttl)
+
+
+# ---------------------------
+# Shared memory (one host)
+# ---------------------------
+class MmapCacheStore:
+    """Fixed-size hash table in a memory-mapped file, shared by the workers on one host.
+
+    Keys hash to a slot and probe the next few; a write takes the key's own
+    slot, else an empty or expired one, else evicts the entry that expires
+    soonest in the probe window. Entries past their stale window read as
+    missing, matching the in-memory tier. Values larger than a slot are not
+    shared. Writers hold an exclusive `flock` on the file, readers a
+    shared one.
+    """
+
+    MAGIC = b"TPCACHE1"
+    HEADER = struct.Struct("<8sII")
+    SLOT_HEADER = struct.Struct("<QdddII")
+
+    def __init__(self, path: str, slots: int = DEFAULT_MMAP_SLOTS,
+                 slot_bytes: int = DEFAULT_MMAP_SLOT_BYTES, probe: int = DEFAULT_MMAP_PROBE):
+        if slot_bytes <= self.SLOT_HEADER.size:
+            raise ValueError(f"slot_bytes must be greater than {self.SLOT_HEADER.size}")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.probe = min(probe, slots)
+        self._lock = threading.Lock()
+        self._counts = {"evictions": 0, "oversize": 0}
+
+        size = self.HEADER.size + slots * slot_bytes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._file_lock(exclusive=True):
+            header = os.pread(self._fd, self.HEADER.size, 0)
+            if len(header) == self.HEADER.size:
+                magic, file_slots, file_slot_bytes = self.HEADER.unpack(header)
+                if magic == self.MAGIC and (file_slots, file_slot_bytes) != (slots, slot_bytes):
+                    # Layout changed in config: start over rather than misread slots.
+                    os.ftruncate(self._fd, 0)
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, size)  # sparse; pages are only allocated on write
+            os.pwrite(self._fd, self.HEADER.pack(self.MAGIC, slots, slot_bytes), 0)
+        self._map = mmap.mmap(self._fd, size)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        # flock excludes other processes; the thread lock, other threads here.
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key: bytes) -> int:
+        # 0 marks an empty slot.
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") | 1
+
+    def _offset(self, slot: int) -> int:
+        return self.HEADER.size + slot * self.slot_bytes
+
+    def _window(self, key_hash: int) -> List[int]:
+        start = key_hash % self.slots
+        return [(start + i) % self.slots for i in range(self.probe)]
+
+    def _read_header(self, slot: int) -> tuple:
+        return self.SLOT_HEADER.unpack_from(self._map, self._offset(slot))
+
+    def _matches(self, slot: int, key_hash: int, key: bytes) -> bool:
+        slot_hash, _, _, _, key_len, _ = self._read_header(slot)
+        if slot_hash != key_hash or key_len != len(key):
+            return False
+        start = self._offset(slot) + self.SLOT_HEADER.size
+        return self._map[start:start + key_len] == key
+
+    def _find(self, key_hash: int, key: bytes) -> Optional[int]:
+        for slot in self._window(key_hash):
+            if self._matches(slot, key_hash, key):
+                return slot
+        return None
+
+    def _clear_slot(self, slot: int) -> None:
+        self.SLOT_HEADER.pack_into(self._map, self._offset(slot), 0, 0.0, 0.0, 0.0, 0, 0)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raw_key = key.encode("utf-8")
+        key_hash = self._hash(raw_key)
+
+        with self._file_lock(exclusive=False):
+            slot = self._find(key_hash, raw_key)
+            if slot is None:
+                return None
+            _, stored_at, ttl, stale_ttl, key_len, value_len = self._read_header(slot)
+            start = self._offset(slot) + self.SLOT_HEADER.size + key_len
+            payload = self._map[start:start + value_len]
+
+        if stored_at + ttl + stale_ttl <= time.time():
+            return None
+        with phase(JSON_PARSING):
+            value = json.loads(payload)
+        return CacheEntry(value, stored_at, ttl, stale_ttl)
+
+    def _victim(self, key_hash: int, key: bytes, now: float) -> int:
+        window = self._window(key_hash)
+        for slot in window:
+            if self._matches(slot, key_hash, key):
+                return slot
+
+        expiries = {}
+        for slot in window:
+            slot_hash, stored_at, ttl, stale_ttl, _, _ = self._read_header(slot)
+            if slot_hash == 0 or stored_at + ttl + stale_ttl <= now:
+                return slot
+            expiries[slot] = stored_at + ttl + stale_ttl
+
+        self._counts["evictions"] += 1
+        return min(expiries, key=expiries.get)
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        raw_key = key.encode("utf-8")
+        payload = json.dumps(entry.value, ensure_ascii=False).encode("utf-8")
+        if self.SLOT_HEADER.size + len(raw_key) + len(payload) > self.slot_bytes:
+            with self._lock:
+                self._counts["oversize"] += 1
+            # Don't leave an older value behind for this key.
+            self.delete(key)
+            return
+
+        key_hash = self._hash(raw_key)
+        with self._file_lock(exclusive=True):
+            slot = self._victim(key_hash, raw_key, time.time())
+            offset = self._offset(slot)
+            body = offset + self.SLOT_HEADER.size
+            # Clear, write the body, then the header: a crash mid-write leaves an empty slot.
+            self._clear_slot(slot)
+            self._map[body:body + len(raw_key) + len(payload)] = raw_key + payload
+            self.SLOT_HEADER.pack_into(
+                self._map, offset, key_hash, entry.stored_at, entry.ttl, entry.stale_ttl,
+                len(raw_key), len(payload),
+            )
+
+    def delete(self, key: str) -> None:
+        raw_key = key.encode("utf-8")
+        key_hash = self._hash(raw_key)
+        with self._file_lock(exclusive=True):
+            slot = self._find(key_hash, raw_key)
+            if slot is not None:
+                self._clear_slot(slot)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        removed = 0
+        with self._file_lock(exclusive=True):
+            for slot in range(self.slots):
+                slot_hash, stored_at, ttl, stale_ttl, _, _ = self._read_header(slot)
+                if slot_hash and stored_at + ttl + stale_ttl <= now:
+                    self._clear_slot(slot)
+                    removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._file_lock(exclusive=True):
+            for slot in range(self.slots):
+                self._clear_slot(slot)
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._file_lock(exclusive=False):
+            live = 0
+            for slot in range(self.slots):
+                slot_hash, stored_at, ttl, stale_ttl, _, _ = self._read_header(slot)
+                if slot_hash and stored_at + ttl + stale_ttl > now:
+                    live += 1
+            counts = dict(self._counts)
+        return {"backend": MMAP, "entries": live, "capacity": self.slots, **counts}
+
+    def close(self) -> None:
+        with self._lock:
+            self._map.close()
+            os.close(self._fd)
+
+
+# ---------------------------
+# Redis protocol (across hosts)
+# ---------------------------
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RespConnection:
+    """One blocking connection speaking RESP2 (Redis, Valkey, KeyDB, ...)."""
+
+    def __init__(self, host: str, port: int, timeout: float,
+                 password: Optional[str] = None, db: int = 0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.command("AUTH", password)
+        if db:
+            self.command("SELECT", db)
+
+    @staticmethod
+    def _pack(*args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode("utf-8")
+        if kind == b"-":
+            raise RedisError(rest.decode("utf-8"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise ConnectionError(f"Unexpected RESP reply: {line!r}")
+
+    def command(self, *args):
+        self.sock.sendall(self._pack(*args))
+        return self._read()
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RespClient:
+    """Pooled connections to one Redis-protocol server; `command` raises on errors."""
+
+    def __init__(self, url: str = DEFAULT_REDIS_URL, timeout: float = DEFAULT_REDIS_TIMEOUT,
+                 pool_size: int = DEFAULT_REDIS_POOL_SIZE):
+        parts = urlsplit(url)
+        if parts.scheme not in ("redis", ""):
+            raise ValueError(f"Unsupported Redis URL '{url}' (TLS is not supported)")
+
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._pool: "queue.LifoQueue[RespConnection]" = queue.LifoQueue(maxsize=pool_size)
+
+    @property
+    def server(self) -> str:
+        return f"{self.host}:{self.port}/{self.db}"
+
+    def _connect(self) -> RespConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return RespConnection(self.host, self.port, self.timeout, self.password, self.db)
+
+    def _release(self, connection: RespConnection) -> None:
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def command(self, *args):
+        connection = self._connect()
+        try:
+            reply = connection.command(*args)
+        except RedisError:
+            self._release(connection)  # error reply; the connection is fine
+            raise
+        except BaseException:
+            connection.close()
+            raise
+        self._release(connection)
+        return reply
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class RedisCacheStore:
+    """Cache store on any Redis-protocol server, shared by workers across hosts.
+
+    Each entry is one key holding the encoded `CacheEntry`, written with a
+    `PX` expiry at the end of its stale window, so Redis drops it exactly
+    when the in-memory tier would. Connection errors are treated as misses
+    and feed a circuit breaker, so an unreachable server costs one timeout
+    and then is skipped until it recovers.
+    """
+
+    def __init__(self, url: str = DEFAULT_REDIS_URL, table: str = "cache",
+                 key_prefix: str = DEFAULT_REDIS_PREFIX, timeout: float = DEFAULT_REDIS_TIMEOUT,
+                 pool_size: int = DEFAULT_REDIS_POOL_SIZE, breaker: Optional[CircuitBreaker] = None):
+        self.client = RespClient(url, timeout=timeout, pool_size=pool_size)
+        self.prefix = f"{key_prefix}{table}:"
+        self.breaker = breaker or CircuitBreaker(
+            f"redis:{table}", consecutive_failures=3, min_calls=20, open_seconds=5, max_open_seconds=60
+        )
+        self._counts = {"errors": 0}
+        self._counts_lock = threading.Lock()
+
+    def _call(self, *args, default=None):
+        """Run one command; on a connection error report it and return `default`."""
+        if not self.breaker.allow():
+            return default
+
+        started = time.monotonic()
+        try:
+            reply = self.client.command(*args)
+        except (OSError, ConnectionError, RedisError) as e:
+            self.breaker.record_failure(time.monotonic() - started)
+            with self._counts_lock:
+                self._counts["errors"] += 1
+            log.warning("⚠️ Shared cache %s failed: %s", args[0], e)
+            return default
+
+        self.breaker.record_success(time.monotonic() - started)
+        return reply
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        payload = self._call("GET", self.prefix + key)
+        return _decode(payload) if payload is not None else None
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        expires_in_ms = int((_expires_at(entry) - time.time()) * 1000)
+        if expires_in_ms <= 0:
+            self.delete(key)
+            return
+        self._call("SET", self.prefix + key, _encode(entry), "PX", expires_in_ms)
+
+    def delete(self, key: str) -> None:
+        self._call("DEL", self.prefix + key)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        return 0  # Redis expires keys itself
+
+    def _keys(self) -> List[bytes]:
+        keys, cursor = [], "0"
+        while True:
+            reply = self._call("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 500)
+            if reply is None:
+                return keys
+            cursor, batch = reply[0].decode("utf-8"), reply[1]
+            keys.extend(batch)
+            if cursor == "0":
+                return keys
+
+    def clear(self) -> None:
+        keys = self._keys()
+        for i in range(0, len(keys), 500):
+            self._call("DEL", *keys[i:i + 500])
+
+    def stats(self) -> dict:
+        with self._counts_lock:
+            counts = dict(self._counts)
+        return {
+            "backend": REDIS,
+            "server": self.client.server,
+            "circuit": self.breaker.stats()["state"],
+            **counts,
+        }
+
+    def close(self) -> None:
+        self.client.close()
+
+
+# ---------------------------
+# Construction from config.yaml
+# ---------------------------
+def shared_cache_config(cache_config: Optional[dict] = None) -> dict:
+    """`cache.shared` from config.yaml, overridden by a cache's own section."""
+    shared = dict(get_settings().section("cache").get("shared") or {})
+    for key, value in (cache_config or {}).items():
+        if key in ("backend", "local_ttl_seconds"):
+            shared[key] = value
+        elif key in (MMAP, REDIS):
+            shared[key] = {**(shared.get(key) or {}), **value}
+    return shared
+
+
+def build_cache_store(cache_config: Optional[dict], table: str):
+    """The shared tier for one cache: SQLite, mmap, Redis or None."""
+    cache_config = cache_config or {}
+    shared = shared_cache_config(cache_config)
+    backend = shared.get("backend", SQLITE)
+
+    if backend == SQLITE:
+        sqlite_path = cache_config.get("sqlite_path")
+        return SQLiteCacheStore(sqlite_path, table=table) if sqlite_path else None
+
+    if backend == MMAP:
+        mmap_config = shared.get(MMAP) or {}
+        directory = mmap_config.get("directory", DEFAULT_MMAP_DIRECTORY)
+        return MmapCacheStore(
+            os.path.join(directory, f"{table}.cache"),
+            slots=int(mmap_config.get("slots", DEFAULT_MMAP_SLOTS)),
+            slot_bytes=int(mmap_config.get("slot_bytes", DEFAULT_MMAP_SLOT_BYTES)),
+            probe=int(mmap_config.get("probe", DEFAULT_MMAP_PROBE)),
+        )
+
+    if backend == REDIS:
+        redis_config = shared.get(REDIS) or {}
+        return RedisCacheStore(
+            url=get_settings().redis_url or redis_config.get("url", DEFAULT_REDIS_URL),
+            table=table,
+            key_prefix=redis_config.get("key_prefix", DEFAULT_REDIS_PREFIX),
+            timeout=float(redis_config.get("timeout_seconds", DEFAULT_REDIS_TIMEOUT)),
+            pool_size=int(redis_config.get("pool_size", DEFAULT_REDIS_POOL_SIZE)),
+        )
+
+    if backend == NONE:
+        return None
+
+    raise ValueError(f"Unsupported cache backend '{backend}'. Supported: sqlite, mmap, redis, none")
+
+
+def local_ttl(cache_config: Optional[dict]) -> Optional[float]:
+    """Seconds an L1 copy is trusted before re-reading the shared tier."""
+    shared = shared_cache_config(cache_config)
+    if shared.get("backend", SQLITE) == NONE:
+        return None
+    return float(shared.get("local_ttl_seconds", DEFAULT_LOCAL_TTL))
+
+
+def build_tiered_cache(cache_config: Optional[dict], table: str,
+                       default_max_entries: int = 1024) -> TieredCache:
+    """Per-worker LRU in front of the configured shared store."""
+    cache_config = cache_config or {}
+    store = build_cache_store(cache_config, table)
+    cache = TieredCache(
+        max_entries=int(cache_config.get("max_entries", default_max_entries)),
+        store=store,
+        local_ttl=local_ttl(cache_config) if store is not None else None,
+    )
+    watch_cache(table, cache.stats)
+    return cache
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers that arrive while
+    it is in flight wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        # asyncio futures belong to one loop, so in-flight maps are per loop.
+        self._async_calls: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._counts = {"executions": 0, "shared": 0}
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            self._counts[field] += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._count("shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self._count("executions")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        future = calls.get(key)
+
+        if future is not None:
+            self._count("shared")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # The leader was cancelled, not us: run it ourselves.
+                    return await self.ado(key, fn)
+                raise
+
+        future = calls[key] = loop.create_future()
+        self._count("executions")
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if calls.get(key) is future:
+                del calls[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            in_flight = len(self._calls)
+
+        in_flight += sum(len(calls) for calls in list(self._async_calls.values()))
+        return {**counts, "in_flight": in_flight}
@@ -0,0 +1,72 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from logger.logging import get_logger
+
+
+log = get_logger("startup")
+
+
+class StartupReport:
+    """Wall-clock timings of imports and startup phases for this process."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.imports = {}
+        self.ready_after = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def mark(self, name: str) -> None:
+        """Record a phase that ran from process start until now."""
+        with self._lock:
+            self.phases[name] = round((time.perf_counter() - self.started) * 1000, 1)
+
+    def record_import(self, module: str, seconds: float) -> None:
+        with self._lock:
+            self.imports[module] = round(seconds * 1000, 1)
+
+    def ready(self) -> None:
+        self.ready_after = round((time.perf_counter() - self.started) * 1000, 1)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "phases_ms": dict(self.phases),
+                "lazy_imports_ms": dict(self.imports),
+                "ready_after_ms": self.ready_after,
+            }
+
+    def log(self) -> None:
+        report = self.as_dict()
+        lines = [f"   {name}: {ms} ms" for name, ms in report["phases_ms"].items()]
+        lines += [f"   import {name}: {ms} ms" for name, ms in report["lazy_imports_ms"].items()]
+        lines.append(f"   ready after: {report['ready_after_ms']} ms")
+        log.info("⏱️ Startup report\n%s", "\n".join(lines))
+
+
+startup_report = StartupReport()
+
+
+def lazy_import(module_name: str):
+    """Import an optional/provider SDK on first use, timing the import."""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    startup_report.record_import(module_name, time.perf_counter() - started)
+    return module
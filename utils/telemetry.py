@@ -0,0 +1,623 @@
+import asyncio
+import functools
+import importlib
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from logger.logging import get_logger
+from utils.profiler import current_profile, record_phase
+
+
+log = get_logger("telemetry")
+
+PREFIX = "trip_planner_"
+# Plans take tens of seconds; upstream calls tens of milliseconds.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------------------------
+# Metrics (Prometheus text format)
+# ---------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple, object] = {}
+
+    def labels(self, *values):
+        """The series for these label values (created on first use)."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        with self._lock:
+            samples = self._samples()
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in samples)
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, lock: threading.Lock):
+        self.value = 0.0
+        self._lock = lock
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = float(value)
+
+
+class Counter(_Metric):
+    """Monotonic count. `set` is only for mirroring an existing total at scrape time."""
+
+    kind = "counter"
+
+    def _child(self):
+        return _Value(self._lock)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}"
+            for values, child in self._children.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...], lock: threading.Lock):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = lock
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.bounds):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def _child(self):
+        return _Buckets(self.buckets, self._lock)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(child.bounds, child.counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(child.sum)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered for Prometheus at /metrics.
+
+    Collectors run on each scrape to copy state that is already tracked
+    elsewhere (admission queue, cache stats, ...) into gauges.
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, func: Callable[[], None]) -> Callable[[], None]:
+        self._collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                log.warning("⚠️ Metrics collector %s failed: %s", collect.__name__, e)
+        return "".join(metric.render() for metric in self._metrics)
+
+
+metrics = MetricsRegistry()
+
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "API requests by route and status code.", ("method", "route", "status"))
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "API request latency, until the last body byte.", ("method", "route"))
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "API requests being served.")
+
+NODE_LATENCY = metrics.histogram(
+    "graph_node_duration_seconds", "LangGraph node execution time.", ("node",))
+NODE_ERRORS = metrics.counter("graph_node_errors_total", "LangGraph node executions that raised.", ("node",))
+
+LLM_CALLS = metrics.counter("llm_calls_total", "LLM calls by outcome.", ("role", "model", "outcome"))
+LLM_LATENCY = metrics.histogram("llm_call_duration_seconds", "LLM call latency.", ("role", "model"))
+LLM_TTFT = metrics.histogram(
+    "llm_time_to_first_token_seconds", "Time to first streamed token.", ("role", "model"))
+LLM_TOKENS = metrics.histogram(
+    "llm_tokens", "Prompt and completion tokens per LLM call.", ("role", "model", "type"), TOKEN_BUCKETS)
+LLM_IN_FLIGHT = metrics.gauge("llm_calls_in_flight", "LLM calls awaiting a response.", ("role",))
+
+TOOL_CALLS = metrics.counter("tool_calls_total", "Tool calls by status.", ("tool", "status"))
+TOOL_LATENCY = metrics.histogram("tool_call_duration_seconds", "Tool call latency (reuses excluded).", ("tool",))
+
+UPSTREAM_REQUESTS = metrics.counter(
+    "upstream_requests_total", "Upstream API requests (each retry counts) by outcome.", ("upstream", "outcome"))
+UPSTREAM_LATENCY = metrics.histogram(
+    "upstream_request_duration_seconds", "Upstream API request latency.", ("upstream",))
+UPSTREAM_IN_FLIGHT = metrics.gauge("upstream_requests_in_flight", "Upstream API requests in flight.", ("upstream",))
+
+CACHE_LOOKUPS = metrics.counter("cache_lookups_total", "Cache lookups by result.", ("cache", "result"))
+CACHE_HIT_RATIO = metrics.gauge("cache_hit_ratio", "Fresh plus stale hits over lookups.", ("cache",))
+
+_caches: Dict[str, object] = {}
+
+
+def watch_cache(name: str, stats) -> None:
+    """Export a `CacheStats` as `cache_lookups_total` / `cache_hit_ratio`."""
+    _caches[name] = stats
+
+
+@metrics.collector
+def _collect_caches() -> None:
+    for name, stats in list(_caches.items()):
+        counts = stats.as_dict()
+        CACHE_LOOKUPS.labels(name, "hit").set(counts["hits"])
+        CACHE_LOOKUPS.labels(name, "stale").set(counts["stale_hits"])
+        CACHE_LOOKUPS.labels(name, "miss").set(counts["misses"])
+        CACHE_HIT_RATIO.labels(name).set(counts["hit_ratio"])
+
+
+# ---------------------------
+# Tracing (OpenTelemetry, optional)
+# ---------------------------
+_trace = None  # `opentelemetry.trace` once tracing is configured
+_tracer = None
+_provider = None
+
+
+def configure_tracing(tracing_config: Optional[dict]) -> bool:
+    """Set up OpenTelemetry from `telemetry.tracing` in config.yaml.
+
+    Needs `opentelemetry-api`; exporting also needs `opentelemetry-sdk` and,
+    for OTLP, `opentelemetry-exporter-otlp-proto-http`. With
+    `exporter: none` spans go to whatever tracer provider is already
+    installed (e.g. by `opentelemetry-instrument`).
+    """
+    global _trace, _tracer, _provider
+
+    tracing_config = tracing_config or {}
+    if not tracing_config.get("enabled", False):
+        return False
+
+    try:
+        trace = importlib.import_module("opentelemetry.trace")
+    except ImportError:
+        log.warning("⚠️ Tracing disabled: opentelemetry-api is not installed")
+        return False
+
+    exporter = tracing_config.get("exporter", "otlp")
+    if exporter != "none":
+        try:
+            _provider = _build_provider(tracing_config, exporter)
+        except ImportError as e:
+            log.warning("⚠️ Tracing disabled: %s is not installed", e.name)
+            return False
+        trace.set_tracer_provider(_provider)
+
+    _trace = trace
+    _tracer = trace.get_tracer("trip_planner")
+    log.info("🔭 Tracing enabled (%s)", exporter)
+    return True
+
+
+def _build_provider(tracing_config: dict, exporter: str):
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if exporter == "console":
+        span_exporter = ConsoleSpanExporter()
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        # No endpoint: OTEL_EXPORTER_OTLP_* env vars, else localhost:4318.
+        span_exporter = OTLPSpanExporter(
+            endpoint=tracing_config.get("endpoint"),
+            headers=tracing_config.get("headers"),
+        )
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": tracing_config.get("service_name", "trip-planner")}),
+        sampler=ParentBased(TraceIdRatioBased(float(tracing_config.get("sample_ratio", 1.0)))),
+    )
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    return provider
+
+
+def shutdown_tracing() -> None:
+    """Flush buffered spans (used on application shutdown)."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def _attributes(attributes: dict) -> dict:
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Child span of the current one; yields None while tracing is off."""
+    if _tracer is None:
+        yield None
+        return
+
+    with _tracer.start_as_current_span(
+        name, kind=getattr(_trace.SpanKind, kind.upper()), attributes=_attributes(attributes)
+    ) as current:
+        yield current
+
+
+def _start_span(name: str, kind: str = "internal", **attributes):
+    """A span that is not made current (ended explicitly with `_end_span`)."""
+    if _tracer is None:
+        return None
+    return _tracer.start_span(
+        name, kind=getattr(_trace.SpanKind, kind.upper()), attributes=_attributes(attributes)
+    )
+
+
+def _end_span(current, error: Optional[BaseException] = None, **attributes) -> None:
+    if current is None:
+        return
+    current.set_attributes(_attributes(attributes))
+    if error is not None:
+        current.record_exception(error)
+        current.set_status(_trace.Status(_trace.StatusCode.ERROR, str(error)))
+    current.end()
+
+
+def mark_failed(current, description: str) -> None:
+    """Flag a span as failed for errors that are returned rather than raised."""
+    if current is not None:
+        current.set_status(_trace.Status(_trace.StatusCode.ERROR, description))
+
+
+# ---------------------------
+# Instrumentation
+# ---------------------------
+def traced_node(name: str, func: Callable) -> Callable:
+    """Wrap a graph node (sync or async) in a span plus latency/error metrics.
+
+    `functools.wraps` keeps the signature, so RunnableLambda still passes
+    `config` to nodes that take it.
+    """
+    latency = NODE_LATENCY.labels(name)
+    errors = NODE_ERRORS.labels(name)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def _anode(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with span(f"node {name}", **{"langgraph.node": name}):
+                    return await func(*args, **kwargs)
+            except BaseException:
+                errors.inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                latency.observe(elapsed)
+                record_phase(f"node:{name}", elapsed)
+
+        return _anode
+
+    @functools.wraps(func)
+    def _node(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with span(f"node {name}", **{"langgraph.node": name}):
+                return func(*args, **kwargs)
+        except BaseException:
+            errors.inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            latency.observe(elapsed)
+            record_phase(f"node:{name}", elapsed)
+
+    return _node
+
+
+def record_tool_call(name: str, status: str, latency_ms: Optional[float]) -> None:
+    TOOL_CALLS.labels(name, status).inc()
+    if status != "reused" and latency_ms is not None:
+        TOOL_LATENCY.labels(name).observe(latency_ms / 1000)
+        record_phase(f"tool:{name}", latency_ms / 1000)
+
+
+class UpstreamCall:
+    """Handle yielded by `upstream_call`; report the HTTP status with `status`."""
+
+    __slots__ = ("span", "outcome")
+
+    def __init__(self, current):
+        self.span = current
+        self.outcome = "ok"
+
+    def status(self, code: int) -> None:
+        if code >= 500:
+            self.outcome = "server_error"
+        elif code >= 400:
+            self.outcome = "client_error"
+        if self.span is not None:
+            self.span.set_attribute("http.response.status_code", code)
+            if code >= 500:
+                mark_failed(self.span, f"HTTP {code}")
+
+
+@contextmanager
+def upstream_call(upstream: str, operation: str, **attributes):
+    """Span and metrics around one request to a third-party API."""
+    in_flight = UPSTREAM_IN_FLIGHT.labels(upstream)
+    in_flight.inc()
+    started = time.perf_counter()
+    call = UpstreamCall(None)
+    try:
+        with span(f"{upstream} {operation}", kind="client",
+                  **{"upstream.name": upstream, **attributes}) as current:
+            call.span = current
+            yield call
+    except BaseException:
+        call.outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        in_flight.dec()
+        UPSTREAM_LATENCY.labels(upstream).observe(elapsed)
+        UPSTREAM_REQUESTS.labels(upstream, call.outcome).inc()
+        record_phase(f"upstream:{upstream}", elapsed)
+
+
+def _usage(response) -> Tuple[Optional[int], Optional[int]]:
+    """(prompt, completion) tokens of an `LLMResult`."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens"), usage.get("output_tokens")
+
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+
+class _LLMRun:
+    __slots__ = ("role", "model", "span", "profile", "started", "first_token")
+
+    def __init__(self, role: str, model: str, current):
+        self.role = role
+        self.model = model
+        self.span = current
+        self.profile = current_profile()
+        self.started = time.perf_counter()
+        self.first_token = None
+
+
+class LLMTelemetryCallback(BaseCallbackHandler):
+    """Span, latency, time-to-first-token and token usage for each chat-model call.
+
+    Time to first token is only known when the call streams (/query/stream);
+    other calls get the whole response at once.
+    """
+
+    # Run in the caller's context so the span nests under the node span.
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[object, _LLMRun] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        role = next((t.split(":", 1)[1] for t in tags or () if t.startswith("role:")), "default")
+        model = (metadata.get("ls_model_name")
+                 or ((serialized or {}).get("kwargs") or {}).get("model_name") or "unknown")
+
+        current = _start_span(f"llm {role}", kind="client", **{
+            "gen_ai.system": metadata.get("ls_provider"),
+            "gen_ai.request.model": model,
+            "llm.role": role,
+        })
+        self._runs[run_id] = _LLMRun(role, model, current)
+        LLM_IN_FLIGHT.labels(role).inc()
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and run.first_token is None:
+            run.first_token = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._finish(run_id, "ok")
+        if run is None:
+            return
+
+        prompt_tokens, completion_tokens = _usage(response)
+        if prompt_tokens is not None:
+            LLM_TOKENS.labels(run.role, run.model, "prompt").observe(prompt_tokens)
+        if completion_tokens is not None:
+            LLM_TOKENS.labels(run.role, run.model, "completion").observe(completion_tokens)
+
+        ttft = self._ttft(run)
+        _end_span(run.span, **{
+            "gen_ai.usage.input_tokens": prompt_tokens,
+            "gen_ai.usage.output_tokens": completion_tokens,
+            "llm.time_to_first_token_ms": round(ttft * 1000, 1) if ttft is not None else None,
+        })
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        # Closing a stream early (the router stops at its first answer
+        # token) or cancelling the request is not a model failure.
+        if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            run = self._finish(run_id, "aborted")
+            if run is not None:
+                ttft = self._ttft(run)
+                _end_span(run.span, **{
+                    "llm.outcome": "aborted",
+                    "llm.time_to_first_token_ms": round(ttft * 1000, 1) if ttft is not None else None,
+                })
+            return
+
+        run = self._finish(run_id, "error")
+        if run is not None:
+            _end_span(run.span, error=error)
+
+    @staticmethod
+    def _ttft(run: _LLMRun) -> Optional[float]:
+        """Observe and return the run's time to first token, if it streamed."""
+        if run.first_token is None:
+            return None
+        ttft = run.first_token - run.started
+        LLM_TTFT.labels(run.role, run.model).observe(ttft)
+        return ttft
+
+    def _finish(self, run_id, outcome: str) -> Optional[_LLMRun]:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        elapsed = time.perf_counter() - run.started
+        LLM_IN_FLIGHT.labels(run.role).dec()
+        LLM_CALLS.labels(run.role, run.model, outcome).inc()
+        LLM_LATENCY.labels(run.role, run.model).observe(elapsed)
+        record_phase(f"llm:{run.role}", elapsed, run.profile)
+        return run
+
+
+llm_callback = LLMTelemetryCallback()
+
+
+class TelemetryMiddleware:
+    """ASGI middleware: a server span, latency/status metrics and an access log line per request.
+
+    Timing runs until the last body chunk is sent, so streamed (SSE)
+    responses are measured end to end.
+    """
+
+    def __init__(self, app, access_log: bool = True):
+        self.app = app
+        self.access_log = access_log
+        self.log = get_logger("access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.labels().inc()
+        try:
+            with span(f"{method} {scope['path']}", kind="server", **{
+                "http.request.method": method,
+                "url.path": scope["path"],
+            }) as current:
+                await self.app(scope, receive, _send)
+                if current is not None:
+                    current.set_attribute("http.response.status_code", status)
+                    if status >= 500:
+                        mark_failed(current, f"HTTP {status}")
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.labels().dec()
+            # Route templates (/jobs/{job_id}) keep the label set small.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.labels(method, route, status).inc()
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+            if self.access_log:
+                self.log.info("%s %s %s %.1fms", method, scope["path"], status, elapsed * 1000)
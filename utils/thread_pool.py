@@ -0,0 +1,50 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+DEFAULT_POOL_SIZE = 64
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool used for SDKs that only offer a sync API."""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                size = int(os.getenv("SYNC_POOL_SIZE", DEFAULT_POOL_SIZE))
+                if size <= 0:
+                    raise ValueError("SYNC_POOL_SIZE must be greater than zero")
+
+                _executor = ThreadPoolExecutor(
+                    max_workers=size,
+                    thread_name_prefix="trip-planner-sync",
+                )
+
+    return _executor
+
+
+async def run_in_thread(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable on the shared pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """Shut down the shared pool (used on application shutdown)."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
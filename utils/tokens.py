@@ -0,0 +1,26 @@
+from functools import lru_cache
+
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(name: str):
+    """Load a tiktoken encoding once; None when tiktoken is unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def count_text_tokens(text: str, encoding: str = DEFAULT_ENCODING) -> int:
+    """Token count for `text`; falls back to ~4 characters per token."""
+    if not text:
+        return 0
+
+    encoder = _get_encoding(encoding)
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
@@ -0,0 +1,81 @@
+import asyncio
+import socket
+import time
+from typing import List, Optional
+
+import httpx
+from logger.logging import get_logger
+from utils.http_client import get_http_client
+
+
+log = get_logger("warmup")
+
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_CONNECTIONS_PER_HOST = 2
+
+
+class WarmupConfig:
+    """Settings for the startup warm-up (`startup.warmup` in config.yaml)."""
+
+    def __init__(self, warmup_config: Optional[dict] = None):
+        warmup_config = warmup_config or {}
+        self.enabled = bool(warmup_config.get("enabled", False))
+        self.timeout = float(warmup_config.get("timeout_seconds", DEFAULT_TIMEOUT))
+        self.connections_per_host = int(
+            warmup_config.get("connections_per_host", DEFAULT_CONNECTIONS_PER_HOST)
+        )
+        # Hosts we call through the shared pool: resolve and connect.
+        self.hosts: List[str] = list(warmup_config.get("hosts") or [])
+        # Hosts reached through SDK-owned clients (LLMs): DNS only.
+        self.resolve_only: List[str] = list(warmup_config.get("resolve_only") or [])
+
+
+async def _resolve(host: str) -> bool:
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.getaddrinfo(host, 443, type=socket.SOCK_STREAM)
+        return True
+    except OSError as e:
+        log.warning("⚠️ Warm-up: could not resolve %s (%s)", host, e)
+        return False
+
+
+async def _connect(client: httpx.AsyncClient, host: str, timeout: float) -> bool:
+    """Open one pooled connection; any HTTP response means it is established."""
+    try:
+        response = await client.head(f"https://{host}/", timeout=timeout)
+        await response.aclose()
+        return True
+    except httpx.HTTPError as e:
+        log.warning("⚠️ Warm-up: could not connect to %s (%s)", host, type(e).__name__)
+        return False
+
+
+async def warm_up(config: WarmupConfig) -> dict:
+    """Pre-resolve DNS and open keep-alive connections to the upstreams.
+
+    Failures are reported, never raised: a cold host only costs the first
+    request its handshake. Returns per-host results and the elapsed time.
+    """
+    started = time.perf_counter()
+    hosts = list(dict.fromkeys(config.hosts + config.resolve_only))
+
+    resolved = await asyncio.gather(*(_resolve(host) for host in hosts))
+    results = {host: {"resolved": ok} for host, ok in zip(hosts, resolved)}
+
+    # Concurrent requests per host force the pool to open that many connections.
+    client = get_http_client().async_client
+    targets = [host for host in config.hosts if results[host]["resolved"]]
+    connected = await asyncio.gather(*(
+        _connect(client, host, config.timeout)
+        for host in targets
+        for _ in range(config.connections_per_host)
+    ))
+    for i, host in enumerate(targets):
+        chunk = connected[i * config.connections_per_host:(i + 1) * config.connections_per_host]
+        results[host]["connections"] = sum(chunk)
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    log.info("🔥 Warm-up finished in %s ms (%d hosts connected)", elapsed_ms, len(targets))
+    return {"elapsed_ms": elapsed_ms, "hosts": results}
@@ -1,17 +1,117 @@
-import requests
+import time
+from typing import Optional
+
+import httpx
+from utils.cache import FRESH, TieredCache, normalize_key
+from utils.http_client import get_http_client
+from utils.profiler import JSON_PARSING, phase
+from utils.settings import get_settings
+from utils.shared_cache import build_tiered_cache
+
+
+DEFAULT_WEATHER_TTLS = {
+    "weather": 10 * 60,       # current conditions
+    "forecast": 3 * 60 * 60,  # 3-hourly forecast slots
+}
+DEFAULT_WEATHER_STALE_TTLS = {
+    "weather": 5 * 60,
+    "forecast": 60 * 60,
+}
+
+# A forecast slot this close to "now" is good enough to answer a
+# current-weather question.
+FORECAST_AS_CURRENT_WINDOW = 90 * 60
+
+
+class WeatherCache:
+    """Cache for OpenWeather payloads keyed by (endpoint, normalized city).
+
+    Identical concurrent lookups share one in-flight fetch, and a fresh
+    forecast can answer a current-weather lookup without a network call.
+    """
+
+    def __init__(self, cache: TieredCache, ttls: Optional[dict] = None,
+                 stale_ttls: Optional[dict] = None):
+        self.cache = cache
+        self.ttls = {**DEFAULT_WEATHER_TTLS, **(ttls or {})}
+        self.stale_ttls = {**DEFAULT_WEATHER_STALE_TTLS, **(stale_ttls or {})}
+
+    @classmethod
+    def from_config(cls, cache_config: Optional[dict]) -> Optional["WeatherCache"]:
+        """Build the cache from the `cache.weather` section of config.yaml."""
+        cache_config = cache_config or {}
+        if not cache_config.get("enabled", True):
+            return None
+
+        return cls(
+            build_tiered_cache(cache_config, "weather", default_max_entries=1024),
+            ttls=cache_config.get("ttl_seconds"),
+            stale_ttls=cache_config.get("stale_seconds"),
+        )
+
+    @staticmethod
+    def key(endpoint: str, place: str) -> str:
+        return f"weather:{endpoint}:{normalize_key(place)}"
+
+    def current_from_forecast(self, place: str) -> Optional[dict]:
+        """Derive current conditions from a fresh cached forecast, if any."""
+        forecast, state = self.cache.peek(self.key("forecast", place))
+        if state != FRESH or not forecast or not forecast.get("list"):
+            return None
+
+        now = time.time()
+        slot = min(forecast["list"], key=lambda item: abs(item.get("dt", 0) - now))
+        if abs(slot.get("dt", 0) - now) > FORECAST_AS_CURRENT_WINDOW:
+            return None
+
+        self.cache.stats.incr("hits")
+        return {
+            "main": slot.get("main", {}),
+            "weather": slot.get("weather", []),
+            "wind": slot.get("wind", {}),
+            "dt": slot.get("dt"),
+            "name": forecast.get("city", {}).get("name", place),
+            "source": "forecast",
+        }
+
+    def get_or_fetch(self, endpoint: str, place: str, fetch) -> dict:
+        if endpoint == "weather":
+            derived = self.current_from_forecast(place)
+            if derived is not None:
+                return derived
+
+        return self.cache.get_or_compute(
+            self.key(endpoint, place), fetch,
+            ttl=self.ttls[endpoint], stale_ttl=self.stale_ttls[endpoint],
+        )
+
+    async def aget_or_fetch(self, endpoint: str, place: str, fetch) -> dict:
+        if endpoint == "weather":
+            derived = self.current_from_forecast(place)
+            if derived is not None:
+                return derived
+
+        return await self.cache.aget_or_compute(
+            self.key(endpoint, place), fetch,
+            ttl=self.ttls[endpoint], stale_ttl=self.stale_ttls[endpoint],
+        )
+
+    def stats(self) -> dict:
+        return self.cache.stats_dict()
 
 
 class WeatherForecastTool:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[WeatherCache] = None):
         if not api_key:
             raise EnvironmentError(
                 "OPENWEATHERMAP_API_KEY is not set or invalid")
 
         self.api_key = api_key
-        self.base_url = "https://api.openweathermap.org/data/2.5"
+        self.base_url = get_settings().upstream_url("openweather")
+        self.cache = cache
 
-    def _safe_request(self, endpoint: str, place: str, extra_params=None) -> dict:
-        """Internal helper for safe OpenWeather API calls."""
+    def _build_params(self, place: str, extra_params=None) -> dict:
+        """Build the query parameters for an OpenWeather API call."""
         params = {
             "q": place,
             "appid": self.api_key,
@@ -21,38 +121,90 @@ class WeatherForecastTool:
         if extra_params:
             params.update(extra_params)
 
+        return params
+
+    @staticmethod
+    def _parse_response(response) -> dict:
+        """Validate an OpenWeather response and return its JSON body."""
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"OpenWeather API failed "
+                f"(status={response.status_code}, body={response.text})"
+            )
+
+        try:
+            with phase(JSON_PARSING):
+                return response.json()
+        except ValueError as e:
+            raise RuntimeError(
+                f"Invalid JSON response from OpenWeather: {response.text}"
+            ) from e
+
+    def _safe_request(self, endpoint: str, place: str, extra_params=None) -> dict:
+        """Internal helper for safe OpenWeather API calls."""
+        params = self._build_params(place, extra_params)
         url = f"{self.base_url}/{endpoint}"
 
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = get_http_client().get(url, params=params, timeout=10)
+            return self._parse_response(response)
 
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"OpenWeather API failed "
-                    f"(status={response.status_code}, body={response.text})"
-                )
+        except httpx.HTTPError as e:
+            raise RuntimeError(
+                f"Network error while calling OpenWeather API: {e}"
+            ) from e
 
-            try:
-                data = response.json()
-            except ValueError as e:
-                raise RuntimeError(
-                    f"Invalid JSON response from OpenWeather: {response.text}"
-                ) from e
+    async def _asafe_request(self, endpoint: str, place: str, extra_params=None) -> dict:
+        """Async counterpart of `_safe_request`."""
+        params = self._build_params(place, extra_params)
+        url = f"{self.base_url}/{endpoint}"
 
-            return data
+        try:
+            response = await get_http_client().aget(url, params=params, timeout=10)
+            return self._parse_response(response)
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise RuntimeError(
                 f"Network error while calling OpenWeather API: {e}"
             ) from e
 
+    def _cached_request(self, endpoint: str, place: str, extra_params=None) -> dict:
+        if self.cache is None:
+            return self._safe_request(endpoint, place, extra_params)
+
+        return self.cache.get_or_fetch(
+            endpoint, place,
+            lambda: self._safe_request(endpoint, place, extra_params),
+        )
+
+    async def _acached_request(self, endpoint: str, place: str, extra_params=None) -> dict:
+        if self.cache is None:
+            return await self._asafe_request(endpoint, place, extra_params)
+
+        return await self.cache.aget_or_fetch(
+            endpoint, place,
+            lambda: self._asafe_request(endpoint, place, extra_params),
+        )
+
     def get_current_weather(self, place: str) -> dict:
         """Get current weather of a place."""
-        return self._safe_request("weather", place)
+        return self._cached_request("weather", place)
 
     def get_forecast_weather(self, place: str) -> dict:
         """Get weather forecast of a place."""
-        return self._safe_request(
+        return self._cached_request(
+            "forecast",
+            place,
+            extra_params={"cnt": 10},
+        )
+
+    async def aget_current_weather(self, place: str) -> dict:
+        """Get current weather of a place without blocking the event loop."""
+        return await self._acached_request("weather", place)
+
+    async def aget_forecast_weather(self, place: str) -> dict:
+        """Get weather forecast of a place without blocking the event loop."""
+        return await self._acached_request(
             "forecast",
             place,
             extra_params={"cnt": 10},